@@ -4,9 +4,13 @@ from typing import Any, Dict, Tuple, List
 
 from app.tools.scheme_rag import retrieve_schemes, select_best_scheme
 from app.tools.eligibility import check_eligibility
+from app.tools.eligibility_table import STATUS_ELIGIBLE, STATUS_NEEDS_INFO, STATUS_NOT_ELIGIBLE, eligible_schemes
 from app.tools.mock_apply import submit_application
+from app.tools.rules import rule_for
+from app.agent.planner import plan_question
 from app.memory import parse_slot_answer
-from app.db import get_scheme_by_id, save_scheme
+from app.catalog import catalog
+from app.db import get_scheme_by_id
 
 logger = logging.getLogger("sevasetu")
 
@@ -16,13 +20,63 @@ QUESTIONS_MR = {
     "income_annual": "तुमचे वार्षिक उत्पन्न किती आहे? फक्त आकडा सांगा (उदा. 200000 किंवा 2 लाख).",
     "gender": "तुमचे लिंग काय आहे? (महिला/पुरुष)",
     "state": "तुमचे राज्य कोणते? (उदा. महाराष्ट्र)",
+    "occupation": "तुमचा व्यवसाय काय आहे? (उदा. शेतकरी, व्यापारी, विद्यार्थी)",
+    "district": "तुमचा जिल्हा कोणता? (उदा. पुणे)",
+    "category": "तुमचा प्रवर्ग कोणता? (उदा. खुला, ओबीसी, एससी, एसटी)",
+    "land_holding_acres": "तुमच्याकडे किती एकर शेतजमीन आहे? फक्त आकडा सांगा.",
 }
+ASK_FALLBACK_MR = "कृपया माहिती सांगा."
+
+# Fixed replies / templates (also rendered ahead of time by scripts/prewarm_tts_cache.py)
+MSG_LOW_CONFIDENCE_MR = "आवाज स्पष्ट नाही. कृपया पुन्हा हळू आणि स्पष्ट बोला."
+MSG_NO_SCHEME_MR = "क्षमस्व, मला योग्य योजना सापडली नाही. कृपया तुमची गरज थोडी अधिक स्पष्ट सांगा."
+MSG_ELIG_ERROR_MR = "पात्रता तपासतांना अडचण आली."
+MSG_ASK_FOR_SCHEME_MR = "{name} साठी पात्रता तपासण्यासाठी:\n{question}"
+MSG_ELIGIBLE_MR = "✅ {name} साठी तुम्ही पात्र आहात! लाभ: {benefits}\nअर्ज करायचा आहे का?"
+MSG_ELIGIBLE_SLOT_MR = "✅ तुम्ही या योजनेसाठी पात्र आहात! लाभ: {benefits}\nअर्ज करायचा आहे का?"
+MSG_NOT_ELIGIBLE_MR = "❌ तुम्ही पात्र नाही."
+MSG_NOT_ELIGIBLE_SLOT_MR = "❌ तुम्ही या योजनेसाठी पात्र नाही."
+# Replies sent by the WebSocket layer (main.py)
+MSG_STT_EMPTY_MR = "मला नीट ऐकू आलं नाही. कृपया पुन्हा हळू आणि स्पष्ट मराठीत सांगा."
+MSG_TURN_ERROR_MR = "क्षमस्व, थोडा वेळ लागला/अडचण आली. कृपया पुन्हा एकदा बोला."
+
+# Other schemes the caller qualifies for, shown as extra cards after a direct answer
+MAX_ALSO_ELIGIBLE = 5
+# Retrieved schemes (selected one included) the question planner weighs each question against
+PLANNER_CANDIDATES = 5
+
+def bullets(reasons: List[str]) -> str:
+    return "\n".join([f"• {r}" for r in reasons])
+
+def _also_eligible(profile: Dict[str, Any], snap, scheme_id: str | None, tool_trace: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Every other scheme in the catalog this profile is already eligible for (one table scan)."""
+    tool_trace.append({"type":"tool_call","tool":"eligibility_scan","input":{"catalog_version":snap.version[:12]}})
+    result = eligible_schemes(profile, snap)
+    ids = [sid for sid in result.ids(STATUS_ELIGIBLE) if sid != scheme_id]
+    tool_trace.append({"type":"tool_result","tool":"eligibility_scan","output":{
+        "eligible":len(ids), "not_eligible":int((result.status == STATUS_NOT_ELIGIBLE).sum()), "needs_more_info":int((result.status == STATUS_NEEDS_INFO).sum())}})
+    cards = []
+    for sid in ids[:MAX_ALSO_ELIGIBLE]:
+        s = snap.get(sid) or {}
+        cards.append({"scheme_id":sid,"title":s.get("name_mr"),"benefits":s.get("benefits_mr")})
+    return cards
+
+def _next_question(profile: Dict[str, Any], scheme: Dict[str, Any], missing: List[str], candidate_ids: List[str],
+                   snap, tool_trace: List[Dict[str, Any]]) -> str:
+    """Missing field to ask next: the one most likely to settle the selected scheme and
+    then the other retrieved candidates (falls back to rule order)."""
+    others = [rule_for(snap.get(sid), snap) for sid in candidate_ids if snap.get(sid) is not None]
+    tool_trace.append({"type":"tool_call","tool":"question_planner","input":{"scheme_id":scheme.get("scheme_id"),"missing":missing,"candidates":candidate_ids}})
+    plan = plan_question(profile, rule_for(scheme, snap), others)
+    field = plan.field if plan.field in missing else missing[0]
+    tool_trace.append({"type":"tool_result","tool":"question_planner","output":{"field":field,"gains":plan.gains,"candidates":plan.candidates}})
+    return field
 
 def _ensure_state_dict(state: Dict[str, Any] | None) -> Dict[str, Any]:
     return state if isinstance(state, dict) else {}
 
 async def run_agent_turn(
-    conn,
+    db,
     session_id: str,
     utterance: str,
     stt_confidence: float,
@@ -33,6 +87,8 @@ async def run_agent_turn(
 
     tool_trace: List[Dict[str, Any]] = []
     state = _ensure_state_dict(state)
+    # One catalog version answers the whole turn (retrieval, selection, eligibility)
+    snap = catalog()
     logger.debug("Agent turn session_id=%s conf=%.2f text_len=%d", session_id, stt_confidence, len(utterance or ""))
 
     # --- 0) Handle low confidence speech ---
@@ -40,7 +96,7 @@ async def run_agent_turn(
         logger.info("Low STT confidence conf=%.2f", stt_confidence)
         plan = {
             "next_state": "RESPOND",
-            "assistant_message_mr": "आवाज स्पष्ट नाही. कृपया पुन्हा हळू आणि स्पष्ट बोला.",
+            "assistant_message_mr": MSG_LOW_CONFIDENCE_MR,
             "questions_mr": [],
             "tool_calls": [],
             "ui_intent": "error",
@@ -51,7 +107,7 @@ async def run_agent_turn(
         return plan["assistant_message_mr"], ui, tool_trace, pending, state
 
     # --- 1) Slot-filling mode (ONE BY ONE) ---
-    slot = state.get("slot") or {}   # slot = {"scheme_id": "...", "missing": [...], "awaiting": "age"}
+    slot = state.get("slot") or {}   # slot = {"scheme_id": "...", "candidates": [...], "missing": [...], "awaiting": "age", "asked": 1}
     awaiting = slot.get("awaiting")
 
     if awaiting:
@@ -61,7 +117,7 @@ async def run_agent_turn(
         if val is None:
             # ask same question again
             logger.info("Slot answer missing field=%s", awaiting)
-            msg = QUESTIONS_MR.get(awaiting, "कृपया माहिती सांगा.")
+            msg = QUESTIONS_MR.get(awaiting, ASK_FALLBACK_MR)
             plan = {"next_state":"ASK_MISSING","assistant_message_mr":msg,"questions_mr":[msg],"tool_calls":[],"ui_intent":"question","scheme_id":slot.get("scheme_id")}
             tool_trace.append({"type":"plan","plan":plan})
             ui = {"ui_intent":"question","questions_mr":[msg],"cards":[]}
@@ -71,39 +127,39 @@ async def run_agent_turn(
         profile[awaiting] = val
         logger.debug("Slot answer field=%s value=%s", awaiting, val)
 
-        # remove from missing list
-        missing = [f for f in (slot.get("missing") or []) if f != awaiting]
+        # re-check right away: one answer can settle the scheme before every field is asked
+        scheme_id = slot.get("scheme_id")
+        scheme = snap.get(scheme_id) or await db.read(get_scheme_by_id, scheme_id)
+        elig = check_eligibility(profile, scheme, snap)
+        logger.info("Eligibility recheck status=%s", elig.get("status"))
+        asked = int(slot.get("asked") or 1)
 
-        if missing:
-            next_field = missing[0]
-            slot["missing"] = missing
-            slot["awaiting"] = next_field
+        missing = elig.get("missing_fields") or []
+        if elig.get("status") == "needs_more_info" and missing:
+            next_field = _next_question(profile, scheme, missing, slot.get("candidates") or [], snap, tool_trace)
+            slot.update({"missing": missing, "awaiting": next_field, "asked": asked + 1})
             state["slot"] = slot
-            logger.debug("Slot remaining fields=%s", missing)
+            logger.debug("Slot remaining fields=%s next=%s", missing, next_field)
 
-            msg = QUESTIONS_MR.get(next_field, "कृपया माहिती सांगा.")
-            plan = {"next_state":"ASK_MISSING","assistant_message_mr":msg,"questions_mr":[msg],"tool_calls":[],"ui_intent":"question","scheme_id":slot.get("scheme_id")}
+            msg = QUESTIONS_MR.get(next_field, ASK_FALLBACK_MR)
+            plan = {"next_state":"ASK_MISSING","assistant_message_mr":msg,"questions_mr":[msg],"tool_calls":[],"ui_intent":"question","scheme_id":scheme_id}
             tool_trace.append({"type":"plan","plan":plan})
             ui = {"ui_intent":"question","questions_mr":[msg],"cards":[]}
             return msg, ui, tool_trace, pending, state
-
-        # all missing filled -> run eligibility check again
-        scheme_id = slot.get("scheme_id")
-        scheme = get_scheme_by_id(conn, scheme_id)  # implement helper; OR load from schemes table
-        elig = check_eligibility(profile, scheme)
-        logger.info("Eligibility recheck status=%s", elig.get("status"))
+        logger.info("Slot fill done questions=%d status=%s", asked, elig.get("status"))
 
         # clear slot mode
         state["slot"] = {}
 
         # build response
-        ui = {"ui_intent": "chat", "questions_mr": [], "cards": [], "eligibility": elig}
+        ui = {"ui_intent": "chat", "questions_mr": [], "cards": [], "eligibility": elig,
+              "also_eligible": _also_eligible(profile, snap, scheme_id, tool_trace)}
         if elig.get("status") == "eligible":
-            msg = f"✅ तुम्ही या योजनेसाठी पात्र आहात! लाभ: {scheme.get('benefits_mr','')}\nअर्ज करायचा आहे का?"
+            msg = MSG_ELIGIBLE_SLOT_MR.format(benefits=scheme.get('benefits_mr',''))
         elif elig.get("status") == "not_eligible":
-            msg = "❌ तुम्ही या योजनेसाठी पात्र नाही.\n" + "\n".join([f"• {r}" for r in elig.get("reasons_mr",[])])
+            msg = MSG_NOT_ELIGIBLE_SLOT_MR + "\n" + bullets(elig.get("reasons_mr",[]))
         else:
-            msg = "पात्रता तपासतांना अडचण आली."
+            msg = MSG_ELIG_ERROR_MR
 
         plan = {"next_state":"RESPOND","assistant_message_mr":msg,"questions_mr":[],"tool_calls":[],"ui_intent":"chat","scheme_id":scheme_id}
         tool_trace.append({"type":"plan","plan":plan})
@@ -113,27 +169,26 @@ async def run_agent_turn(
     # RAG
     logger.info("RAG retrieve query_len=%d", len(utterance or ""))
     tool_trace.append({"type":"tool_call","tool":"scheme_retrieval","input":{"query_mr":utterance,"k":5}})
-    schemes = retrieve_schemes(utterance, k=5)
-    tool_trace.append({"type":"tool_result","tool":"scheme_retrieval","output":{"count":len(schemes)}})
+    schemes = await retrieve_schemes(utterance, k=5, snapshot=snap, db=db)
+    tool_trace.append({"type":"tool_result","tool":"scheme_retrieval","output":{"count":len(schemes),"catalog_version":snap.version[:12]}})
     logger.info("RAG retrieved count=%d", len(schemes))
 
     if not schemes:
         logger.info("RAG no matches")
-        msg = "क्षमस्व, मला योग्य योजना सापडली नाही. कृपया तुमची गरज थोडी अधिक स्पष्ट सांगा."
+        msg = MSG_NO_SCHEME_MR
         plan = {"next_state":"RESPOND","assistant_message_mr":msg,"questions_mr":[],"tool_calls":[],"ui_intent":"error","scheme_id":None}
         tool_trace.append({"type":"plan","plan":plan})
         ui = {"ui_intent":"error","questions_mr":[],"cards":[]}
         return msg, ui, tool_trace, pending, state
 
     # pick best scheme (LLM-backed if configured)
-    scheme = select_best_scheme(utterance, schemes)
+    scheme = await select_best_scheme(utterance, schemes, db)
     scheme_id = scheme.get("scheme_id")
-    save_scheme(conn, scheme)
     logger.info("Scheme selected scheme_id=%s", scheme_id)
 
     # eligibility check
     tool_trace.append({"type":"tool_call","tool":"eligibility_check","input":{"scheme_id":scheme_id}})
-    elig = check_eligibility(profile, scheme)
+    elig = check_eligibility(profile, scheme, snap)
     tool_trace.append({"type":"tool_result","tool":"eligibility_check","output":elig})
     logger.info("Eligibility status=%s", elig.get("status"))
 
@@ -142,9 +197,11 @@ async def run_agent_turn(
         missing = elig.get("missing_fields") or []
         if missing:
             logger.info("Eligibility needs info missing=%s", missing)
-            state["slot"] = {"scheme_id": scheme_id, "missing": missing, "awaiting": missing[0]}
-            q = QUESTIONS_MR.get(missing[0], "कृपया माहिती सांगा.")
-            msg = f"{scheme.get('name_mr','योजना')} साठी पात्रता तपासण्यासाठी:\n{q}"
+            candidates = [s.get("scheme_id") for s in schemes if s.get("scheme_id") not in (None, scheme_id)][:PLANNER_CANDIDATES - 1]
+            field = _next_question(profile, scheme, missing, candidates, snap, tool_trace)
+            state["slot"] = {"scheme_id": scheme_id, "candidates": candidates, "missing": missing, "awaiting": field, "asked": 1}
+            q = QUESTIONS_MR.get(field, ASK_FALLBACK_MR)
+            msg = MSG_ASK_FOR_SCHEME_MR.format(name=scheme.get('name_mr','योजना'), question=q)
             plan = {"next_state":"ASK_MISSING","assistant_message_mr":msg,"questions_mr":[q],"tool_calls":[],"ui_intent":"question","scheme_id":scheme_id}
             tool_trace.append({"type":"plan","plan":plan})
 
@@ -162,12 +219,13 @@ async def run_agent_turn(
         "questions_mr":[],
         "cards":[{"scheme_id":scheme_id,"title":scheme.get("name_mr"),"benefits":scheme.get("benefits_mr")}],
         "eligibility": elig,
+        "also_eligible": _also_eligible(profile, snap, scheme_id, tool_trace),
     }
 
     if elig.get("status") == "eligible":
-        msg = f"✅ {scheme.get('name_mr')} साठी तुम्ही पात्र आहात! लाभ: {scheme.get('benefits_mr','')}\nअर्ज करायचा आहे का?"
+        msg = MSG_ELIGIBLE_MR.format(name=scheme.get('name_mr'), benefits=scheme.get('benefits_mr',''))
     else:
-        msg = "❌ तुम्ही पात्र नाही.\n" + "\n".join([f"• {r}" for r in elig.get("reasons_mr",[])])
+        msg = MSG_NOT_ELIGIBLE_MR + "\n" + bullets(elig.get("reasons_mr",[]))
 
     plan = {"next_state":"RESPOND","assistant_message_mr":msg,"questions_mr":[],"tool_calls":[],"ui_intent":"chat","scheme_id":scheme_id}
     tool_trace.append({"type":"plan","plan":plan})
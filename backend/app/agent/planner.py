@@ -0,0 +1,69 @@
+"""Slot-fill question planner.
+
+Every question is a full STT -> agent -> TTS round trip, so instead of walking the
+selected scheme's missing fields in rule order the planner asks the field whose answer
+is most likely to settle eligibility: first for the selected (primary) scheme, then for
+the other retrieved candidates. Slot filling stops as soon as the primary is decided.
+
+Answers are not known ahead, so each field is probed with one representative value per
+region the candidates' rule bounds / allowed values cut it into (below, at and between
+numeric bounds; each allowed text value plus "something else"). The probed answers count
+as equally likely, so a field's chance to settle a candidate is the share of them that
+decide it (typically by failing a test), and candidates are treated independently.
+"""
+from __future__ import annotations
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.tools.rules import NUMERIC_FIELDS, CompiledRule, Leaf
+
+logger = logging.getLogger("sevasetu")
+
+NEEDS_INFO = "needs_more_info"
+# A text answer that none of the rules allow
+OTHER_ANSWER = "__other__"
+
+class QuestionPlan(NamedTuple):
+    field: Optional[str]                # next slot to ask; None when the primary is decided
+    gains: Dict[str, Tuple[float, float]]  # field -> (P(primary decided), expected candidates decided)
+    candidates: int                     # undecided candidates considered, primary included
+
+def answer_probes(field: str, leaves: Sequence[Leaf]) -> List[Any]:
+    """Representative answers for `field`, one per region its tests distinguish."""
+    bounds = sorted({l.bound for l in leaves if l.field == field and l.op in ("min", "max") and l.bound is not None})
+    if bounds:
+        mids = [(a + b) / 2 for a, b in zip(bounds, bounds[1:])]
+        return [bounds[0] - 1, *bounds, *mids, bounds[-1] + 1]
+    if field in NUMERIC_FIELDS:
+        return [0]
+    allowed = {a for l in leaves if l.field == field and l.allowed for a in l.allowed}
+    return [*sorted(allowed), OTHER_ANSWER]
+
+def _settle_chance(profile: Dict[str, Any], field: str, rules: Sequence[CompiledRule], probes: Sequence[Any]) -> List[float]:
+    """Per rule: the share of the probed answers that decide it."""
+    decided = [0] * len(rules)
+    for value in probes:
+        answered = {**profile, field: value}
+        for i, rule in enumerate(rules):
+            decided[i] += rule.evaluate(answered)[0] != NEEDS_INFO
+    return [d / len(probes) for d in decided]
+
+def plan_question(profile: Dict[str, Any], primary: CompiledRule, others: Sequence[CompiledRule] = ()) -> QuestionPlan:
+    """Next field to ask among the primary's missing ones: the likeliest to decide the
+    primary, then to decide the most other candidates (ties keep rule order)."""
+    status, _, missing = primary.evaluate(profile)
+    if status != NEEDS_INFO:
+        return QuestionPlan(None, {}, 0)
+    rules = [primary] + [r for r in others if r.evaluate(profile)[0] == NEEDS_INFO]
+    leaves = [l for r in rules for l in r.field_leaves]
+    best: Optional[str] = None
+    best_score = (-1.0, -1.0)
+    gains: Dict[str, Tuple[float, float]] = {}
+    for field in missing:
+        chance = _settle_chance(profile, field, rules, answer_probes(field, leaves))
+        score = (chance[0], sum(chance))
+        gains[field] = (round(score[0], 3), round(score[1], 3))
+        if score > best_score:
+            best, best_score = field, score
+    logger.debug("Question plan field=%s gains=%s", best, gains)
+    return QuestionPlan(best, gains, len(rules))
@@ -0,0 +1,75 @@
+from __future__ import annotations
+import hashlib, json, logging, threading, time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger("sevasetu")
+
+DATA_PATH = Path(__file__).resolve().parent / "data" / "schemes.json"
+
+class CatalogSnapshot:
+    """One immutable version of the scheme catalog.
+
+    Built once per content hash of schemes.json and shared read-only by retrieval,
+    eligibility and the agent: callers must not mutate the scheme dicts (copy first).
+    A turn pins one snapshot, so every component answers from the same `version`.
+    """
+
+    def __init__(self, schemes: List[Dict[str, Any]], version: str):
+        self.version = version
+        self.schemes: Tuple[Dict[str, Any], ...] = tuple(s for s in schemes if isinstance(s, dict))
+        self.ids: Tuple[str, ...] = tuple(s.get("scheme_id") or "" for s in self.schemes)
+        self.position: Mapping[str, int] = MappingProxyType({sid: i for i, sid in enumerate(self.ids) if sid})
+        self.by_id: Mapping[str, Dict[str, Any]] = MappingProxyType({sid: self.schemes[i] for sid, i in self.position.items()})
+        by_cat: Dict[str, List[int]] = {}
+        for i, s in enumerate(self.schemes):
+            by_cat.setdefault(s.get("category_mr") or "", []).append(i)
+        self.by_category: Mapping[str, Tuple[int, ...]] = MappingProxyType({c: tuple(ix) for c, ix in by_cat.items()})
+
+    def __len__(self) -> int:
+        return len(self.schemes)
+
+    def get(self, scheme_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(scheme_id or "")
+
+    def in_category(self, category: str) -> List[Dict[str, Any]]:
+        return [self.schemes[i] for i in self.by_category.get(category, ())]
+
+_lock = threading.Lock()
+_current: Optional[CatalogSnapshot] = None
+_stamp: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the file `_current` was built from
+
+def _file_stamp() -> Optional[Tuple[int, int]]:
+    try:
+        st = DATA_PATH.stat()
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+def catalog() -> CatalogSnapshot:
+    """Current snapshot; a new one is built and swapped in when schemes.json changes.
+
+    A stat per call is the only cost when nothing changed. If mtime/size moved the file
+    is hashed, and only a different content hash produces a new version.
+    """
+    global _current, _stamp
+    stamp = _file_stamp()
+    cur = _current
+    if cur is not None and stamp == _stamp:
+        return cur
+    with _lock:
+        if _current is not None and stamp == _stamp:
+            return _current
+        raw = DATA_PATH.read_bytes() if stamp is not None else b""
+        version = hashlib.sha256(raw).hexdigest()
+        if _current is not None and _current.version == version:
+            _stamp = stamp
+            return _current
+        if stamp is None:
+            logger.warning("Schemes file missing path=%s", DATA_PATH)
+        t0 = time.perf_counter()
+        new = CatalogSnapshot(json.loads(raw.decode("utf-8")) if raw else [], version)
+        _current, _stamp = new, stamp
+        logger.info("Catalog loaded schemes=%d version=%s ms=%.1f", len(new), version[:12], (time.perf_counter() - t0) * 1000)
+        return new
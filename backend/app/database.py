@@ -0,0 +1,261 @@
+from __future__ import annotations
+import asyncio, logging, sqlite3, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.db import connect
+from app.shards import shard_index
+
+logger = logging.getLogger("sevasetu")
+
+class GroupCommitConnection(sqlite3.Connection):
+    """Connection whose commit() is a no-op while the writer holds a group transaction.
+
+    The db.py helpers end with `conn.commit()`; inside a group that would commit the
+    other jobs' half-done work, so the writer commits once for the whole group instead.
+    """
+
+    in_group = False
+
+    def commit(self) -> None:
+        if not self.in_group:
+            super().commit()
+
+Job = Tuple[Callable[..., Any], tuple, asyncio.Future]
+
+class DbWriter:
+    """Single owner of the write connection, fed by an asyncio queue.
+
+    Jobs arriving within `window_ms` of each other (up to `max_batch`) run in one
+    transaction on a dedicated thread, each inside its own SAVEPOINT so a failing job is
+    rolled back alone. Every job's awaitable resolves only after the group's COMMIT has
+    returned, i.e. once the data is on disk (per `synchronous`).
+    """
+
+    def __init__(self, path: str, window_ms: float = 2.0, max_batch: int = 128, synchronous: str = "FULL"):
+        self._path = path
+        self._window_s = max(0.0, float(window_ms)) / 1000.0
+        self._max_batch = max(1, int(max_batch))
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"invalid synchronous mode: {synchronous}")
+        self._synchronous = synchronous.upper()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._conn: Optional[GroupCommitConnection] = None  # created on, and only used by, the writer thread
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.groups = 0
+        self.jobs = 0
+        self.failed_jobs = 0
+        self.last_group_ms = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(conn, *args)` in the next group; returns its result once committed."""
+        if self._closed:
+            raise RuntimeError("DB writer is closed")
+        self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((fn, args, fut))
+        return await fut
+
+    def _drain(self, batch: List[Job]) -> bool:
+        """Move queued jobs into `batch`; False once the close sentinel is seen."""
+        while len(batch) < self._max_batch:
+            try:
+                job = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return True
+            if job is None:
+                return False
+            batch.append(job)
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        running = True
+        while running:
+            first = await self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            running = self._drain(batch)
+            if running and len(batch) < self._max_batch and self._window_s > 0:
+                await asyncio.sleep(self._window_s)
+                running = self._drain(batch)
+            results = await loop.run_in_executor(self._executor, self._commit_group, [(fn, args) for fn, args, _ in batch])
+            for (_fn, _args, fut), (ok, value) in zip(batch, results):
+                if fut.done():
+                    continue  # caller gave up waiting; the write still happened (or failed)
+                if ok:
+                    fut.set_result(value)
+                else:
+                    fut.set_exception(value)
+
+    def _open(self) -> GroupCommitConnection:
+        if self._conn is None:
+            conn = connect(self._path, factory=GroupCommitConnection)
+            conn.isolation_level = None  # transactions are managed explicitly below
+            conn.execute(f"PRAGMA synchronous={self._synchronous};")
+            self._conn = conn
+        return self._conn
+
+    def _commit_group(self, jobs: List[Tuple[Callable[..., Any], tuple]]) -> List[Tuple[bool, Any]]:
+        t0 = time.perf_counter()
+        results: List[Tuple[bool, Any]] = []
+        conn = None
+        try:
+            conn = self._open()
+            conn.in_group = True
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args in jobs:
+                conn.execute("SAVEPOINT job")
+                try:
+                    value = fn(conn, *args)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append((False, exc))
+                    logger.exception("DB write failed fn=%s", getattr(fn, "__name__", fn))
+                    continue
+                conn.execute("RELEASE job")
+                results.append((True, value))
+            conn.execute("COMMIT")
+        except Exception as exc:
+            logger.exception("DB group commit failed jobs=%d", len(jobs))
+            if conn is not None and conn.in_transaction:
+                conn.execute("ROLLBACK")
+            results = [(False, exc)] * len(jobs)
+        finally:
+            if conn is not None:
+                conn.in_group = False
+        self.groups += 1
+        self.jobs += len(jobs)
+        self.failed_jobs += sum(1 for ok, _ in results if not ok)
+        self.last_group_ms = (time.perf_counter() - t0) * 1000
+        logger.debug("DB group committed jobs=%d ms=%.1f", len(jobs), self.last_group_ms)
+        return results
+
+    async def close(self) -> None:
+        """Commit everything already queued, then close the connection."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._task is not None:
+            self._queue.put_nowait(None)
+            await self._task
+        if self._conn is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "groups": self.groups,
+            "jobs": self.jobs,
+            "failed_jobs": self.failed_jobs,
+            "avg_group": round(self.jobs / self.groups, 2) if self.groups else 0.0,
+            "last_group_ms": round(self.last_group_ms, 2),
+        }
+
+class ReadPool:
+    """Read-only connections, one per pool thread; WAL lets them read while the writer writes."""
+
+    def __init__(self, path: str, size: int = 4):
+        self._path = path
+        self._size = max(1, int(size))
+        self._executor = ThreadPoolExecutor(max_workers=self._size, thread_name_prefix="db-read")
+        self._local = threading.local()
+        self._conns: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.reads = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self._path, readonly=True)
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _call(self, fn: Callable[..., Any], args: tuple) -> Any:
+        return fn(self._conn(), *args)
+
+    async def read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(conn, *args)` on a pool thread with a read-only connection."""
+        self.reads += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._call, fn, args)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": self._size, "open_connections": len(self._conns), "reads": self.reads}
+
+class Database:
+    """Async access to the app database: `write()` goes through the group-commit writer,
+    `read()` through the read-only pool. Nothing here blocks the event loop.
+
+    With `shard_paths`, sessions and messages live in those files instead, each with its
+    own writer and pool, so turns of different sessions commit in parallel; use
+    `for_session()` to reach the one owning a session.
+    """
+
+    def __init__(self, path: str, read_pool_size: int = 4, window_ms: float = 2.0, max_batch: int = 128, synchronous: str = "FULL", shard_paths: Sequence[str] = ()):
+        self.path = path
+        self.writer = DbWriter(path, window_ms, max_batch, synchronous)
+        self.readers = ReadPool(path, read_pool_size)
+        # session reads are one per connection (plus history), so shards share the pool budget
+        shard_pool = max(1, int(read_pool_size) // max(1, len(shard_paths)))
+        self.shards: List[Database] = [Database(p, shard_pool, window_ms, max_batch, synchronous) for p in shard_paths]
+
+    def for_session(self, session_id: str) -> "Database":
+        if not self.shards:
+            return self
+        return self.shards[shard_index(session_id, len(self.shards))]
+
+    def session_dbs(self) -> List["Database"]:
+        return self.shards or [self]
+
+    def start(self) -> None:
+        self.writer.start()
+        for shard in self.shards:
+            shard.start()
+
+    async def write(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await self.writer.write(fn, *args)
+
+    async def read(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await self.readers.read(fn, *args)
+
+    async def close(self) -> None:
+        for shard in self.shards:
+            await shard.close()
+        await self.writer.close()
+        self.readers.close()
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"writer": self.writer.stats(), "readers": self.readers.stats()}
+        if self.shards:
+            out["session_shards"] = [{"path": s.path, **s.stats()} for s in self.shards]
+        return out
+
+_db: Optional[Database] = None
+
+def init_database(path: str, read_pool_size: int = 4, window_ms: float = 2.0, max_batch: int = 128, synchronous: str = "FULL", shard_paths: Sequence[str] = ()) -> Database:
+    global _db
+    _db = Database(path, read_pool_size, window_ms, max_batch, synchronous, shard_paths)
+    return _db
+
+def database() -> Database:
+    if _db is None:
+        raise RuntimeError("database not initialised (call init_database)")
+    return _db
@@ -1,18 +1,55 @@
 from __future__ import annotations
-import json, logging, sqlite3, time
+import json, logging, sqlite3, time, unicodedata
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, List, Tuple
+from app.catalog import CatalogSnapshot, catalog
 from app.settings import settings
 
 logger = logging.getLogger("sevasetu")
 
-def connect() -> sqlite3.Connection:
-    db_path = Path(settings.sqlite_path)
+# unicode61 treats Devanagari vowel signs (Mc) and virama/anusvara (Mn) as separators,
+# which shreds "शेतकरी" into "श", "तकर"; declare them token characters instead.
+DEVANAGARI_MARKS = "".join(
+    chr(c) for c in [*range(0x0900, 0x0904), *range(0x093A, 0x0950), *range(0x0951, 0x0958), 0x0962, 0x0963]
+)
+FTS_TOKENIZE = f"unicode61 remove_diacritics 0 tokenchars '{DEVANAGARI_MARKS}'"
+_FTS_TOKENCHARS = frozenset(DEVANAGARI_MARKS)
+
+def fts_tokens(text: str) -> List[str]:
+    """Split `text` the way FTS_TOKENIZE does (runs of letters, digits and the declared
+    Devanagari marks, case-folded), so MATCH terms line up with the indexed ones."""
+    out: List[str] = []
+    cur: List[str] = []
+    for ch in (text or "").lower():
+        if ch in _FTS_TOKENCHARS or unicodedata.category(ch)[0] in "LN" or unicodedata.category(ch) == "Co":
+            cur.append(ch)
+        elif cur:
+            out.append("".join(cur))
+            cur = []
+    if cur:
+        out.append("".join(cur))
+    return out
+
+def connect(path: str | None = None, *, readonly: bool = False, factory: type = sqlite3.Connection) -> sqlite3.Connection:
+    db_path = Path(path or settings.sqlite_path)
+    if readonly:
+        # Read-only handle for the read pool: the file must already exist (init_db ran)
+        conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout=5000;")
+        conn.execute("PRAGMA query_only=ON;")
+        logger.debug("DB connected read-only path=%s", db_path)
+        return conn
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+    fresh = not db_path.exists()
+    conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30, factory=factory)
     conn.row_factory = sqlite3.Row
     # M1 / local-dev friendly SQLite pragmas (better concurrency, fewer "database is locked" issues)
     try:
+        if fresh:
+            # Must precede the first write; older files need a one-off VACUUM
+            # (scripts/archive_sessions.py --enable-incremental-vacuum)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
         conn.execute("PRAGMA journal_mode=WAL;")
         conn.execute("PRAGMA synchronous=NORMAL;")
         conn.execute("PRAGMA temp_store=MEMORY;")
@@ -23,8 +60,7 @@ def connect() -> sqlite3.Connection:
     logger.info("DB connected path=%s", db_path)
     return conn
 
-def init_db(conn: sqlite3.Connection) -> None:
-    cur = conn.cursor()
+def _create_session_tables(cur: sqlite3.Cursor) -> None:
     cur.execute("""
     CREATE TABLE IF NOT EXISTS sessions(
       session_id TEXT PRIMARY KEY,
@@ -32,8 +68,12 @@ def init_db(conn: sqlite3.Connection) -> None:
       profile_json TEXT NOT NULL,
       pending_json TEXT NOT NULL,
       state_json TEXT NOT NULL,
-      updated_at REAL NOT NULL
+      updated_at REAL NOT NULL,
+      version INTEGER NOT NULL DEFAULT 0
     )""")
+    if "version" not in {r[1] for r in cur.execute("PRAGMA table_info(sessions)").fetchall()}:
+        # Optimistic concurrency stamp, bumped on every session write
+        cur.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
     cur.execute("""
     CREATE TABLE IF NOT EXISTS messages(
       id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -42,104 +82,209 @@ def init_db(conn: sqlite3.Connection) -> None:
       text TEXT NOT NULL,
       ts REAL NOT NULL
     )""")
+    # History pages are keyset scans over (session_id, id); retention scans by time
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_session_id ON messages(session_id, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages(ts)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+
+def init_db(conn: sqlite3.Connection) -> None:
+    cur = conn.cursor()
+    _create_session_tables(cur)
     cur.execute("""
     CREATE TABLE IF NOT EXISTS schemes(
       scheme_id TEXT PRIMARY KEY,
       scheme_json TEXT NOT NULL,
       updated_at REAL NOT NULL
     )""")
+    try:
+        cur.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS schemes_fts USING fts5(
+          scheme_id UNINDEXED, name, category, benefits, description,
+          tokenize="{FTS_TOKENIZE}"
+        )""")
+    except sqlite3.OperationalError:
+        logger.warning("SQLite built without FTS5; RAG_BACKEND=fts5 is unavailable")
+    # Which schemes.json version the `schemes` / `schemes_fts` tables hold
+    cur.execute("CREATE TABLE IF NOT EXISTS catalog_meta(key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS llm_decisions(
+      cache_key TEXT PRIMARY KEY,
+      scheme_id TEXT NOT NULL,
+      catalog_version TEXT NOT NULL,
+      created_at REAL NOT NULL
+    )""")
     conn.commit()
+    _backfill_schemes_fts(conn)
     logger.info("DB initialized")
 
+def init_shard_db(conn: sqlite3.Connection, index: int, count: int) -> None:
+    """Session/message tables of one shard file, stamped with its place in the layout.
 
-# --- Scheme loading utilities ---
-
-def _schemes_json_path() -> Path:
-    """Return schemes.json path.
-
-    Project layout (current): backend/app/db.py and backend/app/data/schemes.json OR backend/app/data may not exist.
-    In your repo, the file is at: backend/app/data/schemes.json OR app/data/schemes.json depending on where you run from.
-    We support both, preferring the repo-local `app/data/schemes.json` (same folder level as `app/`).
+    A file created for a different shard count (or position) is refused: its sessions
+    would be looked up in the wrong file. Re-shard with scripts/reshard_sessions.py.
     """
-    here = Path(__file__).resolve()
-    # 1) Preferred: sibling `data/schemes.json` next to this file (backend/app/data/schemes.json)
-    p1 = here.parent / "data" / "schemes.json"
-    # 2) Fallback: `app/data/schemes.json` relative to backend root (when running inside backend/)
-    # Example: backend/app/db.py -> backend/app/data/schemes.json already covered by p1
-    # but if structure differs, try: backend/../app/data/schemes.json
-    p2 = here.parents[1] / "app" / "data" / "schemes.json"
-    return p1 if p1.exists() else p2
-
-
-def ensure_schemes_loaded(conn: sqlite3.Connection) -> None:
-    """Loads schemes from app/data/schemes.json into SQLite once (idempotent)."""
     cur = conn.cursor()
-    row = cur.execute("SELECT COUNT(1) FROM schemes WHERE scheme_id IS NOT NULL AND scheme_id != ''").fetchone()
-    existing = int(row[0] if row and row[0] is not None else 0)
-    if existing > 0:
-        return
+    _create_session_tables(cur)
+    cur.execute("CREATE TABLE IF NOT EXISTS shard_meta(key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+    cur.executemany("INSERT OR IGNORE INTO shard_meta(key, value) VALUES(?,?)", [("index", str(index)), ("count", str(count))])
+    conn.commit()
+    meta = dict(cur.execute("SELECT key, value FROM shard_meta").fetchall())
+    if meta != {"index": str(index), "count": str(count)}:
+        raise RuntimeError(
+            f"Session shard layout mismatch: file has index={meta.get('index')} count={meta.get('count')}, "
+            f"expected index={index} count={count} (run scripts/reshard_sessions.py)"
+        )
 
-    path = _schemes_json_path()
-    print(f"[db] Loading schemes from: {path}")
-    if not path.exists():
-        raise FileNotFoundError(f"schemes.json not found at {path}")
+# --- Scheme loading utilities ---
 
-    data = json.loads(path.read_text(encoding="utf-8"))
-    if not isinstance(data, list):
-        raise ValueError("schemes.json must be a JSON array")
+def _has_fts(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='schemes_fts'").fetchone()
+    return row is not None
 
-    for scheme in data:
-        if isinstance(scheme, dict):
-            save_scheme(conn, scheme)
+def _fts_upsert(cur: sqlite3.Cursor, scheme: Dict[str, Any]) -> None:
+    cur.execute("DELETE FROM schemes_fts WHERE scheme_id=?", (scheme["scheme_id"],))
+    cur.execute(
+      "INSERT INTO schemes_fts(scheme_id, name, category, benefits, description) VALUES(?,?,?,?,?)",
+      (scheme["scheme_id"], scheme.get("name_mr") or "", scheme.get("category_mr") or "",
+       scheme.get("benefits_mr") or "", scheme.get("description_mr") or "")
+    )
 
-    # Final commit safety (save_scheme already commits, but keep this harmless)
+def _backfill_schemes_fts(conn: sqlite3.Connection) -> None:
+    """Index schemes saved before the FTS table existed (or by an older build)."""
+    if not _has_fts(conn):
+        return
+    n_fts = conn.execute("SELECT COUNT(1) FROM schemes_fts").fetchone()[0]
+    n = conn.execute("SELECT COUNT(1) FROM schemes").fetchone()[0]
+    if n_fts == n:
+        return
+    cur = conn.cursor()
+    cur.execute("DELETE FROM schemes_fts")
+    for row in cur.execute("SELECT scheme_json FROM schemes").fetchall():
+        _fts_upsert(cur, json.loads(row[0]))
     conn.commit()
+    logger.info("Scheme FTS index rebuilt rows=%d", n)
+
+def loaded_catalog_version(conn: sqlite3.Connection) -> str | None:
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key='catalog_version'").fetchone()
+    return row[0] if row else None
 
-def get_or_create_session(conn: sqlite3.Connection, session_id: str, language: str):
+def ensure_schemes_loaded(conn: sqlite3.Connection, snapshot: CatalogSnapshot | None = None) -> bool:
+    """Make the `schemes` table (and its FTS index) match the catalog snapshot.
+
+    A no-op while the stored catalog version equals `snapshot.version`; otherwise every
+    scheme is upserted and schemes gone from schemes.json are deleted, in one
+    transaction. Returns True when it reloaded.
+    """
+    snapshot = snapshot or catalog()
+    if loaded_catalog_version(conn) == snapshot.version:
+        return False
+    if not len(snapshot):
+        logger.warning("Catalog is empty; keeping the schemes already in SQLite")
+        return False
+    t0 = time.perf_counter()
     cur = conn.cursor()
-    row = cur.execute("SELECT * FROM sessions WHERE session_id=?", (session_id,)).fetchone()
-    if row:
-        logger.debug("Session loaded session_id=%s", session_id)
-        return json.loads(row["profile_json"]), json.loads(row["pending_json"]), json.loads(row["state_json"])
+    ids = [sid for sid in snapshot.ids if sid]
+    stale = [r[0] for r in cur.execute("SELECT scheme_id FROM schemes").fetchall() if r[0] not in snapshot.position]
+    cur.executemany("DELETE FROM schemes WHERE scheme_id=?", [(sid,) for sid in stale])
+    fts = _has_fts(conn)
+    if fts:
+        cur.executemany("DELETE FROM schemes_fts WHERE scheme_id=?", [(sid,) for sid in stale])
+    for sid in ids:
+        _upsert_scheme(cur, snapshot.by_id[sid], fts)
+    cur.execute("INSERT INTO catalog_meta(key, value) VALUES('catalog_version', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value=excluded.value", (snapshot.version,))
+    conn.commit()
+    logger.info("Schemes synced to SQLite schemes=%d removed=%d version=%s ms=%.1f",
+                len(ids), len(stale), snapshot.version[:12], (time.perf_counter() - t0) * 1000)
+    return True
+
+def new_session_blobs(session_id: str) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Default (profile, pending, state) of a session that has never been saved."""
     profile = {"session_id": session_id, "name": None, "age": None, "gender": None, "state": None, "income_annual": None, "occupation": None}
     pending = {}
     state = {"last_candidates": [], "last_eligibility": {}, "tool_trace": []}
-    save_session(conn, session_id, language, profile, pending, state)
-    logger.info("Session created session_id=%s", session_id)
     return profile, pending, state
 
-def save_session(conn: sqlite3.Connection, session_id: str, language: str, profile: Dict[str, Any], pending: Dict[str, Any], state: Dict[str, Any]) -> None:
+def load_session_row(conn: sqlite3.Connection, session_id: str):
+    """Raw session row (JSON columns still encoded), or None."""
     cur = conn.cursor()
-    cur.execute(
-      """INSERT INTO sessions(session_id, language, profile_json, pending_json, state_json, updated_at)
-         VALUES(?,?,?,?,?,?)
-         ON CONFLICT(session_id) DO UPDATE SET
-           language=excluded.language,
-           profile_json=excluded.profile_json,
-           pending_json=excluded.pending_json,
-           state_json=excluded.state_json,
-           updated_at=excluded.updated_at
-      """,
-      (session_id, language,
-       json.dumps(profile, ensure_ascii=False),
-       json.dumps(pending, ensure_ascii=False),
-       json.dumps(state, ensure_ascii=False),
-       time.time())
-    )
-    conn.commit()
-    logger.debug("Session saved session_id=%s", session_id)
+    return cur.execute("SELECT * FROM sessions WHERE session_id=?", (session_id,)).fetchone()
+
+SESSION_JSON_COLUMNS = ("profile_json", "pending_json", "state_json")
+
+def write_session_delta(
+    conn: sqlite3.Connection,
+    session_id: str,
+    language: str,
+    columns: Dict[str, str],
+    is_new: bool,
+    messages: List[Tuple[str, str, float]],
+    expected_version: int | None = None,
+) -> int | None:
+    """One transaction: buffered messages plus only the changed session columns.
 
-def add_message(conn: sqlite3.Connection, session_id: str, role: str, text: str) -> None:
+    `columns` maps *_json column names to already-encoded JSON; a new session needs all
+    three. Column writes are compare-and-set on `version` (a new session must not exist
+    yet): returns the new version, or None, writing nothing, if another writer got there
+    first. Message-only writes append without a version check.
+    """
     cur = conn.cursor()
-    cur.execute("INSERT INTO messages(session_id, role, text, ts) VALUES(?,?,?,?)", (session_id, role, text, time.time()))
+    now = time.time()
+    version = expected_version
+    if is_new:
+        cur.execute(
+          """INSERT INTO sessions(session_id, language, profile_json, pending_json, state_json, updated_at, version)
+             VALUES(?,?,?,?,?,?,1)
+             ON CONFLICT(session_id) DO NOTHING
+          """,
+          (session_id, language, columns["profile_json"], columns["pending_json"], columns["state_json"], now)
+        )
+        if cur.rowcount == 0:
+            return None
+        version = 1
+    elif columns:
+        names = [c for c in SESSION_JSON_COLUMNS if c in columns]
+        sets = ", ".join(f"{c}=?" for c in names)
+        cur.execute(
+          f"UPDATE sessions SET {sets}, language=?, updated_at=?, version=version+1 WHERE session_id=? AND version=?",
+          [columns[c] for c in names] + [language, now, session_id, int(expected_version or 0)]
+        )
+        if cur.rowcount == 0:
+            return None
+        version = int(expected_version or 0) + 1
+    if messages:
+        cur.executemany(
+          "INSERT INTO messages(session_id, role, text, ts) VALUES(?,?,?,?)",
+          [(session_id, role, text, ts) for role, text, ts in messages]
+        )
     conn.commit()
-    logger.debug("Message saved session_id=%s role=%s chars=%d", session_id, role, len(text or ""))
+    logger.debug("Session flushed session_id=%s columns=%s messages=%d", session_id, sorted(columns), len(messages))
+    return version
 
-def save_scheme(conn: sqlite3.Connection, scheme: Dict[str, Any]) -> None:
-    scheme_id = (scheme or {}).get("scheme_id")
-    if not scheme_id:
-        return
+def list_messages(conn: sqlite3.Connection, session_id: str, limit: int, before_id: int | None = None, after_id: int | None = None):
+    """One page of a session's messages in chronological order (keyset on `id`).
+
+    Without cursors this is the newest page; `before_id` pages back, `after_id` forward.
+    Returns (messages, has_more); one extra row is fetched to know whether more exist.
+    """
     cur = conn.cursor()
+    if after_id is not None:
+        rows = cur.execute(
+          "SELECT id, role, text, ts FROM messages WHERE session_id=? AND id>? ORDER BY id ASC LIMIT ?",
+          (session_id, int(after_id), int(limit) + 1)
+        ).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        rows = cur.execute(
+          "SELECT id, role, text, ts FROM messages WHERE session_id=? AND id<? ORDER BY id DESC LIMIT ?",
+          (session_id, int(before_id) if before_id is not None else 2**63 - 1, int(limit) + 1)
+        ).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+    return [dict(r) for r in rows], has_more
+
+def _upsert_scheme(cur: sqlite3.Cursor, scheme: Dict[str, Any], fts: bool) -> None:
     cur.execute(
       """INSERT INTO schemes(scheme_id, scheme_json, updated_at)
          VALUES(?,?,?)
@@ -147,8 +292,16 @@ def save_scheme(conn: sqlite3.Connection, scheme: Dict[str, Any]) -> None:
            scheme_json=excluded.scheme_json,
            updated_at=excluded.updated_at
       """,
-      (scheme_id, json.dumps(scheme, ensure_ascii=False), time.time())
+      (scheme["scheme_id"], json.dumps(scheme, ensure_ascii=False), time.time())
     )
+    if fts:
+        _fts_upsert(cur, scheme)
+
+def save_scheme(conn: sqlite3.Connection, scheme: Dict[str, Any]) -> None:
+    scheme_id = (scheme or {}).get("scheme_id")
+    if not scheme_id:
+        return
+    _upsert_scheme(conn.cursor(), scheme, _has_fts(conn))
     conn.commit()
     logger.debug("Scheme saved scheme_id=%s", scheme_id)
 
@@ -163,3 +316,48 @@ def get_scheme_by_id(conn: sqlite3.Connection, scheme_id: str):
         return None
     logger.debug("Scheme loaded scheme_id=%s", scheme_id)
     return json.loads(row[0])
+
+def search_schemes_fts(conn: sqlite3.Connection, match: str, limit: int):
+    """FTS5 MATCH over the scheme catalog, best first: [(scheme dict, bm25 score >= 0)]."""
+    cur = conn.cursor()
+    rows = cur.execute(
+      """SELECT s.scheme_json, -bm25(schemes_fts) AS score
+         FROM schemes_fts JOIN schemes s ON s.scheme_id = schemes_fts.scheme_id
+         WHERE schemes_fts MATCH ?
+         ORDER BY bm25(schemes_fts), s.rowid
+         LIMIT ?""",
+      (match, int(limit))
+    ).fetchall()
+    return [(json.loads(r[0]), float(r[1])) for r in rows]
+
+def get_schemes_by_ids(conn: sqlite3.Connection, scheme_ids):
+    ids = [x for x in scheme_ids if x]
+    if not ids:
+        return []
+    cur = conn.cursor()
+    q = f"SELECT scheme_json FROM schemes WHERE scheme_id IN ({','.join('?' * len(ids))})"
+    return [json.loads(r[0]) for r in cur.execute(q, ids).fetchall()]
+
+def schemes_version(conn: sqlite3.Connection) -> str:
+    """Cheap catalog version for the SQLite-backed catalog (row count + last write)."""
+    row = conn.execute("SELECT COUNT(1), COALESCE(MAX(updated_at), 0) FROM schemes").fetchone()
+    return f"db:{row[0]}:{row[1]:.6f}"
+
+def get_llm_decision(conn: sqlite3.Connection, cache_key: str):
+    cur = conn.cursor()
+    row = cur.execute("SELECT scheme_id FROM llm_decisions WHERE cache_key=?", (cache_key,)).fetchone()
+    return row[0] if row else None
+
+def save_llm_decision(conn: sqlite3.Connection, cache_key: str, scheme_id: str, catalog_version: str) -> None:
+    cur = conn.cursor()
+    cur.execute(
+      """INSERT INTO llm_decisions(cache_key, scheme_id, catalog_version, created_at)
+         VALUES(?,?,?,?)
+         ON CONFLICT(cache_key) DO UPDATE SET
+           scheme_id=excluded.scheme_id,
+           created_at=excluded.created_at
+      """,
+      (cache_key, scheme_id, catalog_version, time.time())
+    )
+    conn.commit()
+    logger.debug("LLM decision saved scheme_id=%s", scheme_id)
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+import random
 import time
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import requests
 from requests import Response
@@ -16,6 +20,10 @@ class LLMError(RuntimeError):
     pass
 
 
+class LLMUnavailable(LLMError):
+    """The circuit breaker is open: callers should use their non-LLM fallback right away."""
+
+
 def _validate_messages(messages: List[Dict[str, str]]) -> None:
     if not isinstance(messages, list) or not messages:
         raise LLMError("messages must be a non-empty list of {role, content} dicts")
@@ -143,3 +151,263 @@ def _groq_chat_completion(
             last_exc = exc
 
     raise LLMError("Groq request failed") from last_exc
+
+
+# --- Async client (used on the event loop; the sync helper above stays for scripts) ---
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures; after `reset_s` one
+    probe request is let through (half-open) and its outcome closes or re-opens the circuit."""
+
+    def __init__(self, failure_threshold: int = 5, reset_s: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_s = float(reset_s)
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._probe_inflight = False
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probe_inflight:
+            self._probe_inflight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_inflight = False
+
+    def record_cancel(self) -> None:
+        # Caller gave up (e.g. turn timeout): no verdict, but let the next probe through
+        self._probe_inflight = False
+
+    def record_failure(self) -> None:
+        self._probe_inflight = False
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.failures == self.failure_threshold:
+                self.trips += 1
+                logger.warning("LLM circuit opened after %d failures", self.failures)
+            self.opened_at = time.monotonic()
+
+
+def _backoff_s(attempt: int, base_s: float, cap_s: float) -> float:
+    # Full jitter: uniform(0, min(cap, base * 2^attempt))
+    return random.uniform(0.0, min(cap_s, base_s * (2 ** attempt)))
+
+
+class AsyncLLMClient:
+    """OpenAI-compatible chat client on a pooled, keep-alive `httpx.AsyncClient`.
+
+    Transport errors, 429 and 5xx are retried with jittered exponential backoff; every
+    request that still fails counts against the circuit breaker. While the breaker is
+    open calls raise `LLMUnavailable` without touching the network.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        timeout_s: float = 30.0,
+        max_connections: int = 10,
+        attempts: int = 3,
+        backoff_base_s: float = 0.25,
+        backoff_max_s: float = 4.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.attempts = max(1, int(attempts))
+        self.backoff_base_s = float(backoff_base_s)
+        self.backoff_max_s = float(backoff_max_s)
+        self.breaker = breaker or CircuitBreaker()
+        self._headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        self._timeout_s = float(timeout_s)
+        self._max_connections = max(1, int(max_connections))
+        self._http = None
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.short_circuited = 0
+
+    def _client(self):
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers,
+                timeout=httpx.Timeout(self._timeout_s, connect=min(5.0, self._timeout_s)),
+                limits=httpx.Limits(max_connections=self._max_connections, max_keepalive_connections=self._max_connections),
+            )
+        return self._http
+
+    def _payload(self, messages: List[Dict[str, str]], temperature: Optional[float], max_tokens: Optional[int], stream: bool) -> Dict[str, Any]:
+        _validate_messages(messages)
+        payload: Dict[str, Any] = {"model": self.model, "messages": messages}
+        if temperature is not None:
+            payload["temperature"] = float(temperature)
+        if max_tokens is not None:
+            payload["max_tokens"] = int(max_tokens)
+        if stream:
+            payload["stream"] = True
+        return payload
+
+    def _check_breaker(self) -> None:
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise LLMUnavailable(f"LLM circuit {self.breaker.state}")
+
+    async def _with_retries(self, send):
+        """Run `send()` (one HTTP exchange) with retries; feeds the breaker once per call."""
+        import httpx
+        self._check_breaker()
+        self.requests += 1
+        last_exc: Optional[Exception] = None
+        for n in range(self.attempts):
+            try:
+                result = await send()
+                self.breaker.record_success()
+                return result
+            except httpx.HTTPStatusError as exc:
+                last_exc = exc
+                code = exc.response.status_code
+                if code != 429 and code < 500:
+                    # 4xx is our bug / bad key, not a degraded provider
+                    self.breaker.record_success()
+                    raise LLMError(f"LLM API error {code}: {exc.response.text[:500]}") from exc
+            except (httpx.TransportError, ValueError) as exc:
+                last_exc = exc
+            except asyncio.CancelledError:
+                self.breaker.record_cancel()
+                raise
+            except Exception:
+                # Anything else (decoding, response parsing) is not retried, but it must
+                # still settle a half-open probe or the circuit would stay open for good
+                self.failures += 1
+                self.breaker.record_failure()
+                raise
+            if n < self.attempts - 1:
+                self.retries += 1
+                try:
+                    await asyncio.sleep(_backoff_s(n, self.backoff_base_s, self.backoff_max_s))
+                except asyncio.CancelledError:
+                    self.breaker.record_cancel()
+                    raise
+        self.failures += 1
+        self.breaker.record_failure()
+        raise LLMError("LLM request failed") from last_exc
+
+    async def chat(self, messages: List[Dict[str, str]], temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        payload = self._payload(messages, temperature, max_tokens, stream=False)
+
+        async def send() -> str:
+            resp = await self._client().post("/chat/completions", json=payload)
+            resp.raise_for_status()
+            data = resp.json()
+            return (data.get("choices") or [{}])[0].get("message", {}).get("content", "") or ""
+
+        content = await self._with_retries(send)
+        logger.debug("LLM response chars=%d", len(content))
+        return content
+
+    async def stream(self, messages: List[Dict[str, str]], temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """Yield content deltas from an SSE (`stream: true`) completion.
+
+        Retries only cover opening the stream; once tokens have been yielded a failure
+        is raised to the caller (and counted by the breaker).
+        """
+        payload = self._payload(messages, temperature, max_tokens, stream=True)
+        client = self._client()
+
+        async def open_stream():
+            req = client.build_request("POST", "/chat/completions", json=payload)
+            resp = await client.send(req, stream=True)
+            if resp.status_code >= 400:
+                await resp.aread()
+                await resp.aclose()
+                resp.raise_for_status()
+            return resp
+
+        resp = await self._with_retries(open_stream)
+        try:
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = (json.loads(data).get("choices") or [{}])[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+        except Exception as exc:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise LLMError("LLM stream failed") from exc
+        finally:
+            await resp.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "consecutive_failures": self.breaker.failures,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+        }
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+@lru_cache(maxsize=1)
+def llm_client() -> Optional[AsyncLLMClient]:
+    """Process-wide async client, or None when no provider is configured."""
+    provider = (getattr(settings, "llm_provider", "") or "").strip().lower()
+    if provider not in {"groq", "groqcloud"} or not settings.groq_api_key or not settings.groq_base_url:
+        return None
+    return AsyncLLMClient(
+        base_url=settings.groq_base_url,
+        api_key=settings.groq_api_key,
+        model=settings.groq_model,
+        timeout_s=_timeout_seconds(),
+        max_connections=settings.llm_max_connections,
+        attempts=settings.llm_attempts,
+        backoff_base_s=settings.llm_backoff_base_s,
+        backoff_max_s=settings.llm_backoff_max_s,
+        breaker=CircuitBreaker(settings.llm_breaker_failures, settings.llm_breaker_reset_s),
+    )
+
+
+async def chat_completion_async(
+    messages: List[Dict[str, str]],
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    client = llm_client()
+    if client is None:
+        raise LLMError("LLM is disabled (set LLM_PROVIDER=groq to enable)")
+    return await client.chat(messages, temperature=temperature, max_tokens=max_tokens)
+
+
+async def shutdown_llm_client() -> None:
+    client = llm_client()
+    if client is not None:
+        await client.aclose()
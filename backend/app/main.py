@@ -1,17 +1,29 @@
 from __future__ import annotations
 import asyncio, base64, json, logging, time
 from typing import Any, Dict
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.settings import settings
 from app.lang import iso_for
-from app.utils.audio import convert_to_wav, cleanup_audio_file
-from app.stt.whisper_stt import transcribe_wav
-from app.tts.mms_tts import synth_mms
-from app.db import connect, init_db, ensure_schemes_loaded, get_or_create_session, save_session, add_message
+from app.utils.audio import decode_audio, shutdown_decoder_pool
+from app.stt.whisper_stt import transcribe_async, stt_pool, stt_batcher, shutdown_stt_pool
+from app.stt.streaming import StreamingTranscriber
+from app.tts.mms_tts import register_static_prompts, synth_async, split_for_tts, tts_batcher, tts_cache
+from app.tts.prewarm import known_static_prompts
+from app.db import connect, init_db, ensure_schemes_loaded
+from app.shards import session_db_paths, init_shards
+from app.database import init_database, database
+from app.sessions import CachedSession, init_session_cache, session_cache
+from app.session_store import make_session_store
+from app.retention import run_retention, retention_stats
 from app.memory import extract_profile_updates, apply_updates_with_contradiction
-from app.agent.agent import run_agent_turn
+from app.agent.agent import run_agent_turn, MSG_STT_EMPTY_MR, MSG_TURN_ERROR_MR
+from app.warmup import warm_models, readiness, mark_ready_without_warmup
+from app.llm import llm_client, shutdown_llm_client
+from app.tools.scheme_rag import selection_stats
+from app.screening import RowParser, format_for, screener, shutdown_screener
 
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper(), logging.INFO),
@@ -33,14 +45,179 @@ app.add_middleware(
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
 )
 
-conn = connect()
-init_db(conn)
-ensure_schemes_loaded(conn)
+# Schema + catalog import once, synchronously; after that the event loop only reaches
+# SQLite through the group-commit writer and the read-only pool
+_conn = connect()
+init_db(_conn)
+ensure_schemes_loaded(_conn)
+_shard_paths = session_db_paths() if int(settings.session_shards) > 1 else []
+if _shard_paths:
+    init_shards(_shard_paths)
+    if _conn.execute("SELECT 1 FROM sessions LIMIT 1").fetchone():
+        logger.warning("SESSION_SHARDS=%d but %s still holds sessions; migrate them with scripts/reshard_sessions.py", len(_shard_paths), settings.sqlite_path)
+_conn.close()
+db = init_database(
+    settings.sqlite_path,
+    read_pool_size=int(settings.db_read_pool_size),
+    window_ms=float(settings.db_group_commit_ms),
+    max_batch=int(settings.db_group_max),
+    synchronous=settings.db_write_synchronous,
+    shard_paths=_shard_paths,
+)
+init_session_cache(make_session_store(db), float(settings.session_flush_interval_s))
+
+_warmup_task: asyncio.Task | None = None
+_flush_task: asyncio.Task | None = None
+_retention_task: asyncio.Task | None = None
+
+async def _flush_sessions_periodically(interval_s: float):
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            await session_cache().flush_due()
+        except Exception:
+            logger.exception("Session flush failed")
+
+async def _retention_periodically(interval_s: float):
+    while True:
+        for shard in database().session_dbs():
+            try:
+                await run_retention(
+                    shard,
+                    days=float(settings.retention_days),
+                    archive_dir=settings.retention_archive_dir,
+                    batch_size=int(settings.retention_batch),
+                    exclude=session_cache().open_ids(),
+                    vacuum_pages=int(settings.retention_vacuum_pages),
+                )
+            except Exception:
+                logger.exception("Retention run failed path=%s", shard.path)
+        await asyncio.sleep(interval_s)
+
+@app.on_event("startup")
+async def _startup():
+    global _warmup_task, _flush_task, _retention_task
+    # Map the on-disk TTS cache now so the first cached prompt is a page-cache read;
+    # only the fixed prompts may be persisted from live traffic
+    tts_cache()
+    register_static_prompts(known_static_prompts())
+    database().start()
+    if settings.warmup_on_startup:
+        # Background: liveness answers immediately, readiness turns green once models are warm
+        _warmup_task = asyncio.create_task(warm_models())
+    else:
+        mark_ready_without_warmup()
+    if float(settings.session_flush_interval_s) > 0:
+        _flush_task = asyncio.create_task(_flush_sessions_periodically(float(settings.session_flush_interval_s)))
+    # Retention archives the SQLite session tables; the Redis store expires keys itself
+    if float(settings.retention_days) > 0 and session_cache().store.name == "sqlite":
+        _retention_task = asyncio.create_task(_retention_periodically(max(60.0, float(settings.retention_interval_s))))
+
+@app.on_event("shutdown")
+async def _shutdown():
+    for task in (_flush_task, _retention_task):
+        if task is not None:
+            task.cancel()
+    await session_cache().flush_all()
+    await session_cache().store.close()
+    await database().close()
+    await shutdown_llm_client()
+    shutdown_decoder_pool()
+    shutdown_stt_pool()
+    shutdown_screener()
+    cache = tts_cache()
+    if cache is not None:
+        cache.close()
 
 @app.get("/health")
+@app.get("/health/live")
 def health():
+    """Liveness: the process is up (models may still be loading)."""
     return {"ok": True, "stt": settings.stt_provider, "tts": settings.tts_provider, "db": "sqlite"}
 
+@app.get("/health/ready")
+def health_ready():
+    """Readiness: 200 only once STT and TTS are loaded and warmed, else 503 with per-model state."""
+    body = readiness()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+@app.get("/stt/stats")
+async def stt_stats():
+    """Queue depth and per-worker utilisation of the STT pool (in-process mode reports workers=0)."""
+    pool = stt_pool()
+    batcher = stt_batcher()
+    out: Dict[str, Any] = {"mode": "pool", **pool.stats()} if pool else {"workers": 0, "mode": "in_process"}
+    if batcher is not None:
+        out["batching"] = batcher.stats()
+    return out
+
+@app.get("/tts/stats")
+async def tts_stats():
+    batcher = tts_batcher()
+    cache = tts_cache()
+    return {"batching": batcher.stats() if batcher else None, "cache": cache.stats() if cache else None}
+
+@app.get("/sessions/stats")
+async def sessions_stats():
+    return session_cache().stats()
+
+@app.get("/sessions/{session_id}/messages")
+async def session_messages(session_id: str, limit: int = 50, before: int | None = None, after: int | None = None):
+    """Message history, oldest first within a page, keyset-paginated on message id.
+
+    No cursor: newest `limit` messages; `before=<next_before>` pages back; `after=<id>`
+    returns newer messages (polling). Turns still buffered by the session cache appear
+    once flushed.
+    """
+    limit = max(1, min(int(limit), 200))
+    msgs, has_more = await session_cache().store.messages(session_id, limit, before, after)
+    return {
+        "session_id": session_id,
+        "messages": msgs,
+        "has_more": has_more,
+        "next_before": msgs[0]["id"] if msgs and has_more and after is None else None,
+        "next_after": msgs[-1]["id"] if msgs else after,
+    }
+
+@app.get("/db/stats")
+async def db_stats():
+    """Group-commit writer (groups, jobs per group), read pool and retention counters."""
+    return {**database().stats(), "retention": retention_stats()}
+
+@app.get("/llm/stats")
+async def llm_stats():
+    client = llm_client()
+    return {"client": client.stats() if client else {"enabled": False}, "scheme_select": selection_stats()}
+
+@app.post("/eligibility/screen")
+async def eligibility_screen(request: Request, format: str | None = None):
+    """Screen an uploaded batch of household profiles against the whole catalog.
+
+    Body: JSONL (one profile object per line) or CSV with a header row, sent as the raw
+    request body (`?format=csv|jsonl`, else from Content-Type). Streams NDJSON: one line
+    per row as its chunk finishes (`row`, `id`, `eligible`, `needs_more_info`,
+    `not_eligible`, or `error`), then a `summary` line.
+    """
+    fmt = (format or format_for(request.headers.get("content-type"))).lower()
+    try:
+        parser = RowParser(fmt, int(settings.screening_max_line_bytes))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def rows():
+        async for data in request.stream():
+            for row in parser.feed(data):
+                yield row
+        for row in parser.close():
+            yield row
+
+    lines = screener().screen(rows(), max_rows=int(settings.screening_max_rows))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.get("/eligibility/stats")
+async def eligibility_stats():
+    return {"screening": screener().stats()}
+
 async def _send(ws: WebSocket, payload: Dict[str, Any]):
     await ws.send_text(json.dumps(payload, ensure_ascii=False))
 
@@ -51,16 +228,173 @@ async def _with_timeout(name: str, coro, timeout_s: int):
     except asyncio.TimeoutError as e:
         raise TimeoutError(f"{name} timed out after {timeout_s}s") from e
 
+async def _synth(text: str, language: str, timeout_s: int | None = None):
+    coro = synth_async(text, language)
+    if timeout_s:
+        return await _with_timeout("TTS", coro, timeout_s)
+    return await coro
+
+async def _reply(ws: WebSocket, text: str, ui: Dict[str, Any], language: str, tts_stream: bool = False, timeout_s: int | None = None) -> int:
+    """Send the assistant message and its audio; returns total TTS bytes.
+
+    With `tts_stream` the text goes out first, then one `tts_chunk` frame per sentence/clause
+    as soon as it is synthesized, so playback can start after the first sentence.
+    """
+    if not tts_stream:
+        audio_out, out_mime = await _synth(text, language, timeout_s)
+        audio_out = audio_out or b""
+        tts_b64 = base64.b64encode(audio_out).decode("utf-8")
+        await _send(ws, {"type":"assistant_message","text":text,"ui":ui,"ttsAudioB64":tts_b64,"ttsMime":out_mime})
+        return len(audio_out)
+
+    chunks = split_for_tts(text) or [text]
+    await _send(ws, {"type":"assistant_message","text":text,"ui":ui,"ttsStream":True,"ttsChunks":len(chunks)})
+    t0 = time.perf_counter()
+    total = 0
+    for i, chunk in enumerate(chunks):
+        audio_out, out_mime = await _synth(chunk, language, timeout_s)
+        audio_out = audio_out or b""
+        total += len(audio_out)
+        if i == 0:
+            logger.info("TTS first chunk chars=%d ms=%.0f", len(chunk), (time.perf_counter() - t0) * 1000)
+        await _send(ws, {
+            "type":"tts_chunk","seq":i,"last":i == len(chunks) - 1,"text":chunk,
+            "audioB64":base64.b64encode(audio_out).decode("utf-8"),"mime":out_mime,
+        })
+    return total
+
+async def _send_error_reply(ws: WebSocket, language: str, e: Exception, tts_stream: bool = False):
+    stage = "TURN"
+    msg_txt = str(e)
+    if isinstance(e, TimeoutError):
+        stage = "TIMEOUT"
+    await _send(ws, {"type":"agent_event","event":"ERROR","payload":{"stage": stage, "message": msg_txt}})
+    reply = MSG_TURN_ERROR_MR
+    await _reply(ws, reply, {"ui_intent":"error","questions_mr":["पुन्हा बोला."],"cards":[]}, language, tts_stream)
+
+async def _run_turn(ws: WebSocket, sess: CachedSession, language: str, text: str, conf: float, tts_stream: bool = False):
+    """Everything after STT: persistence, agent, TTS and the assistant reply.
+
+    Session changes are buffered on `sess` and written once, right after the agent
+    step (see SessionCache.end_turn), instead of one commit per change.
+    """
+    session_id = sess.session_id
+    await _send(ws, {"type":"agent_event","event":"STT_DONE","payload":{"confidence": float(conf)}})
+    await _send(ws, {"type":"stt_result","text": text, "confidence": conf})
+
+    if not (text or "").strip():
+        logger.info("STT empty result session_id=%s", session_id)
+        await _send(ws, {"type":"agent_event","event":"STT_REJECTED","payload":{"reason":"empty"}})
+        reply = MSG_STT_EMPTY_MR
+        await _reply(ws, reply, {"ui_intent":"error","questions_mr":["कृपया पुन्हा सांगा."],"cards":[]}, language, tts_stream)
+        return
+
+    profile, pending, state = sess.profile, sess.pending, sess.state
+    sess.add_message("user", text)
+
+    updates = extract_profile_updates(text)
+    profile, pending, conflict = apply_updates_with_contradiction(profile, pending, updates)
+    if updates:
+        logger.debug("Profile updates=%s", updates)
+    if conflict:
+        logger.info("Profile conflict field=%s", conflict.get("field"))
+
+    if updates or conflict:
+        sess.update(profile=profile, pending=pending)
+
+    if conflict:
+        await session_cache().end_turn(sess)
+        reply = f"तुम्ही आधी {conflict['field']} = {conflict['old']} सांगितले होते, आता {conflict['new']} म्हणत आहात. कोणते बरोबर आहे?"
+        await _reply(ws, reply, {"ui_intent":"question","questions_mr":["जुने की नवीन?"],"cards":[]}, language, tts_stream)
+        return
+
+    await _send(ws, {"type":"agent_event","event":"AGENT_START"})
+    logger.info("Agent start session_id=%s text_len=%d", session_id, len(text))
+    assistant_text, ui_payload, tool_trace, pending2, state2 = await _with_timeout(
+        "AGENT",
+        run_agent_turn(
+            db=database(),
+            session_id=session_id,
+            utterance=text,
+            stt_confidence=float(conf),
+            profile=profile,
+            pending=pending,
+            state=state,
+        ),
+        int(getattr(settings, "agent_timeout_s", 45)),
+    )
+
+    # The agent edits profile in place and returns pending/state
+    sess.update(profile=profile, pending=pending2, state=state2)
+    sess.add_message("assistant", assistant_text)
+    await session_cache().end_turn(sess)
+    logger.info("Agent done tool_events=%d ui_intent=%s", len(tool_trace), ui_payload.get("ui_intent"))
+    await _send(ws, {"type":"agent_event","event":"AGENT_DONE","payload":{"ui_intent": ui_payload.get("ui_intent")}})
+
+    for evt in tool_trace:
+        if evt.get("type") == "tool_call":
+            await _send(ws, {"type":"tool_call","tool":evt.get("tool"),"payload":evt.get("input")})
+        elif evt.get("type") == "tool_result":
+            await _send(ws, {"type":"tool_result","tool":evt.get("tool"),"payload":evt.get("output")})
+        elif evt.get("type") == "plan":
+            await _send(ws, {"type":"agent_event","event":"PLAN","payload":evt.get("plan")})
+
+    await _send(ws, {"type":"agent_event","event":"TTS_START"})
+    t0 = time.perf_counter()
+    nbytes = await _reply(ws, assistant_text, ui_payload, language, tts_stream, int(getattr(settings, "tts_timeout_s", 25)))
+    logger.info("TTS %sdone bytes=%d ms=%.0f", "stream " if tts_stream else "", nbytes, (time.perf_counter() - t0) * 1000)
+    await _send(ws, {"type":"agent_event","event":"TTS_DONE","payload":{"bytes": nbytes}})
+
 @app.websocket("/ws")
 async def ws_endpoint(ws: WebSocket):
+    """Voice turns over one WebSocket.
+
+    Two upload modes:
+      - one-shot: {"type":"audio","data":<base64>,"mimeType":...}
+      - streaming: {"type":"audio_start","mimeType":...}, binary frames while the user
+        speaks (webm/opus chunks or "audio/pcm;rate=16000" PCM16), then {"type":"audio_end"}.
+        `stt_partial` events are sent while frames are still arriving.
+
+    Sending {"type":"hello","ttsStream":true} switches replies to per-sentence `tts_chunk` frames.
+    """
     await ws.accept()
     session_id = None
     language = "Marathi"
+    stream: StreamingTranscriber | None = None
+    tts_stream = bool(settings.tts_stream_default)
+    held: Dict[str, CachedSession] = {}  # sessions this connection has opened
     logger.info("WS connected")
 
+    async def _session() -> CachedSession:
+        sess = held.get(session_id)
+        if sess is None:
+            sess = held[session_id] = await session_cache().open(session_id, language)
+        return sess
+
+    async def _send_partial(text: str):
+        await _send(ws, {"type":"stt_partial","text":text})
+
     try:
         while True:
-            raw = await ws.receive_text()
+            frame = await ws.receive()
+            if frame.get("type") == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+
+            if frame.get("bytes") is not None:
+                if stream is None:
+                    logger.debug("Ignoring binary frame outside audio_start/audio_end")
+                    continue
+                try:
+                    await stream.feed(frame["bytes"])
+                    stream.maybe_start_partial(_send_partial)
+                except Exception as e:
+                    logger.exception("Audio stream error session_id=%s", session_id)
+                    stream.abort()
+                    stream = None
+                    await _send_error_reply(ws, language, e, tts_stream)
+                continue
+
+            raw = frame.get("text") or ""
             logger.debug("WS message bytes=%d", len(raw))
             msg = json.loads(raw)
             msg_type = msg.get("type")
@@ -70,8 +404,48 @@ async def ws_endpoint(ws: WebSocket):
                 session_id = msg.get("sessionId") or "sess_default"
                 # Demo is Marathi-only; keep this fixed to avoid STT language drift
                 language = "Marathi"
-                logger.info("Hello session_id=%s language=%s", session_id, language)
-                await _send(ws, {"type":"hello_ack","sessionId":session_id,"language":language})
+                tts_stream = bool(msg.get("ttsStream", tts_stream))
+                logger.info("Hello session_id=%s language=%s tts_stream=%s", session_id, language, tts_stream)
+                await _send(ws, {"type":"hello_ack","sessionId":session_id,"language":language,"ttsStream":tts_stream})
+                continue
+
+            if msg_type == "audio_start":
+                if not session_id:
+                    session_id = msg.get("sessionId") or "sess_default"
+                if stream is not None:
+                    stream.abort()
+                mime = msg.get("mimeType","audio/webm")
+                try:
+                    stream = StreamingTranscriber(mime, iso_for(language))
+                except Exception as e:
+                    logger.exception("Audio stream start failed session_id=%s", session_id)
+                    stream = None
+                    await _send_error_reply(ws, language, e, tts_stream)
+                    continue
+                logger.info("Audio stream start session_id=%s mime=%s", session_id, mime)
+                await _send(ws, {"type":"agent_event","event":"AUDIO_STREAM_START"})
+                continue
+
+            if msg_type == "audio_end":
+                if stream is None:
+                    logger.debug("Ignoring audio_end without audio_start")
+                    continue
+                cur, stream = stream, None
+                try:
+                    await _send(ws, {"type":"agent_event","event":"AUDIO_RECEIVED"})
+                    await _send(ws, {"type":"agent_event","event":"STT_START"})
+                    t0 = time.perf_counter()
+                    text, conf = await _with_timeout("STT", cur.finish(), int(getattr(settings, "stt_timeout_s", 25)))
+                    logger.info(
+                        "STT stream done bytes=%d audio_s=%.1f chars=%d conf=%.2f final_ms=%.0f",
+                        cur.bytes_in, cur.seconds, len(text), conf, (time.perf_counter() - t0) * 1000,
+                    )
+                    logger.debug("STT text=%s", text)
+                    await _run_turn(ws, await _session(), language, text, conf, tts_stream)
+                except Exception as e:
+                    logger.exception("Turn error session_id=%s", session_id)
+                    cur.abort()
+                    await _send_error_reply(ws, language, e, tts_stream)
                 continue
 
             if msg_type != "audio":
@@ -81,7 +455,6 @@ async def ws_endpoint(ws: WebSocket):
             if not session_id:
                 session_id = msg.get("sessionId") or "sess_default"
 
-            wav_path = None
             try:
                 b64 = msg.get("data","")
                 mime = msg.get("mimeType","audio/webm")
@@ -89,109 +462,30 @@ async def ws_endpoint(ws: WebSocket):
                 logger.info("Audio received session_id=%s bytes=%d mime=%s", session_id, len(audio_bytes), mime)
                 await _send(ws, {"type":"agent_event","event":"AUDIO_RECEIVED"})
 
-                t0 = time.perf_counter()
-                wav_path = await convert_to_wav(audio_bytes, mime_type=mime)
-                logger.debug("Audio converted path=%s ms=%.0f", wav_path, (time.perf_counter() - t0) * 1000)
+                audio = await decode_audio(audio_bytes, mime_type=mime)
 
                 await _send(ws, {"type":"agent_event","event":"STT_START"})
                 t0 = time.perf_counter()
                 text, conf = await _with_timeout(
                     "STT",
-                    asyncio.to_thread(transcribe_wav, str(wav_path), iso_for(language)),
+                    transcribe_async(audio, iso_for(language)),
                     int(getattr(settings, "stt_timeout_s", 25)),
                 )
                 logger.info("STT done chars=%d conf=%.2f ms=%.0f", len(text), conf, (time.perf_counter() - t0) * 1000)
                 logger.debug("STT text=%s", text)
-                await _send(ws, {"type":"agent_event","event":"STT_DONE","payload":{"confidence": float(conf)}})
-                await _send(ws, {"type":"stt_result","text": text, "confidence": conf})
-
-                if not (text or "").strip():
-                    logger.info("STT empty result session_id=%s", session_id)
-                    await _send(ws, {"type":"agent_event","event":"STT_REJECTED","payload":{"reason":"empty"}})
-                    reply = "मला नीट ऐकू आलं नाही. कृपया पुन्हा हळू आणि स्पष्ट मराठीत सांगा."
-                    audio_out, out_mime = await asyncio.to_thread(synth_mms, reply, language)
-                    tts_b64 = base64.b64encode(audio_out).decode("utf-8")
-                    await _send(ws, {"type":"assistant_message","text":reply,"ui":{"ui_intent":"error","questions_mr":["कृपया पुन्हा सांगा."],"cards":[]},"ttsAudioB64":tts_b64,"ttsMime":out_mime})
-                    continue
-
-                profile, pending, state = get_or_create_session(conn, session_id, language)
-                add_message(conn, session_id, "user", text)
-
-                updates = extract_profile_updates(text)
-                profile, pending, conflict = apply_updates_with_contradiction(profile, pending, updates)
-                if updates:
-                    logger.debug("Profile updates=%s", updates)
-                if conflict:
-                    logger.info("Profile conflict field=%s", conflict.get("field"))
-
-                if conflict:
-                    save_session(conn, session_id, language, profile, pending, state)
-                    reply = f"तुम्ही आधी {conflict['field']} = {conflict['old']} सांगितले होते, आता {conflict['new']} म्हणत आहात. कोणते बरोबर आहे?"
-                    audio_out, out_mime = await asyncio.to_thread(synth_mms, reply, language)
-                    tts_b64 = base64.b64encode(audio_out).decode("utf-8")
-                    await _send(ws, {"type":"assistant_message","text":reply,"ui":{"ui_intent":"question","questions_mr":["जुने की नवीन?"],"cards":[]},"ttsAudioB64":tts_b64,"ttsMime":out_mime})
-                    continue
-
-                await _send(ws, {"type":"agent_event","event":"AGENT_START"})
-                logger.info("Agent start session_id=%s text_len=%d", session_id, len(text))
-                assistant_text, ui_payload, tool_trace, pending2, state2 = await _with_timeout(
-                    "AGENT",
-                    run_agent_turn(
-                        conn=conn,
-                        session_id=session_id,
-                        utterance=text,
-                        stt_confidence=float(conf),
-                        profile=profile,
-                        pending=pending,
-                        state=state,
-                    ),
-                    int(getattr(settings, "agent_timeout_s", 45)),
-                )
-
-                pending = pending2
-                state = state2
-                logger.info("Agent done tool_events=%d ui_intent=%s", len(tool_trace), ui_payload.get("ui_intent"))
-                await _send(ws, {"type":"agent_event","event":"AGENT_DONE","payload":{"ui_intent": ui_payload.get("ui_intent")}})
-                save_session(conn, session_id, language, profile, pending, state)
-
-                for evt in tool_trace:
-                    if evt.get("type") == "tool_call":
-                        await _send(ws, {"type":"tool_call","tool":evt.get("tool"),"payload":evt.get("input")})
-                    elif evt.get("type") == "tool_result":
-                        await _send(ws, {"type":"tool_result","tool":evt.get("tool"),"payload":evt.get("output")})
-                    elif evt.get("type") == "plan":
-                        await _send(ws, {"type":"agent_event","event":"PLAN","payload":evt.get("plan")})
-
-                add_message(conn, session_id, "assistant", assistant_text)
-
-                await _send(ws, {"type":"agent_event","event":"TTS_START"})
-                t0 = time.perf_counter()
-                audio_out, out_mime = await _with_timeout(
-                    "TTS",
-                    asyncio.to_thread(synth_mms, assistant_text, language),
-                    int(getattr(settings, "tts_timeout_s", 25)),
-                )
-                audio_out = audio_out or b""
-                logger.info("TTS done bytes=%d ms=%.0f", len(audio_out), (time.perf_counter() - t0) * 1000)
-                await _send(ws, {"type":"agent_event","event":"TTS_DONE","payload":{"bytes": len(audio_out)}})
-                tts_b64 = base64.b64encode(audio_out).decode("utf-8")
-
-                await _send(ws, {"type":"assistant_message","text":assistant_text,"ui":ui_payload,"ttsAudioB64":tts_b64,"ttsMime":out_mime})
+                await _run_turn(ws, await _session(), language, text, conf, tts_stream)
 
             except Exception as e:
                 logger.exception("Turn error session_id=%s", session_id)
-                stage = "TURN"
-                msg_txt = str(e)
-                if isinstance(e, TimeoutError):
-                    stage = "TIMEOUT"
-                await _send(ws, {"type":"agent_event","event":"ERROR","payload":{"stage": stage, "message": msg_txt}})
-                reply = "क्षमस्व, थोडा वेळ लागला/अडचण आली. कृपया पुन्हा एकदा बोला."
-                audio_out, out_mime = await asyncio.to_thread(synth_mms, reply, language)
-                tts_b64 = base64.b64encode(audio_out).decode("utf-8")
-                await _send(ws, {"type":"assistant_message","text":reply,"ui":{"ui_intent":"error","questions_mr":["पुन्हा बोला."],"cards":[]},"ttsAudioB64":tts_b64,"ttsMime":out_mime})
-            finally:
-                if wav_path:
-                    cleanup_audio_file(wav_path)
+                await _send_error_reply(ws, language, e, tts_stream)
 
     except WebSocketDisconnect:
         logger.info("WS disconnected session_id=%s", session_id)
+    finally:
+        if stream is not None:
+            stream.abort()
+        for sess in held.values():
+            try:
+                await session_cache().close(sess)
+            except Exception:
+                logger.exception("Session flush on close failed session_id=%s", sess.session_id)
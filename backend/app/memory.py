@@ -4,6 +4,8 @@ import logging, re
 import difflib
 from typing import Any, Dict, Optional, Tuple
 
+from app.tools.rules import CATEGORY_ALIASES, DISTRICT_ALIASES
+
 logger = logging.getLogger("sevasetu")
 
 # -----------------------------
@@ -212,6 +214,69 @@ def parse_income_answer(utterance: str) -> Optional[int]:
     return None
 
 
+_OCCUPATION_HINTS = {
+    "farmer": ["शेतकरी", "शेती", "किसान", "farmer", "farming"],
+    "trader": ["व्यापारी", "दुकानदार", "trader", "shopkeeper", "business"],
+    "student": ["विद्यार्थी", "शिकतो", "शिकते", "student"],
+    "labourer": ["मजूर", "कामगार", "मजुरी", "labour", "labor", "worker"],
+    "fisherman": ["मच्छीमार", "कोळी", "fisherman"],
+    "homemaker": ["गृहिणी", "housewife", "homemaker"],
+    "unemployed": ["बेरोजगार", "unemployed"],
+}
+
+def _alias_in(text: str, aliases: Dict[str, set]) -> Optional[str]:
+    """Canonical key of the first alias found in `text`; short Latin aliases (sc, st)
+    only match as whole words."""
+    t = _to_ascii(text).lower()
+    words = set(re.findall(r"[a-z]+", t))
+    for canon, names in aliases.items():
+        for name in names:
+            if (name in words) if name.isascii() and len(name) <= 4 else (name in t):
+                return canon
+    return None
+
+# Occupation and district are only stored when recognised: a free-text answer ("hello",
+# "मी काम करतो") would otherwise fail every occupation_in / district_in rule for good.
+def parse_occupation_answer(utterance: str) -> Optional[str]:
+    t = (utterance or "").lower()
+    for canon, hints in _OCCUPATION_HINTS.items():
+        if any(h in t for h in hints):
+            return canon
+    return None
+
+def parse_district_answer(utterance: str) -> Optional[str]:
+    return _alias_in(utterance, DISTRICT_ALIASES)
+
+def parse_category_answer(utterance: str) -> Optional[str]:
+    return _alias_in(utterance, CATEGORY_ALIASES)
+
+def parse_land_answer(utterance: str) -> Optional[float]:
+    # Accept: "2 एकर", "दोन एकर", "१.५", "1 hectare", "20 गुंठे", "अर्धा एकर", "जमीन नाही"
+    raw = (utterance or "").strip()
+    t = _to_ascii(raw).lower()
+    # Only an explicit "no land": "माहित नाही" (don't know) must not become 0 acres
+    bare = re.sub(r"[!?.,।]+", " ", t).strip()
+    if ("जमीन नाही" in t or "no land" in t or bare in ("नाही", "no", "none")) and _extract_first_number(t) is None:
+        return 0.0
+    num = _extract_first_number(t)
+    if num is None:
+        if "अर्धा" in t or "half" in t:
+            num = 0.5
+        else:
+            # "एकर" contains "एक": drop unit words before looking for number words
+            wn = _word_number(re.sub(r"एकर|हेक्टर|गुंठे|गुंठा", " ", raw))
+            if wn is None:
+                return None
+            num = float(wn)
+    if "हेक्टर" in t or "hectare" in t:
+        num *= 2.471
+    elif "गुंठ" in t or "guntha" in t:
+        num /= 40.0  # 40 gunthas to an acre
+    if 0 <= num <= 10000:
+        return round(num, 2)
+    return None
+
+
 def parse_slot_answer(field: str, utterance: str) -> Optional[Any]:
     if field == "age":
         return parse_age_answer(utterance)
@@ -221,6 +286,14 @@ def parse_slot_answer(field: str, utterance: str) -> Optional[Any]:
         return parse_state_answer(utterance)
     if field == "income_annual":
         return parse_income_answer(utterance)
+    if field == "occupation":
+        return parse_occupation_answer(utterance)
+    if field == "district":
+        return parse_district_answer(utterance)
+    if field == "category":
+        return parse_category_answer(utterance)
+    if field == "land_holding_acres":
+        return parse_land_answer(utterance)
     return None
 
 
@@ -0,0 +1,137 @@
+from __future__ import annotations
+import asyncio, logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger("sevasetu")
+
+class RespError(Exception):
+    """Error reply from the server (`-ERR ...`), or a broken connection."""
+
+def encode_command(*args: Any) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for a in args:
+        b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+    return b"".join(out)
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """One RESP2 reply: str (+), int (:), bytes / None ($), list / None (*); `-` raises."""
+    line = await reader.readline()
+    if not line:
+        raise RespError("connection closed")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        raise RespError(body.decode("utf-8", "replace"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        n = int(body)
+        if n < 0:
+            return None
+        data = await reader.readexactly(n + 2)
+        return data[:-2]
+    if kind == b"*":
+        n = int(body)
+        if n < 0:
+            return None
+        items: List[Any] = []
+        for _ in range(n):
+            try:
+                items.append(await read_reply(reader))
+            except RespError as e:  # an EXEC reply can carry per-command errors
+                items.append(e)
+        return items
+    raise RespError(f"bad reply type {kind!r}")
+
+class RespConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def execute(self, *args: Any) -> Any:
+        self.writer.write(encode_command(*args))
+        await self.writer.drain()
+        return await read_reply(self.reader)
+
+    def close(self) -> None:
+        self.writer.close()
+
+class RespClient:
+    """Minimal pooled client for Redis-protocol servers (Redis, Valkey, KeyDB, ...).
+
+    Just what the session store needs: plain commands and WATCH/MULTI/EXEC on a
+    connection held for the duration of `connection()`. A connection that errored or
+    timed out is dropped rather than returned to the pool.
+    """
+
+    def __init__(self, url: str, pool_size: int = 8, timeout_s: float = 2.0):
+        u = urlparse(url)
+        if u.scheme not in ("redis", ""):
+            raise ValueError(f"unsupported session store url: {url}")
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 6379
+        self.password = u.password
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.timeout_s = float(timeout_s)
+        self._idle: List[RespConnection] = []
+        self._slots = asyncio.Semaphore(max(1, int(pool_size)))
+        self._pool_size = max(1, int(pool_size))
+        self.commands = 0
+        self.errors = 0
+
+    async def _connect(self) -> RespConnection:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout_s)
+        conn = RespConnection(reader, writer)
+        if self.password:
+            await conn.execute("AUTH", self.password)
+        if self.db:
+            await conn.execute("SELECT", self.db)
+        return conn
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[RespConnection]:
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else await self._connect()
+            try:
+                yield conn
+            except BaseException:
+                # mid-reply or with a WATCH pending: never hand this connection out again
+                conn.close()
+                raise
+            self._idle.append(conn)
+
+    async def execute(self, *args: Any) -> Any:
+        async with self.connection() as conn:
+            return await self.call(conn, *args)
+
+    async def call(self, conn: RespConnection, *args: Any) -> Any:
+        """`conn.execute` with the client's timeout (for use inside `connection()`)."""
+        self.commands += 1
+        try:
+            return await asyncio.wait_for(conn.execute(*args), self.timeout_s)
+        except RespError:
+            self.errors += 1
+            raise
+        except asyncio.TimeoutError as e:
+            self.errors += 1
+            raise RespError(f"{args[0]} timed out after {self.timeout_s}s") from e
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            self.errors += 1
+            raise RespError(f"{args[0]} failed: {e!r}") from e
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "server": f"{self.host}:{self.port}/{self.db}",
+            "pool_size": self._pool_size,
+            "idle": len(self._idle),
+            "commands": self.commands,
+            "errors": self.errors,
+        }
@@ -0,0 +1,239 @@
+"""In-process stand-in for a Redis-protocol server (dev and tests, not production).
+
+Implements the commands the session store uses, with WATCH/MULTI/EXEC semantics
+(EXEC aborts with a nil reply if a watched key changed) and lazy key expiry. Several
+app processes pointed at one stub share sessions like they would through Redis.
+
+Run from backend/:  python -m app.resp_stub [--port 6390]
+Then:               SESSION_STORE=redis SESSION_STORE_URL=redis://127.0.0.1:6390/0
+"""
+from __future__ import annotations
+import argparse, asyncio, logging, time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("sevasetu")
+
+class _Error(Exception):
+    pass
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, _Error):
+        return b"-%s\r\n" % str(value).encode("utf-8")
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode("utf-8")
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(_encode(v) for v in value)
+    raise TypeError(type(value))
+
+class RespStubServer:
+    def __init__(self):
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.revision: Dict[bytes, int] = {}  # bumped on every change, for WATCH
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.port = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "RespStubServer":
+        self._server = await asyncio.start_server(self._client, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # --- keyspace ---
+
+    def _alive(self, key: bytes) -> bool:
+        exp = self.expires.get(key)
+        if exp is not None and exp <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+            self._touch(key)
+        return key in self.data
+
+    def _touch(self, key: bytes) -> None:
+        self.revision[key] = self.revision.get(key, 0) + 1
+
+    def _get(self, key: bytes, kind: type) -> Any:
+        if not self._alive(key):
+            return None
+        value = self.data[key]
+        if not isinstance(value, kind):
+            raise _Error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _run(self, name: str, args: List[bytes]) -> Any:
+        if name == "PING":
+            return "PONG"
+        if name in ("AUTH", "SELECT", "FLUSHALL"):
+            if name == "FLUSHALL":
+                for k in list(self.data):
+                    self._touch(k)
+                self.data.clear()
+                self.expires.clear()
+            return "OK"
+        if name == "GET":
+            return self._get(args[0], bytes)
+        if name == "SET":
+            self.data[args[0]] = args[1]
+            self.expires.pop(args[0], None)
+            self._touch(args[0])
+            return "OK"
+        if name == "DEL":
+            n = 0
+            for k in args:
+                if self._alive(k):
+                    del self.data[k]
+                    self.expires.pop(k, None)
+                    self._touch(k)
+                    n += 1
+            return n
+        if name == "EXISTS":
+            return sum(1 for k in args if self._alive(k))
+        if name == "EXPIRE":
+            if not self._alive(args[0]):
+                return 0
+            self.expires[args[0]] = time.time() + int(args[1])
+            self._touch(args[0])
+            return 1
+        if name == "TTL":
+            if not self._alive(args[0]):
+                return -2
+            exp = self.expires.get(args[0])
+            return -1 if exp is None else int(exp - time.time())
+        if name == "HSET":
+            h = self._get(args[0], dict)
+            if h is None:
+                h = self.data[args[0]] = {}
+            added = sum(1 for f in args[1::2] if f not in h)
+            for f, v in zip(args[1::2], args[2::2]):
+                h[f] = v
+            self._touch(args[0])
+            return added
+        if name == "HGETALL":
+            h = self._get(args[0], dict) or {}
+            return [x for kv in h.items() for x in kv]
+        if name == "HMGET":
+            h = self._get(args[0], dict) or {}
+            return [h.get(f) for f in args[1:]]
+        if name == "INCRBY":
+            v = int(self._get(args[0], bytes) or b"0") + int(args[1])
+            self.data[args[0]] = str(v).encode()
+            self._touch(args[0])
+            return v
+        if name == "RPUSH":
+            lst = self._get(args[0], list)
+            if lst is None:
+                lst = self.data[args[0]] = []
+            lst.extend(args[1:])
+            self._touch(args[0])
+            return len(lst)
+        if name in ("LRANGE", "LTRIM"):
+            lst = self._get(args[0], list) or []
+            n = len(lst)
+            start, stop = int(args[1]), int(args[2])
+            start = max(0, start + n if start < 0 else start)
+            stop = stop + n if stop < 0 else min(stop, n - 1)
+            part = lst[start:stop + 1] if start <= stop else []
+            if name == "LRANGE":
+                return part
+            if args[0] in self.data:
+                if part:
+                    self.data[args[0]] = part
+                else:
+                    del self.data[args[0]]
+                self._touch(args[0])
+            return "OK"
+        if name == "LLEN":
+            return len(self._get(args[0], list) or [])
+        raise _Error(f"ERR unknown command '{name}'")
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        watched: Dict[bytes, int] = {}
+        queued: Optional[List[Tuple[str, List[bytes]]]] = None
+        try:
+            while True:
+                cmd = await _read_command(reader)
+                if cmd is None:
+                    break
+                name, args = cmd[0].decode().upper(), cmd[1:]
+                if name == "WATCH":
+                    for k in args:
+                        self._alive(k)
+                        watched[k] = self.revision.get(k, 0)
+                    reply: Any = "OK"
+                elif name == "UNWATCH":
+                    watched.clear()
+                    reply = "OK"
+                elif name == "MULTI":
+                    queued = []
+                    reply = "OK"
+                elif name == "DISCARD":
+                    queued = None
+                    watched.clear()
+                    reply = "OK"
+                elif name == "EXEC":
+                    if queued is None:
+                        reply = _Error("ERR EXEC without MULTI")
+                    else:
+                        for k in watched:
+                            self._alive(k)
+                        if any(self.revision.get(k, 0) != v for k, v in watched.items()):
+                            reply = None  # aborted: someone else wrote a watched key
+                        else:
+                            reply = []
+                            for n, a in queued:
+                                try:
+                                    reply.append(self._run(n, a))
+                                except _Error as e:
+                                    reply.append(e)
+                        queued = None
+                        watched.clear()
+                elif queued is not None:
+                    queued.append((name, args))
+                    reply = "QUEUED"
+                else:
+                    try:
+                        reply = self._run(name, args)
+                    except _Error as e:
+                        reply = e
+                writer.write(b"*-1\r\n" if reply is None and name == "EXEC" else _encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.strip().split()  # inline command (e.g. `redis-cli` / telnet)
+    parts = []
+    for _ in range(int(line[1:-2])):
+        n = int((await reader.readline())[1:-2])
+        parts.append((await reader.readexactly(n + 2))[:-2])
+    return parts
+
+async def _main(host: str, port: int) -> None:
+    stub = await RespStubServer().start(host, port)
+    print(f"RESP stub listening on {host}:{stub.port}")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6390)
+    args = ap.parse_args()
+    asyncio.run(_main(args.host, args.port))
@@ -0,0 +1,173 @@
+from __future__ import annotations
+import asyncio, gzip, json, logging, os, sqlite3, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Tuple
+
+from app.db import SESSION_JSON_COLUMNS, connect
+
+logger = logging.getLogger("sevasetu")
+
+_stats: Dict[str, Any] = {"runs": 0, "sessions_archived": 0, "messages_archived": 0, "last_run_at": None, "last_error": None}
+
+def retention_stats() -> Dict[str, Any]:
+    return dict(_stats)
+
+def _month(ts: float) -> str:
+    return time.strftime("%Y-%m", time.gmtime(ts))
+
+def _chunks(items: List[Any], n: int = 500) -> Iterable[List[Any]]:
+    for i in range(0, len(items), n):
+        yield items[i:i + n]
+
+def _append_archive(archive_dir: Path, records: List[Tuple[str, Dict[str, Any]]]) -> None:
+    """Append JSON lines to `<archive_dir>/<YYYY-MM>.jsonl.gz` and fsync.
+
+    Each call adds one gzip member; multi-member files read back as one stream
+    (`gzip.open`, `zcat`).
+    """
+    by_month: Dict[str, List[bytes]] = {}
+    for month, rec in records:
+        by_month.setdefault(month, []).append((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    for month, lines in sorted(by_month.items()):
+        with open(archive_dir / f"{month}.jsonl.gz", "ab") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                gz.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+class Batch(NamedTuple):
+    records: List[Tuple[str, Dict[str, Any]]]  # (YYYY-MM, archive record)
+    # session_id -> (updated_at as read, or None for orphan messages; archived message ids)
+    rows: Dict[str, Tuple[float | None, List[int]]]
+
+def collect_batch(conn: sqlite3.Connection, cutoff: float, batch_size: int = 500, exclude: Iterable[str] = ()) -> Batch:
+    """Read up to `batch_size` sessions idle since before `cutoff` (with all their
+    messages), plus orphan messages older than `cutoff`, as archive records.
+
+    Read-only, so it runs on the read pool; sessions in `exclude` (held by a live
+    connection) are skipped.
+    """
+    exclude = set(exclude)
+    cur = conn.cursor()
+    rows = cur.execute(
+      "SELECT * FROM sessions WHERE updated_at < ? ORDER BY updated_at LIMIT ?",
+      (cutoff, int(batch_size) + len(exclude))
+    ).fetchall()
+    sessions = [r for r in rows if r["session_id"] not in exclude][:int(batch_size)]
+
+    batch = Batch([], {})
+    for r in sessions:
+        msgs = [dict(m) for m in cur.execute(
+          "SELECT id, role, text, ts FROM messages WHERE session_id=? ORDER BY id", (r["session_id"],)
+        ).fetchall()]
+        rec = {"type": "session", "session_id": r["session_id"], "language": r["language"], "updated_at": r["updated_at"]}
+        rec.update({c[:-5]: json.loads(r[c]) for c in SESSION_JSON_COLUMNS})
+        rec["messages"] = msgs
+        batch.records.append((_month(r["updated_at"]), rec))
+        batch.rows[r["session_id"]] = (r["updated_at"], [m["id"] for m in msgs])
+
+    # Messages whose session row is gone (or was never written)
+    orphans = cur.execute(
+      """SELECT id, session_id, role, text, ts FROM messages m
+         WHERE m.ts < ? AND NOT EXISTS (SELECT 1 FROM sessions s WHERE s.session_id = m.session_id)
+         ORDER BY m.ts LIMIT ?""",
+      (cutoff, int(batch_size))
+    ).fetchall()
+    grouped: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for m in orphans:
+        if m["session_id"] in exclude:
+            continue
+        grouped.setdefault((m["session_id"], _month(m["ts"])), []).append({k: m[k] for k in ("id", "role", "text", "ts")})
+        batch.rows.setdefault(m["session_id"], (None, []))[1].append(m["id"])
+    for (sid, month), msgs in grouped.items():
+        batch.records.append((month, {"type": "messages", "session_id": sid, "messages": msgs}))
+    return batch
+
+def delete_batch(conn: sqlite3.Connection, batch: Batch, vacuum_pages: int = 1000) -> Tuple[int, int]:
+    """Delete the archived rows of `batch` (a writer job). Returns (sessions, messages) deleted.
+
+    A session written to since `collect_batch` read it (or an orphan whose session row
+    came back) is left alone: its archived lines become harmless duplicates.
+    """
+    cur = conn.cursor()
+    current: Dict[str, float] = {}
+    for chunk in _chunks(list(batch.rows)):
+        marks = ",".join("?" * len(chunk))
+        for r in cur.execute(f"SELECT session_id, updated_at FROM sessions WHERE session_id IN ({marks})", chunk):
+            current[r["session_id"]] = r["updated_at"]
+    stale = {sid: ids for sid, (updated_at, ids) in batch.rows.items() if current.get(sid) == updated_at}
+    sessions = [sid for sid in stale if batch.rows[sid][0] is not None]
+    message_ids = [i for ids in stale.values() for i in ids]
+    for chunk in _chunks(sessions):
+        cur.execute(f"DELETE FROM sessions WHERE session_id IN ({','.join('?' * len(chunk))})", chunk)
+    for chunk in _chunks(message_ids):
+        cur.execute(f"DELETE FROM messages WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+    if vacuum_pages > 0 and cur.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        # Return freed pages to the OS a slice at a time instead of a full VACUUM
+        cur.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})").fetchall()
+    conn.commit()
+    logger.info("Retention archived sessions=%d messages=%d", len(sessions), len(message_ids))
+    return len(sessions), len(message_ids)
+
+def archive_batch(
+    conn: sqlite3.Connection,
+    cutoff: float,
+    archive_dir: str,
+    batch_size: int = 500,
+    exclude: Iterable[str] = (),
+    vacuum_pages: int = 1000,
+) -> Tuple[int, int]:
+    """Move one batch into monthly archives on a single connection (offline use).
+
+    The archive is written and fsynced before the rows are deleted, so a crash in
+    between can only duplicate lines in the archive, never lose them. Returns
+    (sessions, messages) moved.
+    """
+    batch = collect_batch(conn, cutoff, batch_size, exclude)
+    if not batch.records:
+        return 0, 0
+    _append_archive(Path(archive_dir), batch.records)
+    return delete_batch(conn, batch, vacuum_pages)
+
+def checkpoint_wal(path: str | None = None) -> Tuple[int, int, int]:
+    """Fold the WAL back into the main file and truncate it: (busy, wal pages, checkpointed)."""
+    conn = connect(path)
+    try:
+        return tuple(conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone())
+    finally:
+        conn.close()
+
+async def run_retention(db, days: float, archive_dir: str, batch_size: int = 500, exclude: Iterable[str] = (), vacuum_pages: int = 1000) -> Tuple[int, int]:
+    """Archive everything older than `days` from `db` (app.database.Database holding
+    sessions: the main file or one shard), one writer job per batch, then checkpoint its WAL."""
+    cutoff = time.time() - float(days) * 86400
+    loop = asyncio.get_running_loop()
+    exclude = list(exclude)
+    total_s = total_m = 0
+    try:
+        while True:
+            # Only the DELETEs go through the writer: reading and the gzip + fsync would
+            # otherwise hold its write transaction and stall every queued session write
+            batch = await db.read(collect_batch, cutoff, batch_size, exclude)
+            if not batch.records:
+                break
+            await loop.run_in_executor(None, _append_archive, Path(archive_dir), batch.records)
+            n_s, n_m = await db.write(delete_batch, batch, vacuum_pages)
+            total_s += n_s
+            total_m += n_m
+            if not (n_s or n_m):
+                break
+            await asyncio.sleep(0)  # let queued session writes in between batches
+        if total_s or total_m:
+            await loop.run_in_executor(None, checkpoint_wal, db.path)
+        _stats["last_error"] = None
+    except Exception as exc:
+        _stats["last_error"] = repr(exc)
+        raise
+    finally:
+        _stats["runs"] += 1
+        _stats["sessions_archived"] += total_s
+        _stats["messages_archived"] += total_m
+        _stats["last_run_at"] = time.time()
+    return total_s, total_m
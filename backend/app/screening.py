@@ -0,0 +1,284 @@
+"""Bulk eligibility screening: many household profiles against the whole catalog.
+
+Rows (JSONL objects or CSV with a header line) are read incrementally, cut into chunks
+and screened in a process pool with a bounded number of chunks in flight, so memory
+stays flat however large the upload is. Results come back as NDJSON, one line per row
+in completion order (each carries its 1-based `row`), then one `summary` line. Workers
+return their chunk already encoded, so the parent process only forwards text.
+"""
+from __future__ import annotations
+import asyncio, csv, json, logging, multiprocessing, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from app.catalog import catalog
+from app.tools.eligibility_table import eligibility_table
+
+logger = logging.getLogger("sevasetu")
+
+Row = Tuple[int, Any]  # (row number, profile dict | error string)
+
+MAX_LINE_BYTES = 64 * 1024
+
+# --- Worker process side ---
+# Kept free of app.settings: a worker only needs the catalog and the rule table.
+
+def _screen_chunk(rows: List[Row]) -> Tuple[str, int, int, int]:
+    """Screen one chunk; returns (NDJSON lines, rows, error rows, rows with an eligible
+    scheme). Encoding here keeps the parent down to forwarding text."""
+    snap = catalog()
+    table = eligibility_table(snap)
+    version = snap.version[:12]
+    good = [p for _, p in rows if isinstance(p, dict)]
+    summaries = iter(table.evaluate_batch(good).summaries() if good else [])
+    lines: List[str] = []
+    errors = eligible = 0
+    for row_no, profile in rows:
+        if not isinstance(profile, dict):
+            errors += 1
+            result: Dict[str, Any] = {"row": row_no, "error": str(profile)}
+        else:
+            summary = next(summaries)
+            eligible += bool(summary["eligible"])
+            result = {
+                "row": row_no,
+                "id": profile.get("id"),
+                "catalog_version": version,
+                "eligible": summary["eligible"],
+                "needs_more_info": [{"scheme_id": e["scheme_id"], "missing_fields": e["missing_fields"]} for e in summary["needs_more_info"]],
+                "not_eligible": [{"scheme_id": e["scheme_id"], "failed_rules": e["failed_rules"]} for e in summary["not_eligible"]],
+            }
+        lines.append(json.dumps(result, ensure_ascii=False))
+    return "\n".join(lines) + "\n", len(rows), errors, eligible
+
+def _screen_ping() -> bool:
+    eligibility_table()
+    return True
+
+# --- Row parsing ---
+
+class RowParser:
+    """Turns byte chunks of a JSONL or CSV upload into (row, profile) pairs.
+
+    CSV needs a header line; empty cells are dropped (a blank field is a missing one).
+    Quoted CSV fields may not span lines. A line that does not parse, or runs past
+    `max_line_bytes`, becomes an error row rather than failing the whole upload; the
+    rest of an overlong line is skipped unbuffered, so memory stays bounded even for an
+    upload without newlines.
+    """
+
+    def __init__(self, fmt: str, max_line_bytes: int = MAX_LINE_BYTES):
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"unknown format {fmt!r} (jsonl | csv)")
+        self.fmt = fmt
+        self.max_line_bytes = max(1, int(max_line_bytes))
+        self.header: Optional[List[str]] = None
+        self.rows = 0
+        self._buf = b""
+        self._overlong = False
+
+    def feed(self, data: bytes) -> List[Row]:
+        *lines, tail = data.split(b"\n")
+        out = [r for r in (self._end_line(l) for l in lines) if r is not None]
+        self._append(tail)
+        return out
+
+    def close(self) -> List[Row]:
+        row = self._end_line(b"")
+        return [row] if row is not None else []
+
+    def _append(self, part: bytes) -> None:
+        if self._overlong:
+            return
+        self._buf += part
+        if len(self._buf) > self.max_line_bytes:
+            self._buf, self._overlong = b"", True
+
+    def _end_line(self, part: bytes) -> Optional[Row]:
+        self._append(part)
+        line, self._buf = self._buf, b""
+        if self._overlong:
+            self._overlong = False
+            self.rows += 1
+            return self.rows, f"line longer than {self.max_line_bytes} bytes"
+        return self._line(line)
+
+    def _line(self, raw: bytes) -> Optional[Row]:
+        text = raw.decode("utf-8-sig", "replace").rstrip("\r")
+        if not text.strip():
+            return None
+        if self.fmt == "csv" and self.header is None:
+            self.header = [h.strip() for h in next(csv.reader([text]))]
+            return None
+        self.rows += 1
+        try:
+            if self.fmt == "jsonl":
+                profile = json.loads(text)
+                if not isinstance(profile, dict):
+                    return self.rows, "row is not a JSON object"
+                return self.rows, profile
+            # strict: an unterminated quote (a field spanning lines) is an error, not a value
+            cells = next(csv.reader([text], strict=True))
+            return self.rows, {h: v.strip() for h, v in zip(self.header, cells) if h and v.strip()}
+        except (ValueError, csv.Error) as e:
+            return self.rows, f"unparseable row: {e}"
+
+def read_rows(lines: Iterable[bytes], fmt: str, max_line_bytes: int = MAX_LINE_BYTES) -> Iterable[Row]:
+    """RowParser over an iterable of byte chunks (e.g. a file opened in binary mode)."""
+    parser = RowParser(fmt, max_line_bytes)
+    for data in lines:
+        yield from parser.feed(data)
+    yield from parser.close()
+
+def format_for(content_type: str | None, filename: str | None = None) -> str:
+    ct, name = (content_type or "").lower(), (filename or "").lower()
+    return "csv" if "csv" in ct or name.endswith(".csv") else "jsonl"
+
+# --- Parent side ---
+
+class Screener:
+    """Fans row chunks out to `workers` processes (0: a thread in this process).
+
+    At most `inflight` chunks are queued or running; a chunk's results are yielded as
+    soon as it finishes, so the producer (request body or file) is only read as fast
+    as results are consumed.
+    """
+
+    def __init__(self, workers: int = 2, chunk_rows: int = 500, inflight: int = 0):
+        self.workers = max(0, int(workers))
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.inflight = max(1, int(inflight) or 2 * max(1, self.workers))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.rows = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.restarts = 0
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers == 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # spawn: never fork a process that may already hold torch / CTranslate2 threads
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                for _ in range(self.workers):
+                    self._executor.submit(_screen_ping)
+                logger.info("Screening pool started workers=%d", self.workers)
+            return self._executor
+
+    async def _run(self, chunk: List[Row]) -> Tuple[str, int, int, int]:
+        loop = asyncio.get_running_loop()
+        pool = self._pool()
+        try:
+            return await loop.run_in_executor(pool, _screen_chunk, chunk)
+        except BrokenProcessPool:
+            # A worker died (OOM, kill): fail this chunk's rows, start a fresh pool for the next
+            logger.exception("Screening pool broken rows=%d", len(chunk))
+            with self._lock:
+                if self._executor is pool:
+                    self._executor = None
+                    self.restarts += 1
+            pool.shutdown(wait=False, cancel_futures=True)
+            lines = "".join(json.dumps({"row": n, "error": "screening worker failed"}) + "\n" for n, _ in chunk)
+            return lines, len(chunk), len(chunk), 0
+
+    async def screen(self, rows: AsyncIterator[Row], max_rows: int = 0) -> AsyncIterator[str]:
+        """NDJSON text, one finished chunk at a time, ending with the `summary` line."""
+        t0 = time.perf_counter()
+        pending: set = set()
+        totals = [0, 0, 0]  # rows, errors, rows with an eligible scheme
+        truncated = False
+
+        def collect(tasks) -> List[str]:
+            out = []
+            for task in tasks:
+                text, n, errors, eligible = task.result()
+                totals[0] += n
+                totals[1] += errors
+                totals[2] += eligible
+                out.append(text)
+            return out
+
+        chunk: List[Row] = []
+        seen = 0
+        async for row in rows:
+            if max_rows and seen >= max_rows:
+                truncated = True
+                break
+            seen += 1
+            chunk.append(row)
+            if len(chunk) < self.chunk_rows:
+                continue
+            if len(pending) >= self.inflight:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for text in collect(finished):
+                    yield text
+            pending.add(asyncio.ensure_future(self._run(chunk)))
+            chunk = []
+            await asyncio.sleep(0)  # let the task hand its chunk to the pool before reading on
+            finished = {t for t in pending if t.done()}
+            pending -= finished
+            for text in collect(finished):
+                yield text
+        if chunk:
+            pending.add(asyncio.ensure_future(self._run(chunk)))
+        while pending:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for text in collect(finished):
+                yield text
+
+        elapsed = time.perf_counter() - t0
+        done_rows, errors, eligible = totals
+        self.jobs += 1
+        self.rows += done_rows
+        self.errors += errors
+        self.busy_s += elapsed
+        logger.info("Screening done rows=%d errors=%d ms=%.0f", done_rows, errors, elapsed * 1000)
+        yield json.dumps({"summary": {
+            "rows": done_rows,
+            "errors": errors,
+            "with_eligible_scheme": eligible,
+            "truncated": truncated,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "rows_per_s": round(done_rows / elapsed, 1) if elapsed > 0 else None,
+            "catalog_version": catalog().version[:12],
+        }}) + "\n"
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "chunk_rows": self.chunk_rows,
+            "inflight": self.inflight,
+            "jobs": self.jobs,
+            "rows": self.rows,
+            "errors": self.errors,
+            "restarts": self.restarts,
+            "rows_per_s": round(self.rows / self.busy_s, 1) if self.busy_s else None,
+        }
+
+_screener: Optional[Screener] = None
+
+def screener() -> Screener:
+    global _screener
+    if _screener is None:
+        from app.settings import settings
+        _screener = Screener(int(settings.screening_workers), int(settings.screening_chunk_rows),
+                             int(settings.screening_inflight_chunks))
+    return _screener
+
+def shutdown_screener() -> None:
+    if _screener is not None:
+        _screener.shutdown()
+
+async def aiter_rows(rows: Iterable[Row]) -> AsyncIterator[Row]:
+    for row in rows:
+        yield row
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import json, logging, time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.settings import settings
+from app.database import Database
+from app.db import SESSION_JSON_COLUMNS, list_messages, load_session_row, write_session_delta
+from app.resp import RespClient
+
+logger = logging.getLogger("sevasetu")
+
+class SessionConflict(Exception):
+    """Another writer (process or node) changed the session since it was loaded."""
+
+class StoredSession(NamedTuple):
+    language: str
+    columns: Dict[str, str]  # *_json column -> encoded JSON
+    version: int
+
+class SessionStore(ABC):
+    """Where session rows and message logs live; the SessionCache sits in front of it.
+
+    `save()` is optimistic: column writes only land if the stored version still equals
+    `expected_version` (or, for `is_new`, if the session does not exist yet), otherwise
+    SessionConflict. Message-only saves append without a version check.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def load(self, session_id: str) -> Optional[StoredSession]:
+        ...
+
+    @abstractmethod
+    async def save(self, session_id: str, language: str, columns: Dict[str, str], is_new: bool,
+                   messages: List[Tuple[str, str, float]], expected_version: int) -> int:
+        ...
+
+    @abstractmethod
+    async def messages(self, session_id: str, limit: int, before_id: int | None = None, after_id: int | None = None):
+        """Same contract as db.list_messages: (page oldest-first, has_more)."""
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+class SqliteSessionStore(SessionStore):
+    """Sessions in SQLite (the main file or its shards): one node, or several worker
+    processes sharing the file."""
+
+    name = "sqlite"
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def load(self, session_id: str) -> Optional[StoredSession]:
+        row = await self.db.for_session(session_id).read(load_session_row, session_id)
+        if not row:
+            return None
+        return StoredSession(row["language"], {c: row[c] for c in SESSION_JSON_COLUMNS}, int(row["version"]))
+
+    async def save(self, session_id, language, columns, is_new, messages, expected_version) -> int:
+        version = await self.db.for_session(session_id).write(
+            write_session_delta, session_id, language, columns, is_new, messages, expected_version
+        )
+        if version is None:
+            raise SessionConflict(session_id)
+        return version
+
+    async def messages(self, session_id, limit, before_id=None, after_id=None):
+        return await self.db.for_session(session_id).read(list_messages, session_id, limit, before_id, after_id)
+
+class RedisSessionStore(SessionStore):
+    """Sessions in a Redis-protocol server, shared by every node behind the balancer.
+
+    `<prefix>s:<id>` is a hash (language, *_json, version, updated_at), `<prefix>m:<id>`
+    a list of JSON messages capped at `max_messages` and `<prefix>n:<id>` the message id
+    counter; all expire `ttl_s` after the last write. Column writes are WATCH/MULTI/EXEC
+    on the hash, so a write based on a stale version is rejected by the server, not
+    overwritten. Appending messages never touches the hash, so it cannot abort one.
+    """
+
+    name = "redis"
+
+    def __init__(self, client: RespClient, prefix: str = "sevasetu:", ttl_s: int = 30 * 86400, max_messages: int = 500):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_s = int(ttl_s)
+        self.max_messages = max(1, int(max_messages))
+        self.conflicts = 0
+
+    def _keys(self, session_id: str) -> Tuple[str, str, str]:
+        return f"{self.prefix}s:{session_id}", f"{self.prefix}m:{session_id}", f"{self.prefix}n:{session_id}"
+
+    async def load(self, session_id: str) -> Optional[StoredSession]:
+        hkey, _, _ = self._keys(session_id)
+        flat = await self.client.execute("HGETALL", hkey)
+        h = {flat[i].decode(): flat[i + 1].decode("utf-8") for i in range(0, len(flat or []), 2)}
+        if not all(c in h for c in SESSION_JSON_COLUMNS):
+            return None
+        return StoredSession(h.get("language") or "", {c: h[c] for c in SESSION_JSON_COLUMNS}, int(h.get("version") or 0))
+
+    async def save(self, session_id, language, columns, is_new, messages, expected_version) -> int:
+        hkey, mkey, nkey = self._keys(session_id)
+        async with self.client.connection() as conn:
+            call = self.client.call
+            entries: List[str] = []
+            if messages:
+                # Reserve message ids up front; an aborted write only leaves a gap
+                last = await call(conn, "INCRBY", nkey, len(messages))
+                first = int(last) - len(messages) + 1
+                entries = [json.dumps({"id": first + i, "role": r, "text": t, "ts": ts}, ensure_ascii=False)
+                           for i, (r, t, ts) in enumerate(messages)]
+            version = expected_version
+            if columns or is_new:
+                await call(conn, "WATCH", hkey)
+                current = (await call(conn, "HMGET", hkey, "version"))[0]
+                current = int(current) if current is not None else None
+                if (current is not None) if is_new else (current != expected_version):
+                    await call(conn, "UNWATCH")
+                    self.conflicts += 1
+                    raise SessionConflict(session_id)
+                version = (current or 0) + 1
+            await call(conn, "MULTI")
+            if columns or is_new:
+                fields: List[Any] = ["language", language, "updated_at", repr(time.time()), "version", version]
+                for c, raw in columns.items():
+                    fields += [c, raw]
+                await call(conn, "HSET", hkey, *fields)
+                await call(conn, "EXPIRE", hkey, self.ttl_s)
+            if entries:
+                await call(conn, "RPUSH", mkey, *entries)
+                await call(conn, "LTRIM", mkey, -self.max_messages, -1)
+                await call(conn, "EXPIRE", mkey, self.ttl_s)
+                await call(conn, "EXPIRE", nkey, self.ttl_s)
+            if await call(conn, "EXEC") is None:
+                self.conflicts += 1
+                raise SessionConflict(session_id)
+        return version
+
+    async def messages(self, session_id, limit, before_id=None, after_id=None):
+        _, mkey, _ = self._keys(session_id)
+        msgs = [json.loads(x) for x in await self.client.execute("LRANGE", mkey, 0, -1)]
+        if after_id is not None:
+            newer = [m for m in msgs if m["id"] > int(after_id)]
+            return newer[:limit], len(newer) > limit
+        older = [m for m in msgs if before_id is None or m["id"] < int(before_id)]
+        return older[-limit:], len(older) > limit
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "conflicts": self.conflicts, "client": self.client.stats()}
+
+def make_session_store(db: Database) -> SessionStore:
+    backend = (settings.session_store or "sqlite").strip().lower()
+    if backend == "redis":
+        client = RespClient(settings.session_store_url, pool_size=int(settings.session_store_pool_size),
+                            timeout_s=float(settings.session_store_timeout_s))
+        logger.info("Session store redis server=%s:%s", client.host, client.port)
+        return RedisSessionStore(client, settings.session_store_prefix, int(settings.session_store_ttl_s),
+                                 int(settings.session_store_max_messages))
+    if backend != "sqlite":
+        raise ValueError(f"unknown SESSION_STORE={settings.session_store!r} (sqlite | redis)")
+    return SqliteSessionStore(db)
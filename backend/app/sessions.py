@@ -0,0 +1,287 @@
+from __future__ import annotations
+import asyncio, json, logging, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db import SESSION_JSON_COLUMNS, new_session_blobs
+from app.session_store import SessionConflict, SessionStore, StoredSession
+
+logger = logging.getLogger("sevasetu")
+
+# Compare-and-set retries after a version conflict before the merge waits for the next flush
+MAX_REBASE_ATTEMPTS = 3
+_ABSENT = object()
+
+def merge_column(base: Any, ours: Any, theirs: Any) -> Tuple[Any, List[str]]:
+    """Three-way merge of one decoded JSON column: (merged value, keys where both sides
+    changed and the stored value was kept). Dicts merge per top-level key."""
+    if ours == base or ours == theirs:
+        return theirs, []
+    if theirs == base:
+        return ours, []
+    if not (isinstance(base, dict) and isinstance(ours, dict) and isinstance(theirs, dict)):
+        return theirs, ["*"]
+    merged = dict(theirs)
+    conflicts: List[str] = []
+    for k in set(base) | set(ours):
+        b, o, t = base.get(k, _ABSENT), ours.get(k, _ABSENT), theirs.get(k, _ABSENT)
+        if o == b or o == t:
+            continue
+        if t == b:
+            if o is _ABSENT:
+                merged.pop(k, None)
+            else:
+                merged[k] = o
+        else:
+            conflicts.append(k)
+    return merged, sorted(conflicts)
+
+class CachedSession:
+    """In-memory copy of one session row plus messages not yet written.
+
+    Callers mark fields dirty with `update()`; `flush()` re-encodes only those fields,
+    drops the ones whose JSON did not actually change, and saves the rest together with
+    buffered messages as one store write, conditional on `version` still being current.
+    """
+
+    def __init__(self, session_id: str, language: str):
+        self.session_id = session_id
+        self.language = language
+        self.profile: Dict[str, Any] = {}
+        self.pending: Dict[str, Any] = {}
+        self.state: Dict[str, Any] = {}
+        self.is_new = False
+        self.version = 0
+        self.refs = 0
+        self.last_flush = time.monotonic()
+        self._persisted: Dict[str, str] = {}   # column -> JSON last written / loaded
+        self._dirty: set = set()
+        self._messages: List[Tuple[str, str, float]] = []
+        self._flush_lock = asyncio.Lock()
+        self.conflicts = 0
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty or self._messages or self.is_new)
+
+    def update(self, profile: Dict[str, Any] | None = None, pending: Dict[str, Any] | None = None, state: Dict[str, Any] | None = None) -> None:
+        """Replace and/or mark fields as (possibly) modified; in-place edits count too."""
+        for name, value in (("profile", profile), ("pending", pending), ("state", state)):
+            if value is not None:
+                setattr(self, name, value)
+                self._dirty.add(name)
+
+    def add_message(self, role: str, text: str) -> None:
+        self._messages.append((role, text, time.time()))
+
+    def _load(self, stored: StoredSession) -> None:
+        self._persisted = dict(stored.columns)
+        self.profile, self.pending, self.state = (json.loads(stored.columns[c]) for c in SESSION_JSON_COLUMNS)
+        self.version = stored.version
+        self.is_new = False
+
+    def _pending_columns(self) -> Dict[str, str]:
+        names = ("profile", "pending", "state") if self.is_new else sorted(self._dirty)
+        out: Dict[str, str] = {}
+        for name in names:
+            col = f"{name}_json"
+            raw = json.dumps(getattr(self, name), ensure_ascii=False)
+            if self.is_new or raw != self._persisted.get(col):
+                out[col] = raw
+        return out
+
+    async def flush(self, store: SessionStore) -> Tuple[int, int]:
+        """Write buffered changes; returns (columns written, dirty columns not written).
+
+        Changes made while the write is in flight stay buffered for the next flush. If
+        another node or process saved the session since we loaded it, our changes are
+        rebased onto its version and the write retried (see `_rebase`).
+        """
+        async with self._flush_lock:
+            if not self.dirty:
+                return 0, 0
+            considered = 3 if self.is_new else len(self._dirty)
+            columns = self._pending_columns()
+            dirty = {"profile", "pending", "state"} if self.is_new else self._dirty
+            self._dirty = set()
+            messages, self._messages = self._messages, []
+            if columns or messages:
+                try:
+                    self.version = await store.save(self.session_id, self.language, columns, self.is_new, messages, self.version)
+                except SessionConflict:
+                    written = await self._rebase(store, dirty, messages)
+                    self.last_flush = time.monotonic()
+                    return written, 0
+                except asyncio.CancelledError:
+                    # Most likely still committed (the SQLite job is already queued)
+                    self._persisted.update(columns)
+                    if columns or self.is_new:
+                        self.version += 1
+                    self.is_new = False
+                    raise
+                except Exception:
+                    self._dirty |= dirty
+                    self._messages[:0] = messages
+                    raise
+                self._persisted.update(columns)
+            self.is_new = False
+            self.last_flush = time.monotonic()
+            return len(columns), considered - len(columns)
+
+    async def _rebase(self, store: SessionStore, dirty: set, messages: List[Tuple[str, str, float]]) -> int:
+        """Re-apply our dirty columns onto the stored version and retry the write.
+
+        Three-way merge against what we last loaded / wrote: keys only we changed are
+        kept, keys only the other writer changed are taken, and keys both changed keep
+        the stored value (logged). Returns the columns written; if every retry loses the
+        race, the merged copy stays dirty (with the messages) for the next flush.
+        """
+        defaults = dict(zip(("profile", "pending", "state"), new_session_blobs(self.session_id)))
+        for _ in range(MAX_REBASE_ATTEMPTS):
+            self.conflicts += 1
+            fresh = await store.load(self.session_id)
+            if fresh is None:
+                # Gone from the store (expired / archived): write our copy back as new
+                logger.warning("Session vanished from store, re-creating session_id=%s", self.session_id)
+                self.is_new = True
+                columns = self._pending_columns()
+                try:
+                    self.version = await store.save(self.session_id, self.language, columns, True, messages, 0)
+                except SessionConflict:
+                    continue
+                self._persisted.update(columns)
+                self.is_new = False
+                return len(columns)
+            columns: Dict[str, str] = {}
+            for name in sorted(dirty):
+                col = f"{name}_json"
+                base = json.loads(self._persisted[col]) if col in self._persisted else defaults[name]
+                merged, dropped = merge_column(base, getattr(self, name), json.loads(fresh.columns[col]))
+                if dropped:
+                    logger.warning("Session conflict session_id=%s column=%s: kept stored value for keys=%s",
+                                   self.session_id, name, dropped)
+                setattr(self, name, merged)
+                raw = json.dumps(merged, ensure_ascii=False)
+                if raw != fresh.columns[col]:
+                    columns[col] = raw
+            for name in ("profile", "pending", "state"):
+                if name not in dirty:
+                    setattr(self, name, json.loads(fresh.columns[f"{name}_json"]))
+            self._persisted = dict(fresh.columns)
+            self.version = fresh.version
+            self.is_new = False
+            if not columns and not messages:
+                return 0
+            try:
+                self.version = await store.save(self.session_id, self.language, columns, False, messages, self.version)
+            except SessionConflict:
+                continue
+            self._persisted.update(columns)
+            logger.info("Session conflict session_id=%s: rebased onto version=%d columns=%s",
+                        self.session_id, fresh.version, sorted(columns))
+            return len(columns)
+        logger.warning("Session conflict session_id=%s: still contended after %d attempts, retrying on next flush",
+                       self.session_id, MAX_REBASE_ATTEMPTS)
+        self._dirty |= dirty
+        self._messages[:0] = messages
+        return 0
+
+class SessionCache:
+    """Write-back cache of sessions held by open WebSocket connections.
+
+    `open()` loads a session once (shared if several connections use the same id);
+    `end_turn()` flushes immediately when `flush_interval_s` is 0, otherwise at most once
+    per interval; `flush_due()` (periodic) and `close()` (last connection gone) catch the
+    rest. State lives on the event-loop thread; storage is reached only through `store`.
+    """
+
+    def __init__(self, store: SessionStore, flush_interval_s: float = 0.0):
+        self.store = store
+        self.flush_interval_s = max(0.0, float(flush_interval_s))
+        self._sessions: Dict[str, CachedSession] = {}
+        self.loads = 0
+        self.flushes = 0
+        self.columns_written = 0
+        self.columns_skipped = 0
+        self.conflicts = 0
+
+    async def open(self, session_id: str, language: str) -> CachedSession:
+        sess = self._sessions.get(session_id)
+        if sess is None:
+            stored = await self.store.load(session_id)
+            # another connection may have loaded the same session while we were reading
+            sess = self._sessions.get(session_id) or self._add(session_id, language, stored)
+        sess.refs += 1
+        sess.language = language
+        return sess
+
+    def _add(self, session_id: str, language: str, stored: Optional[StoredSession]) -> CachedSession:
+        sess = CachedSession(session_id, language)
+        if stored is not None:
+            sess._load(stored)
+            logger.debug("Session loaded session_id=%s", session_id)
+        else:
+            sess.profile, sess.pending, sess.state = new_session_blobs(session_id)
+            sess.is_new = True
+            logger.info("Session created session_id=%s", session_id)
+        self._sessions[session_id] = sess
+        self.loads += 1
+        return sess
+
+    async def _flush(self, sess: CachedSession) -> None:
+        if not sess.dirty:
+            return
+        conflicts = sess.conflicts
+        written, skipped = await sess.flush(self.store)
+        self.conflicts += sess.conflicts - conflicts
+        self.flushes += 1
+        self.columns_written += written
+        self.columns_skipped += skipped
+
+    async def end_turn(self, sess: CachedSession) -> None:
+        if self.flush_interval_s <= 0 or time.monotonic() - sess.last_flush >= self.flush_interval_s:
+            await self._flush(sess)
+
+    async def flush_due(self) -> None:
+        now = time.monotonic()
+        due = [s for s in self._sessions.values() if s.dirty and now - s.last_flush >= self.flush_interval_s]
+        # queued together, so the writer commits them as one group
+        await asyncio.gather(*(self._flush(s) for s in due))
+
+    async def close(self, sess: CachedSession) -> None:
+        """Connection done with `sess`: flush, and forget it once no connection holds it."""
+        try:
+            await self._flush(sess)
+        finally:
+            sess.refs -= 1
+            if sess.refs <= 0 and self._sessions.get(sess.session_id) is sess:
+                self._sessions.pop(sess.session_id, None)
+
+    async def flush_all(self) -> None:
+        await asyncio.gather(*(self._flush(s) for s in list(self._sessions.values())))
+
+    def open_ids(self) -> List[str]:
+        return list(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_sessions": len(self._sessions),
+            "dirty_sessions": sum(1 for s in self._sessions.values() if s.dirty),
+            "loads": self.loads,
+            "flushes": self.flushes,
+            "columns_written": self.columns_written,
+            "columns_skipped_unchanged": self.columns_skipped,
+            "version_conflicts": self.conflicts,
+            "store": self.store.stats(),
+        }
+
+_cache: Optional[SessionCache] = None
+
+def init_session_cache(store: SessionStore, flush_interval_s: float = 0.0) -> SessionCache:
+    global _cache
+    _cache = SessionCache(store, flush_interval_s)
+    return _cache
+
+def session_cache() -> SessionCache:
+    if _cache is None:
+        raise RuntimeError("session cache not initialised (call init_session_cache)")
+    return _cache
@@ -39,18 +39,115 @@ class Settings(BaseSettings):
 
     # Generic LLM timeout (used by Groq helper too)
     llm_timeout_seconds: int = Field(default=30)
+    # Async client: pooled keep-alive connections, jittered retries, circuit breaker
+    llm_max_connections: int = Field(default=10)
+    llm_attempts: int = Field(default=3)
+    llm_backoff_base_s: float = Field(default=0.25)
+    llm_backoff_max_s: float = Field(default=4.0)
+    llm_breaker_failures: int = Field(default=5)  # consecutive failed calls before opening
+    llm_breaker_reset_s: float = Field(default=30.0)  # open -> half-open probe after this
+
+    # --- Scheme retrieval ---
+    # "memory": in-process index over schemes.json; "fts5": SQLite FTS5 over the `schemes` table
+    rag_backend: str = Field(default="memory")
+    # Hybrid: BM25 + hashed char n-gram embeddings, fused with reciprocal-rank fusion
+    rag_hybrid_enabled: bool = Field(default=True)
+    rag_dense_dim: int = Field(default=1024)  # power of two
+    rag_dense_min_sim: float = Field(default=0.15)  # cosine below this is not a dense hit
+    rag_dense_weight: float = Field(default=1.0)  # RRF weight of the dense list (lexical = 1.0)
+    rag_rrf_k: int = Field(default=60)
+    rag_rrf_depth: int = Field(default=50)  # ranks taken from each channel
+    rag_dense_ann_min_docs: int = Field(default=50000)  # IVF index at/above this catalog size (0 = always exact)
+    rag_dense_nprobe: int = Field(default=8)
+    # LLM scheme selection: skip the call when the top score leads the runner-up by >= margin
+    llm_select_margin: float = Field(default=2.5)  # lexical (BM25 + boosts) scale; <= 0 disables the gate
+    # Same gate on the RRF scale when hybrid fusion orders the results. 0.01 at rrf_k=60: the
+    # top hit leads both channels while the runner-up is missing from one of them.
+    llm_select_fused_margin: float = Field(default=0.01)
+    llm_select_cache_size: int = Field(default=2048)  # in-memory LRU of picks (SQLite tier is unbounded)
 
     # --- Whisper STT ---
     whisper_model: str = Field(default="medium")
     whisper_device: str = Field(default="cpu")
     whisper_compute_type: str = Field(default="int8")
+    # >0: run Whisper in N processes (own model + cpu_threads each), least-loaded dispatch
+    stt_workers: int = Field(default=0)
+    stt_worker_cpu_threads: int = Field(default=4)
+    # Opt-in micro-batching of concurrent utterances (<=30 s each) into one encoder/decoder pass
+    stt_batch_enabled: bool = Field(default=False)
+    stt_batch_window_ms: int = Field(default=50)
+    stt_batch_max: int = Field(default=8)
+
+    # Streaming upload (binary WS frames between audio_start/audio_end)
+    stt_stream_partial_ms: int = Field(default=1200)  # new audio between stt_partial passes
+    stt_stream_commit_margin_s: float = Field(default=1.5)  # segments ending this far before the tail are final
+    stt_stream_max_s: float = Field(default=60.0)
+
+    # In-memory decode: long-lived processes for compressed uploads (0 = decode in a thread)
+    audio_decode_workers: int = Field(default=2)
+
+    # --- MMS TTS ---
+    # Per-sentence tts_chunk frames; clients can also opt in with {"type":"hello","ttsStream":true}
+    tts_stream_default: bool = Field(default=False)
+    # Opt-in micro-batching: one padded VITS forward for requests arriving within the window
+    tts_batch_enabled: bool = Field(default=False)
+    tts_batch_window_ms: int = Field(default=40)
+    tts_batch_max: int = Field(default=8)
+    # Content-addressed TTS cache: memory LRU + mmapped pack on disk (scripts/prewarm_tts_cache.py)
+    tts_cache_enabled: bool = Field(default=True)
+    tts_cache_dir: str = Field(default="./data/tts_cache")  # "" = memory only
+    tts_cache_mem_mb: int = Field(default=64)
+    tts_cache_disk_mb: int = Field(default=512)
 
     # --- Performance (Mac-friendly) ---
     torch_num_threads: int = Field(default=4)
     torch_num_interop_threads: int = Field(default=2)
 
+    # --- Startup ---
+    # Load + warm STT/TTS in the background at startup; /health/ready is 503 until done
+    warmup_on_startup: bool = Field(default=True)
+
     # --- Storage ---
     sqlite_path: str = Field(default="./data/app.db")
+    # Write-back session cache: 0 = one coalesced write per turn; >0 = at most one write
+    # per session per interval (plus on disconnect / shutdown)
+    session_flush_interval_s: float = Field(default=0.0)
+    # All writes go through one background writer: jobs arriving within
+    # DB_GROUP_COMMIT_MS share a transaction (and its fsync), awaiting callers resume once
+    # it is committed. Reads use a pool of read-only connections off the event loop.
+    db_group_commit_ms: float = Field(default=2.0)
+    db_group_max: int = Field(default=128)
+    db_write_synchronous: str = Field(default="FULL")  # FULL: durable on commit; NORMAL: WAL default
+    db_read_pool_size: int = Field(default=4)
+    # Where sessions live: "sqlite" (SQLITE_PATH / shards, this node only) or "redis"
+    # (any Redis-protocol server, shared by all nodes: no sticky sessions needed).
+    # Writes are optimistic (versioned), so two nodes cannot overwrite each other.
+    session_store: str = Field(default="sqlite")
+    session_store_url: str = Field(default="redis://127.0.0.1:6379/0")
+    session_store_prefix: str = Field(default="sevasetu:")
+    session_store_ttl_s: int = Field(default=30 * 86400)
+    session_store_max_messages: int = Field(default=500)
+    session_store_pool_size: int = Field(default=8)
+    session_store_timeout_s: float = Field(default=2.0)
+    # Sharded sessions: >1 hashes session_id over that many SQLite files in
+    # SESSION_SHARD_DIR (own writer each); schemes/LLM cache stay in SQLITE_PATH.
+    # Changing it requires scripts/reshard_sessions.py.
+    session_shards: int = Field(default=1)
+    session_shard_dir: str = Field(default="./data/sessions")
+    # Retention: sessions idle longer than RETENTION_DAYS (and their messages) move to
+    # gzip JSONL files per month under RETENTION_ARCHIVE_DIR; 0 = keep everything
+    retention_days: float = Field(default=0.0)
+    retention_archive_dir: str = Field(default="./data/archive")
+    retention_interval_s: float = Field(default=3600.0)
+    retention_batch: int = Field(default=500)
+    retention_vacuum_pages: int = Field(default=1000)  # pages freed per batch (auto_vacuum=INCREMENTAL)
+
+    # --- Bulk eligibility screening (POST /eligibility/screen, scripts/screen_households.py) ---
+    screening_workers: int = Field(default=2)  # processes; 0 = a thread in the server process
+    screening_chunk_rows: int = Field(default=500)
+    screening_inflight_chunks: int = Field(default=0)  # chunks queued or running; 0 = 2 x workers
+    screening_max_rows: int = Field(default=200000)  # per upload; 0 = unlimited
+    screening_max_line_bytes: int = Field(default=65536)  # longer lines become error rows
 
     # --- Logging ---
     log_level: str = Field(default="INFO")
@@ -0,0 +1,33 @@
+from __future__ import annotations
+import logging, zlib
+from pathlib import Path
+from typing import List
+
+from app.settings import settings
+from app.db import connect, init_shard_db
+
+logger = logging.getLogger("sevasetu")
+
+def shard_index(session_id: str, count: int) -> int:
+    """Stable shard of a session (crc32, identical across processes and restarts)."""
+    if count <= 1:
+        return 0
+    return zlib.crc32((session_id or "").encode("utf-8")) % count
+
+def shard_paths(directory: str, count: int) -> List[str]:
+    # The count is part of the name, so a different layout never reuses these files
+    return [str(Path(directory) / f"sessions-{i:02d}-of-{count:02d}.db") for i in range(count)]
+
+def session_db_paths() -> List[str]:
+    """Files holding sessions/messages: the shards, or the main database when unsharded."""
+    n = int(settings.session_shards)
+    return shard_paths(settings.session_shard_dir, n) if n > 1 else [settings.sqlite_path]
+
+def init_shards(paths: List[str]) -> None:
+    for i, path in enumerate(paths):
+        conn = connect(path)
+        try:
+            init_shard_db(conn, i, len(paths))
+        finally:
+            conn.close()
+    logger.info("Session shards ready count=%d dir=%s", len(paths), Path(paths[0]).parent if paths else "")
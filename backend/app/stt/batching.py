@@ -0,0 +1,73 @@
+from __future__ import annotations
+from typing import Any, List, NamedTuple
+import numpy as np
+
+SAMPLE_RATE = 16000
+# One Whisper window; longer utterances are not batched
+MAX_BATCH_SAMPLES = 30 * SAMPLE_RATE
+
+class BatchSegment(NamedTuple):
+    """Segment-compatible result (text/start/end/avg_logprob/no_speech_prob) of a batched
+    decode: one per clip, spanning all of it (no timestamps are decoded)."""
+    text: str
+    start: float
+    end: float
+    avg_logprob: float
+    no_speech_prob: float
+
+# --- Batched decode (runs in a thread or inside an STT pool worker; no settings import) ---
+
+def _speech_only(audio: np.ndarray, min_silence_ms: int) -> np.ndarray:
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+    ts = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=min_silence_ms))
+    if not ts:
+        return audio[:0]
+    return np.concatenate([audio[t["start"]:t["end"]] for t in ts])
+
+def transcribe_batch_with(model: Any, audios: List[np.ndarray], language_iso: str = "mr", min_silence_ms: int = 350) -> List[List[BatchSegment]]:
+    """One encoder + greedy decoder pass over several utterances (each <= 30 s).
+
+    Uses the same building blocks as faster-whisper's batched pipeline: per-utterance VAD,
+    log-mel features padded to one 30 s window, a single `encode` over the stacked batch
+    and one CTranslate2 `generate` call with a shared prompt.
+    """
+    from faster_whisper.tokenizer import Tokenizer
+
+    tok = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language_iso)
+    n_frames = model.feature_extractor.nb_max_frames
+    speech = [_speech_only(a, min_silence_ms) for a in audios]
+    live = [i for i, a in enumerate(speech) if a.size]
+    out: List[List[BatchSegment]] = [[] for _ in audios]
+    if not live:
+        return out
+
+    feats = []
+    for i in live:
+        f = model.feature_extractor(speech[i])[:, :n_frames]
+        if f.shape[1] < n_frames:
+            f = np.pad(f, ((0, 0), (0, n_frames - f.shape[1])))
+        feats.append(f)
+    encoded = model.encode(np.stack(feats).astype(np.float32))
+    prompt = list(tok.sot_sequence) + [tok.no_timestamps]
+    results = model.model.generate(
+        encoded,
+        [prompt] * len(live),
+        beam_size=1,
+        max_length=model.max_length,
+        return_scores=True,
+        return_no_speech_prob=True,
+        suppress_blank=True,
+    )
+    for i, r in zip(live, results):
+        tokens = [t for t in r.sequences_ids[0] if t < tok.eot]
+        n = len(r.sequences_ids[0])
+        # scores are length-normalised; recover the cumulative log-prob like faster-whisper does
+        avg_logprob = float(r.scores[0]) * n / (n + 1) if r.scores else -2.5
+        out[i] = [BatchSegment(
+            text=tok.decode(tokens),
+            start=0.0,
+            end=audios[i].size / SAMPLE_RATE,
+            avg_logprob=avg_logprob,
+            no_speech_prob=float(getattr(r, "no_speech_prob", 0.0) or 0.0),
+        )]
+    return out
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import asyncio, logging, multiprocessing, time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("sevasetu")
+
+# --- Worker process side ---
+# Kept free of app.settings / torch imports: each worker only needs faster-whisper.
+
+_w_model = None
+_w_options: Dict[str, Any] = {}
+
+def _worker_init(model_name: str, device: str, compute_type: str, cpu_threads: int, options: Dict[str, Any]) -> None:
+    global _w_model, _w_options
+    from faster_whisper import WhisperModel
+    _w_model = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads, num_workers=1)
+    _w_options = dict(options)
+
+def _worker_transcribe(audio: Any, language_iso: str) -> List:
+    segments, _info = _w_model.transcribe(audio, language=language_iso, **_w_options)
+    return list(segments)
+
+def _worker_transcribe_batch(audios: List[Any], language_iso: str) -> List[List]:
+    from app.stt.batching import transcribe_batch_with
+    min_silence = int((_w_options.get("vad_parameters") or {}).get("min_silence_duration_ms", 350))
+    return transcribe_batch_with(_w_model, audios, language_iso, min_silence)
+
+def warmup_clip(seconds: float = 1.0) -> Any:
+    """Quiet tone + noise: exercises feature extraction, the encoder and a few decoder steps."""
+    import numpy as np
+    t = np.arange(int(16000 * seconds), dtype=np.float32) / 16000.0
+    rng = np.random.default_rng(0)
+    return (0.05 * np.sin(2 * np.pi * 220.0 * t) + 0.01 * rng.standard_normal(t.size)).astype(np.float32)
+
+def warmup_with(model: Any, options: Dict[str, Any], language_iso: str = "mr") -> None:
+    """Cold first inference on a synthetic clip (VAD off so the decoder actually runs)."""
+    from faster_whisper.vad import get_speech_timestamps
+    clip = warmup_clip()
+    get_speech_timestamps(clip)  # loads the Silero VAD session
+    segments, _info = model.transcribe(clip, language=language_iso, **{**options, "vad_filter": False})
+    list(segments)
+
+def _worker_warmup() -> float:
+    t0 = time.perf_counter()
+    warmup_with(_w_model, _w_options)
+    return (time.perf_counter() - t0) * 1000
+
+def _worker_ping() -> bool:
+    return _w_model is not None
+
+
+# --- Parent side ---
+
+class _Worker:
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.inflight = 0
+        self.done = 0
+        self.errors = 0
+        self.restarts = 0
+        self.busy_s = 0.0           # wall time with at least one request in flight
+        self.busy_since = 0.0
+        self.started = time.monotonic()
+
+    def acquire(self) -> None:
+        if self.inflight == 0:
+            self.busy_since = time.monotonic()
+        self.inflight += 1
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self.done += 1
+        if self.inflight == 0:
+            self.busy_s += time.monotonic() - self.busy_since
+
+    def busy_total(self, now: float) -> float:
+        return self.busy_s + (now - self.busy_since if self.inflight else 0.0)
+
+class SttWorkerPool:
+    """N Whisper processes, each with its own model and CPU-thread budget.
+
+    Requests go to the worker with the fewest in-flight requests. All bookkeeping
+    happens on the event-loop thread, so no locks are needed.
+    """
+
+    def __init__(self, workers: int, model_name: str, device: str, compute_type: str, cpu_threads: int, options: Dict[str, Any]):
+        self._initargs = (model_name, device, compute_type, int(cpu_threads), dict(options))
+        self._workers = [_Worker(i) for i in range(max(1, int(workers)))]
+        for w in self._workers:
+            self._spawn(w)
+        logger.info("STT pool started workers=%d cpu_threads=%d model=%s", len(self._workers), int(cpu_threads), model_name)
+
+    def _spawn(self, w: _Worker) -> None:
+        # spawn: never fork a process that may already hold torch / CTranslate2 threads
+        w.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=self._initargs,
+        )
+        # Start the process (and model load) now rather than on the first utterance
+        w.executor.submit(_worker_ping)
+
+    def _release(self, w: _Worker, executor: ProcessPoolExecutor, fut: Future) -> None:
+        w.release()
+        exc = None if fut.cancelled() else fut.exception()
+        if exc is not None:
+            w.errors += 1
+            # Every in-flight future of a dead process fails; restart only once
+            if isinstance(exc, BrokenProcessPool) and w.executor is executor:
+                logger.error("STT worker died idx=%d; restarting", w.idx)
+                w.restarts += 1
+                self._spawn(w)
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    async def transcribe_segments(self, audio: Any, language_iso: str = "mr") -> List:
+        return await self._submit(_worker_transcribe, audio, language_iso)
+
+    async def transcribe_batch(self, audios: List[Any], language_iso: str = "mr") -> List[List]:
+        return await self._submit(_worker_transcribe_batch, audios, language_iso)
+
+    async def _submit(self, fn: Any, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        w = min(self._workers, key=lambda x: (x.inflight, x.busy_total(now)))
+        w.acquire()
+        executor = w.executor
+        fut = executor.submit(fn, *args)
+        # Release on completion of the process job itself, even if the caller timed out
+        fut.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, w, executor, f))
+        return await asyncio.wrap_future(fut)
+
+    async def warmup(self) -> List[float]:
+        """Run the warmup clip on every worker (waits for their model loads); returns ms per worker."""
+        futs = [asyncio.wrap_future(w.executor.submit(_worker_warmup)) for w in self._workers]
+        return list(await asyncio.gather(*futs))
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        per_worker = []
+        for w in self._workers:
+            up = max(1e-6, now - w.started)
+            busy = w.busy_total(now)
+            per_worker.append({
+                "idx": w.idx,
+                "inflight": w.inflight,
+                "done": w.done,
+                "errors": w.errors,
+                "restarts": w.restarts,
+                "busy_s": round(busy, 3),
+                "utilisation": round(min(1.0, busy / up), 4),
+            })
+        inflight = sum(w.inflight for w in self._workers)
+        return {
+            "workers": len(self._workers),
+            "inflight": inflight,
+            # requests waiting behind another request on the same worker
+            "queue_depth": sum(max(0, w.inflight - 1) for w in self._workers),
+            "per_worker": per_worker,
+        }
+
+    def shutdown(self) -> None:
+        for w in self._workers:
+            if w.executor is not None:
+                w.executor.shutdown(wait=False, cancel_futures=True)
+                w.executor = None
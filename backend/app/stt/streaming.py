@@ -0,0 +1,117 @@
+from __future__ import annotations
+import asyncio, logging, time
+from typing import Awaitable, Callable, List, Optional, Tuple
+import numpy as np
+
+from app.settings import settings
+from app.utils.audio import SAMPLE_RATE, open_stream_decoder
+from app.stt.whisper_stt import transcribe_segments_async, segments_result
+
+logger = logging.getLogger("sevasetu")
+
+class StreamingTranscriber:
+    """Incremental STT for one utterance uploaded as binary WebSocket frames.
+
+    Frames are decoded as they arrive. Every `stt_stream_partial_ms` of new audio the
+    uncommitted tail is transcribed and reported as a partial; Whisper segments that end
+    well before the current buffer end are committed, so the final pass at `audio_end`
+    only has to transcribe the last couple of seconds.
+    """
+
+    def __init__(self, mime_type: str = "audio/webm", language_iso: str = "mr"):
+        self.mime_type = mime_type
+        self.language_iso = language_iso
+        self._decoder = open_stream_decoder(mime_type)
+        self._chunks: List[np.ndarray] = []
+        self._samples = 0
+        self._bytes_in = 0
+        self._offset = 0            # samples covered by committed segments
+        self._committed: List = []  # committed whisper segments
+        self._last_partial_at = 0
+        self._partial_task: Optional[asyncio.Task] = None
+        self._max_samples = int(float(settings.stt_stream_max_s) * SAMPLE_RATE)
+        self._partial_samples = int(int(settings.stt_stream_partial_ms) * SAMPLE_RATE / 1000)
+
+    @property
+    def bytes_in(self) -> int:
+        return self._bytes_in
+
+    @property
+    def seconds(self) -> float:
+        return self._samples / SAMPLE_RATE
+
+    def _append(self, samples: np.ndarray) -> None:
+        if samples.size == 0:
+            return
+        room = self._max_samples - self._samples
+        if room <= 0:
+            return
+        if samples.size > room:
+            logger.warning("STT stream truncated at max_s=%s", settings.stt_stream_max_s)
+            samples = samples[:room]
+        self._chunks.append(samples)
+        self._samples += samples.size
+
+    def _audio(self) -> np.ndarray:
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return self._chunks[0] if self._chunks else np.zeros(0, dtype=np.float32)
+
+    async def feed(self, chunk: bytes) -> None:
+        self._bytes_in += len(chunk or b"")
+        self._append(await asyncio.to_thread(self._decoder.feed, chunk))
+
+    def _commit(self, segs: List, tail_s: float) -> List:
+        """Commit segments that end well before the buffer end; return the rest."""
+        horizon = tail_s - float(settings.stt_stream_commit_margin_s)
+        n = 0
+        for s in segs:
+            if s.end > horizon:
+                break
+            n += 1
+        if n:
+            self._committed.extend(segs[:n])
+            self._offset += int(segs[n - 1].end * SAMPLE_RATE)
+        return segs[n:]
+
+    def _text(self, tail: List) -> str:
+        return " ".join([(s.text or "").strip() for s in self._committed + tail]).strip()
+
+    async def _partial(self, on_text: Callable[[str], Awaitable[None]]) -> None:
+        t0 = time.perf_counter()
+        # Snapshot on the loop thread; feed() keeps appending while Whisper runs
+        tail = self._audio()[self._offset:]
+        if tail.size == 0:
+            return
+        # Not through the batcher: its single whole-clip segment would never commit
+        segs = await transcribe_segments_async(tail, self.language_iso, batch=False)
+        text = self._text(self._commit(segs, tail.size / SAMPLE_RATE))
+        logger.debug("STT partial chars=%d committed=%d audio_s=%.1f ms=%.0f", len(text), len(self._committed), self.seconds, (time.perf_counter() - t0) * 1000)
+        if text:
+            await on_text(text)
+
+    def maybe_start_partial(self, on_text: Callable[[str], Awaitable[None]]) -> None:
+        """Kick off a background partial if enough new audio arrived and none is running."""
+        if self._partial_task is not None and not self._partial_task.done():
+            return
+        if self._samples - self._last_partial_at < self._partial_samples:
+            return
+        self._last_partial_at = self._samples
+        self._partial_task = asyncio.create_task(self._partial(on_text))
+
+    async def finish(self) -> Tuple[str, float]:
+        """Flush the decoder and return the final (text, confidence)."""
+        if self._partial_task is not None:
+            try:
+                await self._partial_task
+            except Exception:
+                logger.exception("STT partial failed")
+        self._append(await asyncio.to_thread(self._decoder.close))
+        tail = self._audio()[self._offset:]
+        segs = await transcribe_segments_async(tail, self.language_iso) if tail.size else []
+        return segments_result(self._committed + segs)
+
+    def abort(self) -> None:
+        if self._partial_task is not None and not self._partial_task.done():
+            self._partial_task.cancel()
+        self._decoder.abort()
@@ -1,9 +1,13 @@
 from __future__ import annotations
-import logging, math, time
+import asyncio, logging, math, time
 from functools import lru_cache
-from typing import Tuple, List
+from typing import Optional, Tuple, List, Union
+import numpy as np
 from faster_whisper import WhisperModel
 from app.settings import settings
+from app.stt.pool import SttWorkerPool, warmup_with
+from app.stt.batching import MAX_BATCH_SAMPLES, transcribe_batch_with
+from app.utils.batching import MicroBatcher
 
 logger = logging.getLogger("sevasetu")
 
@@ -17,6 +21,54 @@ def _model()->WhisperModel:
     )
     return WhisperModel(settings.whisper_model, device=settings.whisper_device, compute_type=settings.whisper_compute_type)
 
+# Decode options shared by the in-process model and the worker pool
+TRANSCRIBE_OPTIONS = dict(
+    task="transcribe",
+    vad_filter=True,
+    vad_parameters=dict(min_silence_duration_ms=350),
+    beam_size=1,
+    condition_on_previous_text=False,
+    temperature=0.0,
+)
+
+_stt_pool: Optional[SttWorkerPool] = None
+
+def stt_pool() -> Optional[SttWorkerPool]:
+    """The multi-process pool when STT_WORKERS > 0, else None (in-process model)."""
+    global _stt_pool
+    if _stt_pool is None and int(settings.stt_workers) > 0:
+        _stt_pool = SttWorkerPool(
+            workers=int(settings.stt_workers),
+            model_name=settings.whisper_model,
+            device=settings.whisper_device,
+            compute_type=settings.whisper_compute_type,
+            cpu_threads=int(settings.stt_worker_cpu_threads),
+            options=TRANSCRIBE_OPTIONS,
+        )
+    return _stt_pool
+
+_stt_batcher: Optional[MicroBatcher] = None
+
+def stt_batcher() -> Optional[MicroBatcher]:
+    """Micro-batching scheduler in front of the pool / in-process model when STT_BATCH_ENABLED."""
+    global _stt_batcher
+    if _stt_batcher is None and settings.stt_batch_enabled:
+        pool = stt_pool()
+        if pool is not None:
+            run_batch = pool.transcribe_batch
+        else:
+            min_silence = int(TRANSCRIBE_OPTIONS["vad_parameters"]["min_silence_duration_ms"])
+            async def run_batch(audios, language_iso):
+                return await asyncio.to_thread(transcribe_batch_with, _model(), audios, language_iso, min_silence)
+        _stt_batcher = MicroBatcher(run_batch, window_ms=settings.stt_batch_window_ms, max_batch=settings.stt_batch_max, name="STT batch")
+    return _stt_batcher
+
+def shutdown_stt_pool() -> None:
+    global _stt_pool
+    if _stt_pool is not None:
+        _stt_pool.shutdown()
+        _stt_pool = None
+
 def _conf(segs: List)->float:
     probs=[]
     for s in segs:
@@ -28,25 +80,62 @@ def _conf(segs: List)->float:
         probs.append(max(0.0,min(1.0,p)))
     return float(sum(probs)/len(probs)) if probs else 0.0
 
-def transcribe_wav(wav_path: str, language_iso: str="mr")->Tuple[str,float]:
-    t0 = time.perf_counter()
-    logger.debug("STT transcribe start wav=%s lang=%s", wav_path, language_iso)
+def transcribe_segments(audio: Union[str, np.ndarray], language_iso: str="mr")->List:
+    """Run Whisper on a wav path or a float32 16 kHz mono array and return its segments."""
     model=_model()
-    segments, _info = model.transcribe(
-        wav_path,
-        language=language_iso,
-        task="transcribe",
-        vad_filter=True,
-        vad_parameters=dict(min_silence_duration_ms=350),
-        beam_size=1,
-        condition_on_previous_text=False,
-        temperature=0.0
-    )
-    segs=list(segments)
+    segments, _info = model.transcribe(audio, language=language_iso, **TRANSCRIBE_OPTIONS)
+    return list(segments)
+
+async def transcribe_segments_async(audio: Union[str, np.ndarray], language_iso: str="mr", batch: bool=True)->List:
+    """Dispatch to the batcher, the least-loaded pool worker, or a thread running the in-process model.
+
+    Batched decodes return one segment spanning the whole clip; pass `batch=False` when
+    real segment boundaries are needed (streaming partials commit on them).
+    """
+    batcher=stt_batcher() if batch else None
+    if batcher is not None and isinstance(audio, np.ndarray) and audio.size <= MAX_BATCH_SAMPLES:
+        return await batcher.submit(audio, language_iso)
+    pool=stt_pool()
+    if pool is None:
+        return await asyncio.to_thread(transcribe_segments, audio, language_iso)
+    return await pool.transcribe_segments(audio, language_iso)
+
+def segments_result(segs: List)->Tuple[str,float]:
     text=" ".join([(s.text or "").strip() for s in segs]).strip()
     conf=_conf(segs)
-    logger.debug("STT segments=%d chars=%d conf=%.2f ms=%.0f", len(segs), len(text), conf, (time.perf_counter() - t0) * 1000)
     # If super low confidence treat as empty
     if not text or conf<0.18:
         return "", 0.0
     return text, conf
+
+def transcribe_wav(audio: Union[str, np.ndarray], language_iso: str="mr")->Tuple[str,float]:
+    """Transcribe a wav path or an in-memory float32 16 kHz array (see `decode_audio`)."""
+    t0 = time.perf_counter()
+    if isinstance(audio, np.ndarray):
+        logger.debug("STT transcribe start samples=%d lang=%s", audio.size, language_iso)
+    else:
+        logger.debug("STT transcribe start wav=%s lang=%s", audio, language_iso)
+    segs=transcribe_segments(audio, language_iso)
+    text, conf = segments_result(segs)
+    logger.debug("STT segments=%d chars=%d conf=%.2f ms=%.0f", len(segs), len(text), conf, (time.perf_counter() - t0) * 1000)
+    return text, conf
+
+async def transcribe_async(audio: Union[str, np.ndarray], language_iso: str="mr")->Tuple[str,float]:
+    t0 = time.perf_counter()
+    segs=await transcribe_segments_async(audio, language_iso)
+    text, conf = segments_result(segs)
+    logger.debug("STT segments=%d chars=%d conf=%.2f ms=%.0f", len(segs), len(text), conf, (time.perf_counter() - t0) * 1000)
+    return text, conf
+
+async def warmup_stt() -> dict:
+    """Load the model(s) and run one cold inference; returns timings for readiness reporting."""
+    pool=stt_pool()
+    t0 = time.perf_counter()
+    if pool is not None:
+        per_worker = await pool.warmup()
+        return {"mode": "pool", "load_warmup_ms": round((time.perf_counter() - t0) * 1000), "worker_warmup_ms": [round(x) for x in per_worker]}
+    model = await asyncio.to_thread(_model)
+    load_ms = (time.perf_counter() - t0) * 1000
+    t1 = time.perf_counter()
+    await asyncio.to_thread(warmup_with, model, TRANSCRIBE_OPTIONS)
+    return {"mode": "in_process", "load_ms": round(load_ms), "warmup_ms": round((time.perf_counter() - t1) * 1000)}
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import math
+from typing import Dict, List, Sequence
+import numpy as np
+
+class Bm25Matrix:
+    """BM25 as a sparse term x document weight matrix (CSR, rows = terms).
+
+    Each stored value is the full per-(term, doc) BM25 contribution
+    `idf * f * (k1 + 1) / (f + k1 * (1 - b + b * dl / avgdl))`, so scoring a query is a
+    sparse dot product: gather the rows of the query terms and `bincount` them into a
+    dense score vector. No per-query Python loop over documents.
+    """
+
+    def __init__(self, doc_tokens: Sequence[Sequence[str]], k1: float = 1.2, b: float = 0.75):
+        self.n_docs = len(doc_tokens)
+        counts: List[Dict[str, int]] = []
+        df: Dict[str, int] = {}
+        for toks in doc_tokens:
+            tf: Dict[str, int] = {}
+            for t in toks:
+                tf[t] = tf.get(t, 0) + 1
+            counts.append(tf)
+            for t in tf:
+                df[t] = df.get(t, 0) + 1
+        self.vocab: Dict[str, int] = {t: i for i, t in enumerate(df)}
+
+        lengths = np.array([len(t) for t in doc_tokens], dtype=np.float64)
+        avgdl = float(lengths.sum()) / max(1, self.n_docs)
+        norm = k1 * (1 - b + b * lengths / max(1.0, avgdl))
+
+        # COO (term, doc, tf) -> CSR by term
+        rows = np.fromiter((self.vocab[t] for tf in counts for t in tf), dtype=np.int64)
+        cols = np.fromiter((d for d, tf in enumerate(counts) for _t in tf), dtype=np.int64)
+        freqs = np.fromiter((f for tf in counts for f in tf.values()), dtype=np.float64)
+        order = np.lexsort((cols, rows))
+        rows, cols, freqs = rows[order], cols[order], freqs[order]
+        n = self.n_docs
+        self.idf = np.array([math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in self.vocab], dtype=np.float64)
+        self.indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self.vocab)), out=self.indptr[1:])
+        self.indices = cols
+        self.data = self.idf[rows] * (freqs * (k1 + 1)) / (freqs + norm[cols])
+
+    @property
+    def nnz(self) -> int:
+        return int(self.data.size)
+
+    def score(self, query_tokens: Sequence[str]) -> np.ndarray:
+        """Dense BM25 scores for all documents (repeated query terms count repeatedly)."""
+        ids = [self.vocab[t] for t in query_tokens if t in self.vocab]
+        if not ids:
+            return np.zeros(self.n_docs, dtype=np.float64)
+        if len(ids) == 1:
+            lo, hi = self.indptr[ids[0]], self.indptr[ids[0] + 1]
+            out = np.zeros(self.n_docs, dtype=np.float64)
+            out[self.indices[lo:hi]] = self.data[lo:hi]
+            return out
+        sl = [slice(self.indptr[i], self.indptr[i + 1]) for i in ids]
+        return np.bincount(
+            np.concatenate([self.indices[s] for s in sl]),
+            weights=np.concatenate([self.data[s] for s in sl]),
+            minlength=self.n_docs,
+        )
+
+def top_k(scores: np.ndarray, k: int, tiebreak: np.ndarray | None = None) -> np.ndarray:
+    """Indexes of the k best scores without a full sort.
+
+    Ordering is score desc, then `tiebreak` desc, then index asc. Zero scores are never
+    preferred over a positive one, and zero-score documents fill remaining slots in index
+    order. `argpartition` narrows to the candidates, and ties at the k-th value are kept,
+    so the result is exactly the prefix of a full stable ranking.
+    """
+    n = scores.size
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    nz = np.flatnonzero(scores)
+    if nz.size > k:
+        part = nz[np.argpartition(-scores[nz], k - 1)[:k]]
+        kth = scores[part].min()
+        nz = nz[scores[nz] >= kth]
+    tb = tiebreak[nz] if tiebreak is not None else np.zeros(nz.size)
+    best = nz[np.lexsort((nz, -tb, -scores[nz]))][:k]
+    if best.size < k:
+        # pad with zero-score documents in index order
+        mask = np.ones(n, dtype=bool)
+        mask[best] = False
+        best = np.concatenate([best, np.flatnonzero(mask)[:k - best.size]])
+    return best
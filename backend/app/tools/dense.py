@@ -0,0 +1,130 @@
+from __future__ import annotations
+import re, unicodedata, zlib
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+# Spelling variants Whisper produces for the same Marathi word (बहीण / बहिण / बहिन,
+# nukta, anusvara / candrabindu). Folded before n-gramming so they share features.
+_FOLD = str.maketrans({
+    "ी": "ि", "ू": "ु", "ई": "इ", "ऊ": "उ",
+    "ण": "न", "ळ": "ल", "ष": "श",
+    "ं": None, "ँ": None, "़": None, "ः": None,
+})
+_NON_WORD = re.compile(r"[^\wऀ-ॿ]+")
+
+def fold_text(text: str) -> str:
+    t = unicodedata.normalize("NFC", text or "").lower().translate(_FOLD)
+    return " ".join(_NON_WORD.sub(" ", t).split())
+
+class CharNgramEncoder:
+    """Hashed character n-gram embeddings (no model download, CPU only).
+
+    Each word is padded with spaces and cut into n-grams; every n-gram is hashed
+    (crc32, stable across processes) into one of `dim` signed buckets. Vectors are
+    L2-normalised, so a dot product is the cosine similarity.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range: Tuple[int, int] = (2, 4)):
+        if dim & (dim - 1):
+            raise ValueError("dim must be a power of two")
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self._cache: Dict[str, Tuple[int, float]] = {}
+
+    def _feature(self, gram: str) -> Tuple[int, float]:
+        f = self._cache.get(gram)
+        if f is None:
+            h = zlib.crc32(gram.encode("utf-8"))
+            # low bits pick the bucket, the top bit the sign
+            f = (h & (self.dim - 1), -1.0 if h >> 31 else 1.0)
+            if len(self._cache) < 200_000:
+                self._cache[gram] = f
+        return f
+
+    def encode(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        lo, hi = self.ngram_range
+        idx: List[int] = []
+        sign: List[float] = []
+        for w in fold_text(text).split():
+            w = f" {w} "
+            for n in range(lo, hi + 1):
+                for i in range(max(1, len(w) - n + 1)):
+                    b, s = self._feature(w[i:i + n])
+                    idx.append(b)
+                    sign.append(s)
+        if idx:
+            np.add.at(vec, np.asarray(idx), np.asarray(sign, dtype=np.float32))
+            norm = float(np.linalg.norm(vec))
+            if norm > 0:
+                vec /= norm
+        return vec
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            out[i] = self.encode(t)
+        return out
+
+class DenseIndex:
+    """Contiguous float32 (n, dim) matrix searched by exact dot product.
+
+    With `ann_min_docs` or more rows, an IVF index (k-means coarse quantizer) restricts
+    each search to the `nprobe` nearest clusters; smaller catalogs stay exact.
+    """
+
+    def __init__(self, vectors: np.ndarray, ann_min_docs: int = 50_000, nprobe: int = 8, seed: int = 0):
+        self.matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.nprobe = max(1, int(nprobe))
+        self.centroids: np.ndarray | None = None
+        self.lists: List[np.ndarray] = []
+        n = self.matrix.shape[0]
+        if ann_min_docs > 0 and n >= ann_min_docs:
+            self._build_ivf(int(np.sqrt(n)), seed)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def _build_ivf(self, nlist: int, seed: int, iters: int = 8) -> None:
+        rng = np.random.default_rng(seed)
+        n = self.matrix.shape[0]
+        sample = self.matrix[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+        cent = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(iters):
+            assign = np.argmax(sample @ cent.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if members.size:
+                    v = members.mean(axis=0)
+                    cent[c] = v / max(1e-6, float(np.linalg.norm(v)))
+        # assign the full catalog in blocks to bound memory
+        assign = np.concatenate([np.argmax(self.matrix[i:i + 8192] @ cent.T, axis=1) for i in range(0, n, 8192)])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        self.centroids = cent
+        self.lists = [order[bounds[c]:bounds[c + 1]] for c in range(nlist)]
+
+    def search(self, q: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(doc ids, cosine) of the k most similar rows, best first."""
+        if self.centroids is not None:
+            probe = np.argpartition(-(self.centroids @ q), min(self.nprobe, len(self.lists)) - 1)[:self.nprobe]
+            cand = np.concatenate([self.lists[c] for c in probe])
+            sims = self.matrix[cand] @ q
+        else:
+            cand = None
+            sims = self.matrix @ q
+        k = max(0, min(int(k), sims.size))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.lexsort((top, -sims[top]))]
+        ids = cand[top] if cand is not None else top
+        return ids.astype(np.int64), sims[top]
+
+def rrf_fuse(rankings: Sequence[Tuple[Sequence[int], float]], k_rrf: int = 60) -> Dict[int, float]:
+    """Weighted reciprocal-rank fusion: sum of w / (k_rrf + rank) over the ranked lists."""
+    fused: Dict[int, float] = {}
+    for ranked, weight in rankings:
+        for rank, d in enumerate(ranked, start=1):
+            fused[int(d)] = fused.get(int(d), 0.0) + weight / (k_rrf + rank)
+    return fused
@@ -0,0 +1,259 @@
+from __future__ import annotations
+import logging, threading, time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+from app.catalog import CatalogSnapshot, catalog
+from app.tools.rules import (
+    FIELD_NAMES_MR, FLAT_RULES, NUMERIC_FIELDS, REASON_ELIGIBLE_MR, VALUE_CANON,
+    _absent, _norm_text, compiled_catalog, match_text,
+)
+
+logger = logging.getLogger("sevasetu")
+
+# Profile fields the flat rules read (columns of the missing mask), and the rules
+# (columns of the failure mask) in the order check_eligibility reports them. "expr" is
+# a scheme with any/all/not combinators, evaluated through its compiled closure.
+FIELDS = tuple(dict.fromkeys(field for field, _ in FLAT_RULES.values()))
+RULES = tuple(FLAT_RULES) + ("expr",)
+STATUS_ELIGIBLE, STATUS_NOT_ELIGIBLE, STATUS_NEEDS_INFO = 0, 1, 2
+STATUS_NAMES = ("eligible", "not_eligible", "needs_more_info")
+_EXPR = len(RULES) - 1
+_STATUS = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+def _codes(values: List[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """Dictionary-encode `values` (None -> -1): (codes, distinct values)."""
+    table: Dict[Any, int] = {}
+    codes = np.full(len(values), -1, dtype=np.int32)
+    for i, v in enumerate(values):
+        if v is not None:
+            codes[i] = table.setdefault(v, len(table))
+    return codes, list(table)
+
+class EligibilityResult:
+    """Outcome of one profile against every scheme of a snapshot.
+
+    `status` (n,) int8 of STATUS_*; `failed` (n, len(RULES)) bool, a rule failing on the
+    fields the profile does have (set even when other fields are missing); `missing`
+    (n, len(FIELDS)) bool, a field the scheme needs and the profile lacks. `expr` holds
+    the compiled verdict (status, reasons, missing) of combinator schemes.
+    """
+
+    def __init__(self, table: "EligibilityTable", status: np.ndarray, failed: np.ndarray, missing: np.ndarray,
+                 expr: Dict[int, Tuple[str, List[str], List[str]]]):
+        self.table = table
+        self.status = status
+        self.failed = failed
+        self.missing = missing
+        self.expr = expr
+
+    def ids(self, status: int) -> List[str]:
+        return [self.table.ids[i] for i in np.flatnonzero(self.status == status)]
+
+    def missing_fields(self, i: int) -> List[str]:
+        if i in self.expr:
+            return list(self.expr[i][2])
+        return [f for f in self.table.rules[i].required if self.missing[i, FIELDS.index(f)]]
+
+    def _entry(self, i: int) -> Dict[str, Any]:
+        return {
+            "scheme_id": self.table.ids[i],
+            "failed_rules": [RULES[r] for r in np.flatnonzero(self.failed[i])],
+            "missing_fields": self.missing_fields(i) if self.status[i] == STATUS_NEEDS_INFO else [],
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "catalog_version": self.table.version,
+            "eligible": self.ids(STATUS_ELIGIBLE),
+            "not_eligible": [self._entry(i) for i in np.flatnonzero(self.status == STATUS_NOT_ELIGIBLE)],
+            "needs_more_info": [self._entry(i) for i in np.flatnonzero(self.status == STATUS_NEEDS_INFO)],
+        }
+
+    def check(self, scheme_id: str) -> Optional[Dict[str, Any]]:
+        """The check_eligibility() dict for one scheme, rebuilt from the masks."""
+        i = self.table.position.get(scheme_id)
+        if i is None:
+            return None
+        if self.status[i] == STATUS_NEEDS_INFO:
+            missing = self.missing_fields(i)
+            readable = [FIELD_NAMES_MR.get(x, x) for x in missing]
+            return {"status": "needs_more_info", "missing_fields": missing,
+                    "reasons_mr": [f"पात्रता तपासण्यासाठी ही माहिती हवी आहे: {', '.join(readable)}"]}
+        if self.status[i] == STATUS_NOT_ELIGIBLE:
+            if i in self.expr:
+                reasons = list(self.expr[i][1])
+            else:
+                reasons = [self.table.reasons[i][RULES[r]] for r in np.flatnonzero(self.failed[i])]
+            return {"status": "not_eligible", "missing_fields": [], "reasons_mr": reasons}
+        return {"status": "eligible", "missing_fields": [], "reasons_mr": [REASON_ELIGIBLE_MR]}
+
+class EligibilityTable:
+    """Every scheme's compiled rules laid out as NumPy columns, one per flat rule key.
+
+    Numeric bounds are float columns (NaN = no rule); eq / in requirements are
+    dictionary-encoded, so string matching runs once per distinct requirement rather
+    than once per scheme. Schemes using combinators keep their compiled closure.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.version = snapshot.version
+        self.ids = snapshot.ids
+        self.position = snapshot.position
+        compiled = compiled_catalog(snapshot)
+        self.rules = [compiled.get(sid) for sid in self.ids]
+        n = len(self.ids)
+
+        self.required = np.zeros((n, len(FIELDS)), dtype=bool)
+        # (field, FIELDS column) in the scheme's own asking order, for missing_fields lists
+        self.required_index = [[(f, FIELDS.index(f)) for f in rule.required if f in FIELDS] if rule else [] for rule in self.rules]
+        self.reasons: List[Dict[str, str]] = []
+        self.expr_rows: List[int] = []
+        leaves_by_key: Dict[str, List[Any]] = {key: [None] * n for key in FLAT_RULES}
+        for i, rule in enumerate(self.rules):
+            if rule is None or rule.leaves is None:
+                if rule is not None:
+                    self.expr_rows.append(i)
+                self.reasons.append({})
+                continue
+            for leaf in rule.leaves:
+                leaves_by_key[leaf.key][i] = leaf
+            self.required[i] = [f in rule.required for f in FIELDS]
+            self.reasons.append({leaf.key: leaf.reason_mr for leaf in rule.leaves})
+
+        self.bounds: Dict[str, np.ndarray] = {}
+        self.codes: Dict[str, Tuple[np.ndarray, List[Tuple[str, ...]]]] = {}
+        for key, (field, op) in FLAT_RULES.items():
+            leaves = leaves_by_key[key]
+            if op in ("min", "max"):
+                self.bounds[key] = np.array([np.nan if l is None or l.bound is None else l.bound for l in leaves], dtype=np.float64)
+            else:
+                # An unconstrained leaf (allowed=None) always passes, like a scheme without the rule
+                self.codes[key] = _codes([None if l is None else l.allowed for l in leaves])
+        # Rule keys some scheme actually constrains; the rest are skipped per evaluation
+        self.active = [(j, key, field, op) for j, (key, (field, op)) in enumerate(FLAT_RULES.items())
+                       if (not np.isnan(self.bounds[key]).all() if op in ("min", "max") else bool(self.codes[key][1]))]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def evaluate(self, profile: Dict[str, Any]) -> EligibilityResult:
+        return self.evaluate_batch([profile]).result(0)
+
+    def evaluate_batch(self, profiles: List[Dict[str, Any]]) -> "BatchEligibility":
+        """Many profiles in one pass: masks gain a leading row axis, and text rules are
+        canonicalized and matched once per distinct profile value in the batch."""
+        m, n = len(profiles), len(self.ids)
+        absent = np.array([[_absent(p.get(f)) for f in FIELDS] for p in profiles], dtype=bool).reshape(m, len(FIELDS))
+        missing = self.required[None, :, :] & absent[:, None, :]
+        failed = np.zeros((m, n, len(RULES)), dtype=bool)
+
+        for j, key, field, op in self.active:
+            col = absent[:, FIELDS.index(field)]
+            if col.all():
+                continue
+            if op in ("min", "max"):
+                parse = NUMERIC_FIELDS[field]
+                values = [None if a else parse(p.get(field)) for p, a in zip(profiles, col)]
+                xs = np.array([np.nan if x is None else x for x in values], dtype=np.float64)
+                bounds = self.bounds[key]
+                with np.errstate(invalid="ignore"):  # NaN (no rule / no usable value) compares False
+                    failed[:, :, j] = xs[:, None] < bounds[None, :] if op == "min" else xs[:, None] > bounds[None, :]
+                continue
+            codes, distinct = self.codes[key]
+            canon = VALUE_CANON.get(field, _norm_text)
+            ok_rows: List[List[bool]] = []
+            seen: Dict[Any, int] = {}
+            which = np.full(m, -1, dtype=np.int64)  # -1: absent, picks the all-True row
+            for r, p in enumerate(profiles):
+                if col[r]:
+                    continue
+                value = p.get(field)
+                k = value if isinstance(value, (str, int, float, bool)) else repr(value)
+                if k not in seen:
+                    user = canon(value)
+                    seen[k] = len(ok_rows)
+                    # trailing True: schemes without this rule (code -1)
+                    ok_rows.append([match_text(field, user, allowed) for allowed in distinct] + [True])
+                which[r] = seen[k]
+            ok = np.array(ok_rows + [[True] * (len(distinct) + 1)], dtype=bool)
+            failed[:, :, j] = ~ok[which][:, codes]
+
+        # A failed rule decides the scheme even while other fields are missing
+        status = np.where(failed.any(axis=2), STATUS_NOT_ELIGIBLE,
+                          np.where(missing.any(axis=2), STATUS_NEEDS_INFO, STATUS_ELIGIBLE)).astype(np.int8)
+        expr: Dict[Tuple[int, int], Tuple[str, List[str], List[str]]] = {}
+        for r, p in enumerate(profiles):
+            for i in self.expr_rows:
+                verdict = expr[(r, i)] = self.rules[i].evaluate(p)
+                status[r, i] = _STATUS[verdict[0]]
+                failed[r, i, _EXPR] = verdict[0] == "not_eligible"
+                missing[r, i] = [f in verdict[2] for f in FIELDS]
+        return BatchEligibility(self, status, failed, missing, expr)
+
+class BatchEligibility:
+    """`evaluate_batch` output: status (m, n), failed (m, n, len(RULES)), missing (m, n, len(FIELDS))."""
+
+    def __init__(self, table: EligibilityTable, status: np.ndarray, failed: np.ndarray, missing: np.ndarray,
+                 expr: Dict[Tuple[int, int], Tuple[str, List[str], List[str]]]):
+        self.table = table
+        self.status = status
+        self.failed = failed
+        self.missing = missing
+        self.expr = expr
+
+    def __len__(self) -> int:
+        return self.status.shape[0]
+
+    def result(self, r: int) -> EligibilityResult:
+        expr = {i: v for (rr, i), v in self.expr.items() if rr == r}
+        return EligibilityResult(self.table, self.status[r], self.failed[r], self.missing[r], expr)
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """EligibilityResult.summary() for every row (without catalog_version), built
+        from the nonzero entries of the masks instead of per-row NumPy calls."""
+        ids, n = self.table.ids, self.status.shape[1]
+        out = [{"eligible": [], "needs_more_info": [], "not_eligible": []} for _ in range(len(self))]
+        r_, i_ = np.nonzero(self.status == STATUS_ELIGIBLE)
+        for r, i in zip(r_.tolist(), i_.tolist()):
+            out[r]["eligible"].append(ids[i])
+
+        failed_at: Dict[int, List[str]] = {}
+        r_, i_, j_ = np.nonzero(self.failed)
+        for cell, j in zip((r_ * n + i_).tolist(), j_.tolist()):
+            failed_at.setdefault(cell, []).append(RULES[j])
+        for r, i in zip(*(a.tolist() for a in np.nonzero(self.status == STATUS_NOT_ELIGIBLE))):
+            out[r]["not_eligible"].append({"scheme_id": ids[i], "failed_rules": failed_at.get(r * n + i, []), "missing_fields": []})
+
+        r_, i_ = np.nonzero(self.status == STATUS_NEEDS_INFO)
+        rows = self.missing[r_, i_].tolist()
+        for r, i, row in zip(r_.tolist(), i_.tolist(), rows):
+            if (r, i) in self.expr:
+                missing = list(self.expr[(r, i)][2])
+            else:
+                missing = [f for f, k in self.table.required_index[i] if row[k]]
+            out[r]["needs_more_info"].append({"scheme_id": ids[i], "failed_rules": failed_at.get(r * n + i, []), "missing_fields": missing})
+        return out
+
+_lock = threading.Lock()
+_tables: "OrderedDict[str, EligibilityTable]" = OrderedDict()
+
+def eligibility_table(snapshot: CatalogSnapshot | None = None) -> EligibilityTable:
+    """Table for `snapshot` (default: current catalog), compiled once per catalog version."""
+    snapshot = snapshot or catalog()
+    table = _tables.get(snapshot.version)
+    if table is not None:
+        return table
+    with _lock:
+        table = _tables.get(snapshot.version)
+        if table is None:
+            t0 = time.perf_counter()
+            table = _tables[snapshot.version] = EligibilityTable(snapshot)
+            while len(_tables) > 2:
+                _tables.popitem(last=False)
+            logger.info("Eligibility table built schemes=%d ms=%.1f version=%s", len(table), (time.perf_counter() - t0) * 1000, snapshot.version[:12])
+        return table
+
+def eligible_schemes(profile: Dict[str, Any], snapshot: CatalogSnapshot | None = None) -> EligibilityResult:
+    return eligibility_table(snapshot).evaluate(profile)
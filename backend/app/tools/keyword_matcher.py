@@ -0,0 +1,57 @@
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+class KeywordAutomaton:
+    """Aho–Corasick automaton over many keywords, each tagged with one or more labels.
+
+    `scan(text)` walks the text once and returns every label whose keyword occurs as a
+    substring, independent of how many keywords or labels there are.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[int]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[int]] = [set()]
+        for word, labels in keywords.items():
+            if not word:
+                continue
+            node = 0
+            for ch in word:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                node = nxt
+            self._out[node].update(labels)
+        # BFS fail links; outputs of the longest proper suffix are merged in
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                cand = self._goto[f].get(ch, 0)
+                self._fail[nxt] = cand if cand != nxt else 0
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def scan(self, text: str) -> Set[int]:
+        found: Set[int] = set()
+        node = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+        return found
@@ -0,0 +1,436 @@
+"""Scheme eligibility rules: canonicalization helpers and a small rule DSL.
+
+A scheme's `rules` dict is an implicit AND of its keys. Flat keys:
+
+    max_income_annual, gender_eq, state_eq, occupation_in, age_min, age_max,
+    district_in, category_in, land_holding_acres_min, land_holding_acres_max
+
+plus combinators over any profile field:
+
+    {"any": [node, ...]}   {"all": [node, ...]}   {"not": node}
+    node = a rules dict, or {"field": f, "eq" | "in" | "min" | "max": value, "reason_mr": "..."}
+
+Rules compile once per catalog version into predicate closures with the canonical
+values precomputed. A closure returns (ok, reasons, missing); ok is None when a field
+it needs is absent. The combinators follow Kleene logic: a failed test decides an AND
+(and so the scheme: not eligible) even while other fields are still missing, a passed
+one decides an `any`; a missing field only makes the result "needs more info" when
+nothing has decided it.
+"""
+from __future__ import annotations
+import logging, threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.catalog import CatalogSnapshot, catalog
+
+logger = logging.getLogger("sevasetu")
+
+# --- Normalization helpers (demo-stability for Marathi inputs) ---
+def _norm_text(x: Any) -> str:
+    return str(x or "").strip().lower()
+
+# Whisper often outputs Marathi state names in Devanagari or slightly misspelled.
+# Canonicalize to a stable English key for rule matching.
+_STATE_ALIASES = {
+    "maharashtra": {
+        "maharashtra", "mh",
+        "महाराष्ट्र", "महाराष्‍ट्र", "महाष्ट्र",
+        "माराष्ट्र", "मारास्ट्र", "मारास्ट्र!", "माराष्ट्र!",
+    },
+}
+
+def _canonical(x: Any, aliases: Dict[str, set]) -> str:
+    t = _norm_text(x)
+    # Strip trailing punctuation
+    t = t.strip("!?. ,")
+    for canon, names in aliases.items():
+        if t in names:
+            return canon
+    return t
+
+def canonical_state(x: Any) -> str:
+    return _canonical(x, _STATE_ALIASES)
+
+_GENDER_ALIASES = {
+    "female": {"female", "f", "woman", "women", "girl", "महिला", "स्त्री", "बाई", "मुलगी"},
+    "male": {"male", "m", "man", "men", "boy", "पुरुष", "नर", "मुलगा"},
+    "all": {"all", "any", "सर्व"},
+}
+
+def canonical_gender(x: Any) -> str:
+    return _canonical(x, _GENDER_ALIASES)
+
+DISTRICT_ALIASES = {
+    "pune": {"pune", "poona", "पुणे"},
+    "mumbai": {"mumbai", "mumbai city", "bombay", "मुंबई"},
+    "mumbai suburban": {"mumbai suburban", "मुंबई उपनगर"},
+    "thane": {"thane", "ठाणे"},
+    "palghar": {"palghar", "पालघर"},
+    "raigad": {"raigad", "रायगड"},
+    "ratnagiri": {"ratnagiri", "रत्नागिरी"},
+    "sindhudurg": {"sindhudurg", "सिंधुदुर्ग"},
+    "nashik": {"nashik", "nasik", "नाशिक"},
+    "ahilyanagar": {"ahilyanagar", "ahmednagar", "अहिल्यानगर", "अहमदनगर"},
+    "chhatrapati sambhajinagar": {"chhatrapati sambhajinagar", "aurangabad", "छत्रपती संभाजीनगर", "औरंगाबाद"},
+    "dharashiv": {"dharashiv", "osmanabad", "धाराशिव", "उस्मानाबाद"},
+    "solapur": {"solapur", "सोलापूर"},
+    "satara": {"satara", "सातारा"},
+    "sangli": {"sangli", "सांगली"},
+    "kolhapur": {"kolhapur", "कोल्हापूर"},
+    "nagpur": {"nagpur", "नागपूर"},
+    "amravati": {"amravati", "अमरावती"},
+    "akola": {"akola", "अकोला"},
+    "jalgaon": {"jalgaon", "जळगाव"},
+    "latur": {"latur", "लातूर"},
+    "nanded": {"nanded", "नांदेड"},
+    "beed": {"beed", "बीड"},
+    "yavatmal": {"yavatmal", "यवतमाळ"},
+    "chandrapur": {"chandrapur", "चंद्रपूर"},
+    "gadchiroli": {"gadchiroli", "गडचिरोली"},
+}
+
+def canonical_district(x: Any) -> str:
+    t = _norm_text(x)
+    for suffix in (" district", " जिल्हा", "जिल्हा"):
+        if t.endswith(suffix):
+            t = t[: -len(suffix)]
+    return _canonical(t, DISTRICT_ALIASES)
+
+CATEGORY_ALIASES = {
+    "sc": {"sc", "एससी", "अनुसूचित जाती", "अनुसूचित जात"},
+    "st": {"st", "एसटी", "अनुसूचित जमाती", "अनुसूचित जमात", "आदिवासी"},
+    "obc": {"obc", "ओबीसी", "इतर मागास वर्ग", "इतर मागासवर्ग"},
+    "sbc": {"sbc", "विशेष मागास प्रवर्ग"},
+    "vjnt": {"vjnt", "nt", "dt", "विमुक्त जाती", "भटक्या जमाती", "व्हीजेएनटी"},
+    "sebc": {"sebc", "एसईबीसी", "सामाजिक आणि शैक्षणिक मागास"},
+    "ews": {"ews", "आर्थिकदृष्ट्या दुर्बल घटक", "आर्थिक दुर्बल"},
+    "open": {"open", "general", "खुला", "खुला प्रवर्ग", "सर्वसाधारण"},
+}
+
+def canonical_category(x: Any) -> str:
+    return _canonical(x, CATEGORY_ALIASES)
+
+_FARMER_WORDS = {"शेतकरी", "शेती", "शेतीकरी", "फार्मर", "किसान"}
+
+def canonical_occupation(x: Any) -> str:
+    t = _norm_text(x)
+    # If user said Marathi synonyms for farmer, map quickly for common cases
+    return "farmer" if t in _FARMER_WORDS else t
+
+def safe_int(val: Any) -> Optional[int]:
+    try: return int(float(val))
+    except Exception: return None
+
+def safe_float(val: Any) -> Optional[float]:
+    try: return float(val)
+    except Exception: return None
+
+def _absent(v: Any) -> bool:
+    return v is None or (isinstance(v, str) and not v.strip())
+
+def _missing(profile: Dict[str, Any], fields: List[str]) -> List[str]:
+    return [f for f in fields if _absent(profile.get(f))]
+
+# Reason strings (templates take the scheme's limit); also prewarmed into the TTS cache
+REASON_INCOME_MR = "तुमचे उत्पन्न मर्यादेपेक्षा जास्त आहे (Max: ₹{limit})."
+REASON_GENDER_MR = "ही योजना फक्त विशिष्ट लिंगासाठी आहे."
+REASON_STATE_MR = "ही योजना विशिष्ट राज्यासाठी आहे."
+REASON_OCCUPATION_MR = "तुमचा व्यवसाय या योजनेसाठी पात्र नाही."
+REASON_AGE_MIN_MR = "वय कमी आहे (किमान {age_min} वर्षे)."
+REASON_AGE_MAX_MR = "वय जास्त आहे (कमाल {age_max} वर्षे)."
+REASON_DISTRICT_MR = "ही योजना तुमच्या जिल्ह्यासाठी नाही."
+REASON_CATEGORY_MR = "ही योजना तुमच्या प्रवर्गासाठी नाही."
+REASON_LAND_MIN_MR = "जमीन कमी आहे (किमान {acres} एकर)."
+REASON_LAND_MAX_MR = "जमीन जास्त आहे (कमाल {acres} एकर)."
+REASON_RULE_MR = "या योजनेचे पात्रता निकष पूर्ण होत नाहीत."
+REASON_REVIEW_MR = "या योजनेचे पात्रता निकष सध्या तपासले जात आहेत."
+REASON_ELIGIBLE_MR = "तुम्ही या योजनेसाठी पात्र आहात!"
+
+FIELD_NAMES_MR = {
+    "income_annual": "वार्षिक उत्पन्न", "age": "वय", "gender": "लिंग", "occupation": "व्यवसाय", "state": "राज्य",
+    "district": "जिल्हा", "category": "प्रवर्ग", "land_holding_acres": "शेतजमीन (एकर)",
+}
+
+# Flat rule keys -> (profile field, operator), in the order checks run and reasons are reported
+FLAT_RULES: Dict[str, Tuple[str, str]] = {
+    "max_income_annual": ("income_annual", "max"),
+    "gender_eq": ("gender", "eq"),
+    "state_eq": ("state", "eq"),
+    "occupation_in": ("occupation", "in"),
+    "age_min": ("age", "min"),
+    "age_max": ("age", "max"),
+    "district_in": ("district", "in"),
+    "category_in": ("category", "in"),
+    "land_holding_acres_min": ("land_holding_acres", "min"),
+    "land_holding_acres_max": ("land_holding_acres", "max"),
+}
+COMBINATORS = ("all", "any", "not")
+# Present in schemes.json but never enforced (no slot question collects family size)
+IGNORED_RULES = {"family_size_min"}
+
+# Numeric fields and how a profile value / bound is parsed (ints truncate, as before)
+NUMERIC_FIELDS: Dict[str, Callable[[Any], Optional[float]]] = {
+    "income_annual": safe_int, "age": safe_int, "family_size": safe_int, "land_holding_acres": safe_float,
+}
+# Text canonicalizers for the profile value; rule values use the same except occupation,
+# whose allowed list is only lowercased (it is matched loosely, by substring)
+VALUE_CANON: Dict[str, Callable[[Any], str]] = {
+    "gender": canonical_gender, "state": canonical_state, "district": canonical_district,
+    "category": canonical_category, "occupation": canonical_occupation,
+}
+RULE_CANON: Dict[str, Callable[[Any], str]] = {**VALUE_CANON, "occupation": _norm_text}
+# Loose match (either side contains the other) absorbs minor transcription noise
+LOOSE_FIELDS = {"state", "occupation"}
+
+_REASONS = {
+    ("income_annual", "max"): lambda raw: REASON_INCOME_MR.format(limit=safe_int(raw)),
+    ("age", "min"): lambda raw: REASON_AGE_MIN_MR.format(age_min=raw),
+    ("age", "max"): lambda raw: REASON_AGE_MAX_MR.format(age_max=raw),
+    ("land_holding_acres", "min"): lambda raw: REASON_LAND_MIN_MR.format(acres=raw),
+    ("land_holding_acres", "max"): lambda raw: REASON_LAND_MAX_MR.format(acres=raw),
+    ("gender", "eq"): lambda raw: REASON_GENDER_MR,
+    ("state", "eq"): lambda raw: REASON_STATE_MR,
+    ("occupation", "in"): lambda raw: REASON_OCCUPATION_MR,
+    ("district", "in"): lambda raw: REASON_DISTRICT_MR,
+    ("category", "in"): lambda raw: REASON_CATEGORY_MR,
+}
+
+class RuleError(ValueError):
+    """A scheme's rules dict does not parse."""
+
+class Leaf(NamedTuple):
+    """One field test. `bound` for min/max (None if it does not parse: never fails);
+    `allowed` canonical values for eq/in (None: any value passes, the field is still required)."""
+    key: str
+    field: str
+    op: str
+    bound: Optional[float]
+    allowed: Optional[Tuple[str, ...]]
+    reason_mr: str
+
+Verdict = Tuple[Optional[bool], Sequence[str], Sequence[str]]  # (ok, reasons, missing)
+Predicate = Callable[[Dict[str, Any]], Verdict]
+_PASS: Verdict = (True, (), ())
+
+def match_text(field: str, user: str, allowed: Tuple[str, ...]) -> bool:
+    """Canonical profile value `user` against a leaf's canonical `allowed` values."""
+    if field in LOOSE_FIELDS:
+        return any(user == a or user in a or a in user for a in allowed)
+    return user in allowed
+
+def _leaf(key: str, field: str, op: str, raw: Any, reason_mr: Optional[str]) -> Leaf:
+    reason = reason_mr or _REASONS.get((field, op), lambda raw: REASON_RULE_MR)(raw)
+    if op in ("min", "max"):
+        parse = NUMERIC_FIELDS.get(field, safe_float)
+        bound = parse(raw)
+        return Leaf(key, field, op, None if bound is None else float(bound), None, reason)
+    if op not in ("eq", "in"):
+        raise RuleError(f"unknown operator {op!r} for {field!r}")
+    canon = RULE_CANON.get(field, _norm_text)
+    if op == "eq":
+        c = canon(raw)
+        # An empty requirement (or gender "all") constrains nothing
+        wildcard = c == "" or (field == "gender" and c == "all")
+        return Leaf(key, field, op, None, None if wildcard else (c,), reason)
+    if not isinstance(raw, (list, tuple)):
+        raise RuleError(f"{key!r} expects a list, got {type(raw).__name__}")
+    return Leaf(key, field, op, None, tuple(canon(x) for x in raw), reason)
+
+def _test_leaf(leaf: Leaf) -> Predicate:
+    field, missing = leaf.field, (None, (), (leaf.field,))
+    failed = (False, (leaf.reason_mr,), ())
+    if leaf.op in ("min", "max"):
+        parse, bound, is_min = NUMERIC_FIELDS.get(field, safe_float), leaf.bound, leaf.op == "min"
+        def test(profile: Dict[str, Any]) -> Verdict:
+            v = profile.get(field)
+            if _absent(v):
+                return missing
+            x = parse(v)
+            if x is None or bound is None:
+                return _PASS
+            return failed if (x < bound if is_min else x > bound) else _PASS
+        return test
+    canon, allowed = VALUE_CANON.get(field, _norm_text), leaf.allowed
+    exact = frozenset(allowed or ()) if field not in LOOSE_FIELDS else None
+    def test(profile: Dict[str, Any]) -> Verdict:
+        v = profile.get(field)
+        if _absent(v):
+            return missing
+        if allowed is None:
+            return _PASS
+        user = canon(v)
+        ok = (user in exact) if exact is not None else match_text(field, user, allowed)
+        return _PASS if ok else failed
+    return test
+
+def _dedupe(xs: Sequence[str]) -> List[str]:
+    return list(dict.fromkeys(xs))
+
+def _all(children: List[Predicate]) -> Predicate:
+    def test(profile: Dict[str, Any]) -> Verdict:
+        unknown = False
+        reasons: List[str] = []
+        missing: List[str] = []
+        for child in children:
+            ok, r, m = child(profile)
+            if ok is None:
+                unknown = True
+                missing.extend(m)
+            elif not ok:
+                reasons.extend(r)
+        # A failed test decides the AND even while other fields are still missing
+        if reasons:
+            return False, reasons, ()
+        return (None, (), _dedupe(missing)) if unknown else _PASS
+    return test
+
+def _any(children: List[Predicate], reason_mr: Optional[str]) -> Predicate:
+    def test(profile: Dict[str, Any]) -> Verdict:
+        unknown = False
+        reasons: List[str] = []
+        missing: List[str] = []
+        for child in children:
+            ok, r, m = child(profile)
+            if ok:
+                return _PASS
+            if ok is None:
+                unknown = True
+                missing.extend(m)
+            reasons.extend(r)
+        if unknown:
+            return None, (), _dedupe(missing)
+        return False, ((reason_mr,) if reason_mr else _dedupe(reasons)), ()
+    return test
+
+def _not(child: Predicate, reason_mr: Optional[str]) -> Predicate:
+    failed = (False, (reason_mr or REASON_RULE_MR,), ())
+    def test(profile: Dict[str, Any]) -> Verdict:
+        ok, _, m = child(profile)
+        if ok is None:
+            return None, (), m
+        return failed if ok else _PASS
+    return test
+
+class CompiledRule:
+    """A scheme's rules, compiled. `required` lists every field any test reads (the
+    ordered slot-fill list); `reasons_mr` every reason the rules can give; `leaves` is
+    set when the rules are a plain AND of field tests (no combinators), which is what
+    the columnar table can evaluate directly; `field_leaves` always holds every field
+    test, combinators or not (the question planner probes answers from their bounds)."""
+
+    __slots__ = ("test", "required", "reasons_mr", "leaves", "field_leaves")
+
+    def __init__(self, test: Predicate, required: List[str], reasons_mr: List[str], leaves: Optional[Tuple[Leaf, ...]],
+                 field_leaves: Tuple[Leaf, ...] = ()):
+        self.test = test
+        self.required = required
+        self.reasons_mr = reasons_mr
+        self.leaves = leaves
+        self.field_leaves = field_leaves
+
+    def evaluate(self, profile: Dict[str, Any]) -> Tuple[str, List[str], List[str]]:
+        """(status, reasons, missing_fields) with status eligible | not_eligible | needs_more_info."""
+        ok, reasons, missing = self.test(profile)
+        if ok is None:
+            return "needs_more_info", list(reasons), list(missing)
+        if not ok:
+            return "not_eligible", list(reasons), []
+        return "eligible", [], []
+
+class _Compiler:
+    def __init__(self):
+        self.leaves: List[Leaf] = []
+        self.reasons: List[str] = []
+        self.flat = True
+
+    def leaf(self, key: str, field: str, op: str, raw: Any, reason_mr: Optional[str]) -> Predicate:
+        leaf = _leaf(key, field, op, raw, reason_mr)
+        self.leaves.append(leaf)
+        self.reasons.append(leaf.reason_mr)
+        return _test_leaf(leaf)
+
+    def node(self, node: Any) -> Predicate:
+        if not isinstance(node, dict):
+            raise RuleError(f"rule node must be an object, got {type(node).__name__}")
+        reason_mr = node.get("reason_mr")
+        if "field" in node:
+            field = str(node["field"])
+            ops = [op for op in ("eq", "in", "min", "max") if op in node]
+            if not ops or set(node) - {"field", "reason_mr", *ops}:
+                raise RuleError(f"bad field test {node!r}")
+            self.flat = False
+            tests = [self.leaf(f"{field}_{op}", field, op, node[op], reason_mr) for op in ops]
+            return tests[0] if len(tests) == 1 else _all(tests)
+
+        unknown = set(node) - set(FLAT_RULES) - set(COMBINATORS) - IGNORED_RULES - {"reason_mr"}
+        if unknown:
+            raise RuleError(f"unknown rule keys {sorted(unknown)}")
+        tests = [self.leaf(key, field, op, node[key], None) for key, (field, op) in FLAT_RULES.items() if key in node]
+        for key in COMBINATORS:
+            if key not in node:
+                continue
+            self.flat = False
+            value = node[key]
+            if key == "not":
+                tests.append(_not(self.node(value), reason_mr))
+                self.reasons.append(reason_mr or REASON_RULE_MR)
+                continue
+            if not isinstance(value, list) or not value:
+                raise RuleError(f"{key!r} expects a non-empty list")
+            children = [self.node(child) for child in value]
+            if key == "all":
+                tests.append(_all(children))
+            else:
+                tests.append(_any(children, reason_mr))
+                if reason_mr:
+                    self.reasons.append(reason_mr)
+        return tests[0] if len(tests) == 1 else _all(tests)
+
+def compile_rules(rules: Dict[str, Any] | None) -> CompiledRule:
+    c = _Compiler()
+    test = c.node(rules or {})
+    required = _dedupe([leaf.field for leaf in c.leaves])
+    leaves = tuple(c.leaves)
+    return CompiledRule(test, required, _dedupe(c.reasons), leaves if c.flat else None, leaves)
+
+_UNDER_REVIEW: Verdict = (False, (REASON_REVIEW_MR,), ())
+
+def _compile_scheme(scheme_id: str, rules: Dict[str, Any] | None) -> CompiledRule:
+    """compile_rules, except a malformed rules dict (logged) yields a rule that never
+    passes, so one bad scheme cannot take the whole catalog down with it."""
+    try:
+        return compile_rules(rules)
+    except RuleError as e:
+        logger.error("Scheme rules invalid, marked for review scheme_id=%s error=%s", scheme_id, e)
+        return CompiledRule(lambda profile: _UNDER_REVIEW, [], [REASON_REVIEW_MR], None)
+
+_lock = threading.Lock()
+_compiled: "OrderedDict[str, Dict[str, CompiledRule]]" = OrderedDict()
+
+def compiled_catalog(snapshot: CatalogSnapshot) -> Dict[str, CompiledRule]:
+    """scheme_id -> CompiledRule for a CatalogSnapshot, compiled once per catalog version."""
+    rules = _compiled.get(snapshot.version)
+    if rules is not None:
+        return rules
+    with _lock:
+        rules = _compiled.get(snapshot.version)
+        if rules is None:
+            t0 = time.perf_counter()
+            rules = {sid: _compile_scheme(sid, snapshot.by_id[sid].get("rules")) for sid in snapshot.position}
+            _compiled[snapshot.version] = rules
+            while len(_compiled) > 2:
+                _compiled.popitem(last=False)
+            logger.info("Rules compiled schemes=%d ms=%.1f version=%s", len(rules), (time.perf_counter() - t0) * 1000, snapshot.version[:12])
+        return rules
+
+def rule_for(scheme: Dict[str, Any], snapshot: CatalogSnapshot | None = None) -> CompiledRule:
+    """Compiled rules of `scheme`: the cached form when the snapshot has the same scheme
+    (same id and rules, e.g. a retrieval copy), else compiled on the spot."""
+    snapshot = snapshot or catalog()
+    sid = scheme.get("scheme_id") or ""
+    own = snapshot.get(sid)
+    # Retrieval hands out copies, so match on the rules themselves, not identity
+    if own is not None and (own is scheme or own.get("rules") == scheme.get("rules")):
+        return compiled_catalog(snapshot)[sid]
+    return _compile_scheme(sid, scheme.get("rules"))
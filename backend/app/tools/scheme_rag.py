@@ -1,16 +1,27 @@
 from __future__ import annotations
-import json, logging, math, re
+import hashlib, json, logging, re, threading, time
+from collections import OrderedDict
+from contextlib import aclosing
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, NamedTuple, Tuple
+import numpy as np
 
-from app.llm import chat_completion
+from app.catalog import DATA_PATH, CatalogSnapshot, catalog
+from app.database import database
+from app.db import (
+    ensure_schemes_loaded, get_llm_decision, save_llm_decision,
+    search_schemes_fts, get_schemes_by_ids, schemes_version, fts_tokens,
+)
+from app.llm import LLMUnavailable, llm_client
+from app.tools.bm25 import Bm25Matrix, top_k
+from app.tools.dense import CharNgramEncoder, DenseIndex, fold_text, rrf_fuse
+from app.tools.keyword_matcher import KeywordAutomaton
 from app.settings import settings
 
 logger = logging.getLogger("sevasetu")
 
 BASE_DIR = Path(__file__).resolve().parents[1]
-
-DATA_PATH = BASE_DIR / "data" / "schemes.json"
+BOOST_RULES_PATH = BASE_DIR / "data" / "boost_rules.json"
 
 # Common Marathi/Hinglish filler words that add noise for retrieval
 STOPWORDS = {
@@ -20,49 +31,56 @@ STOPWORDS = {
     "scheme", "yojana", "info", "details",
 }
 
-def _heuristic_boost(query: str, scheme: Dict[str, Any]) -> float:
-    """Small keyword boosts to avoid obvious mismatches on generic queries."""
-    q = (query or "").lower()
+def _rule_matches(rule: Dict[str, Any], scheme: Dict[str, Any]) -> bool:
+    """Scheme side of a boost rule: listed id, or a category/name substring."""
+    m = rule.get("match") or {}
     sid = (scheme.get("scheme_id") or "").lower()
     cat = (scheme.get("category_mr") or "").lower()
     name = (scheme.get("name_mr") or "").lower()
+    return (
+        sid in {x.lower() for x in m.get("scheme_ids", [])}
+        or any(x.lower() in cat for x in m.get("category_contains", []))
+        or any(x.lower() in name for x in m.get("name_contains", []))
+    )
 
-    boost = 0.0
-
-    # Farmer / Kisan
-    if any(x in q for x in ["शेतकरी", "किसान", "kisan", "farmer", "farming", "agriculture", "शेती"]):
-        if "शेतकरी" in cat or sid == "pm_kisan" or "किसान" in name:
-            boost += 2.8
-
-    # Women / Ladli
-    if any(x in q for x in ["महिला", "स्त्री", "बहीण", "लाडकी", "ladli", "woman", "women"]):
-        if "महिला" in cat or sid == "ladli_bahin" or "बहीण" in name or "लाडकी" in name:
-            boost += 2.8
+class BoostTable:
+    """Keyword boosts so generic intents route to the right scheme/category.
 
-    # Health / Ayushman
-    if any(x in q for x in ["आरोग्य", "आयुष्मान", "hospital", "health", "treatment", "विमा"]):
-        if "आरोग्य" in cat or sid == "pmjay" or "आयुष्मान" in name:
-            boost += 2.8
+    The rules come from `data/boost_rules.json` (intent keywords -> scheme ids /
+    category / name substrings -> weight) and are compiled against one catalog: every
+    keyword goes into a single Aho–Corasick automaton and every rule keeps the docs it
+    boosts. A query is scanned once, whatever the number of rules or schemes.
+    """
 
-    # Pension / Traders
-    if any(x in q for x in ["पेन्शन", "pension", "व्यापारी", "दुकानदार", "shopkeeper", "trader", "व्यवसाय"]):
-        if sid == "nps_traders" or "पेन्शन" in cat:
-            boost += 2.4
+    def __init__(self, rules: List[Dict[str, Any]], schemes: List[Dict[str, Any]]):
+        self.rules = [r for r in rules if self._valid(r)]
+        keywords: Dict[str, List[int]] = {}
+        for i, r in enumerate(self.rules):
+            for kw in r["keywords"]:
+                keywords.setdefault(kw.lower(), []).append(i)
+        self.automaton = KeywordAutomaton(keywords)
+        self.weights = np.array([float(r["weight"]) for r in self.rules], dtype=np.float64)
+        self.docs: List[np.ndarray] = [
+            np.array([d for d, s in enumerate(schemes) if _rule_matches(r, s)], dtype=np.int64) for r in self.rules
+        ]
+        self.n_docs = len(schemes)
 
-    # Girl child
-    if any(x in q for x in ["मुलगी", "बालिका", "लेक", "girl", "ladki", "daughter"]):
-        if sid == "lekh_ladki" or "बालिका" in cat or "लेक" in name:
-            boost += 2.4
+    @staticmethod
+    def _valid(rule: Any) -> bool:
+        ok = isinstance(rule, dict) and isinstance(rule.get("keywords"), list) and isinstance(rule.get("weight"), (int, float))
+        if not ok:
+            logger.warning("Boost rule skipped (needs keywords list + numeric weight) rule=%s", str(rule)[:120])
+        return ok
 
-    return boost
+    def vector(self, query: str) -> np.ndarray:
+        out = np.zeros(self.n_docs, dtype=np.float64)
+        for r in self.automaton.scan((query or "").lower()):
+            out[self.docs[r]] += self.weights[r]
+        return out
 
-def _load() -> List[Dict[str, Any]]:
-    if not DATA_PATH.exists():
-        logger.warning("Schemes file missing path=%s", DATA_PATH)
-        return []
-    data = json.loads(DATA_PATH.read_text(encoding="utf-8"))
-    logger.debug("Schemes loaded count=%d", len(data))
-    return data
+    def score(self, query_rules: set, scheme: Dict[str, Any]) -> float:
+        """Boost of one scheme given the rules `automaton.scan` found in the query."""
+        return float(sum(self.weights[r] for r in query_rules if _rule_matches(self.rules[r], scheme)))
 
 def _tok(text: str) -> List[str]:
     t = (text or "").lower()
@@ -72,58 +90,212 @@ def _tok(text: str) -> List[str]:
     toks = [x for x in toks if x not in STOPWORDS]
     return toks
 
-def _bm25(query: str, docs: List[str]) -> List[Tuple[int,float]]:
-    k1, b = 1.2, 0.75
-    q = _tok(query)
-    if not q:
-        return [(i,0.0) for i in range(len(docs))]
-    doc_toks = [_tok(d) for d in docs]
-    N = len(doc_toks)
-    avgdl = sum(len(t) for t in doc_toks) / max(1, N)
-    df = {term: sum(1 for dt in doc_toks if term in dt) for term in set(q)}
-    scores = []
-    for i, dt in enumerate(doc_toks):
-        dl = len(dt)
-        tf = {}
-        for term in dt:
-            tf[term] = tf.get(term, 0) + 1
-        score = 0.0
-        for term in q:
-            if term not in tf: 
-                continue
-            n = df.get(term, 0)
-            idf = math.log(1 + (N - n + 0.5) / (n + 0.5))
-            f = tf[term]
-            denom = f + k1 * (1 - b + b * dl / max(1.0, avgdl))
-            score += idf * (f * (k1 + 1)) / denom
-        scores.append((i, score))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return scores
-
-def retrieve_schemes(query_mr: str, k: int = 5) -> List[Dict[str, Any]]:
-    schemes = _load()
-    if not schemes:
+def _doc_text(s: Dict[str, Any]) -> str:
+    return "\n".join([s.get("name_mr",""), s.get("category_mr",""), s.get("benefits_mr",""), s.get("description_mr","")])
+
+_FOLDED_STOPWORDS = {fold_text(w) for w in STOPWORDS}
+
+def _dense_text(text: str) -> str:
+    return " ".join(w for w in fold_text(text).split() if w not in _FOLDED_STOPWORDS)
+
+class Hit(NamedTuple):
+    doc: int
+    score: float   # lexical: BM25 + keyword boosts
+    bm25: float
+    dense: float   # cosine of the char n-gram embeddings (0.0 when hybrid is off)
+    fused: float   # reciprocal-rank fusion of both channels (== score when hybrid is off)
+
+class SchemeIndex:
+    """Immutable retrieval index over one catalog snapshot.
+
+    Built once per (catalog snapshot, boost rules) version: a CSR term x document BM25 weight matrix
+    (`Bm25Matrix`), the compiled keyword boost table (`BoostTable`) and, for the hybrid channel,
+    a float32 matrix of hashed char n-gram embeddings (`DenseIndex`). A query gathers
+    the rows of its own terms, picks the top-k with `argpartition` and, with hybrid
+    on, fuses the lexical and dense rankings with RRF.
+    """
+
+    def __init__(self, snapshot: CatalogSnapshot, boost_rules: List[Dict[str, Any]] | None = None, rules_digest: str = ""):
+        self.catalog = snapshot
+        self.schemes = snapshot.schemes
+        self.key = (snapshot.version, rules_digest)
+        schemes = self.schemes
+        self.matrix = Bm25Matrix([_tok(_doc_text(s)) for s in schemes])
+        self.boost = BoostTable(boost_rules or [], schemes)
+        self.encoder: CharNgramEncoder | None = None
+        self.dense: DenseIndex | None = None
+        if settings.rag_hybrid_enabled and schemes:
+            self.encoder = CharNgramEncoder(dim=int(settings.rag_dense_dim))
+            # Name twice: ASR-garbled queries are usually (misspelt) scheme names
+            texts = [_dense_text("\n".join([s.get("name_mr", "")] * 2 + [_doc_text(s)])) for s in schemes]
+            self.dense = DenseIndex(
+                self.encoder.encode_batch(texts),
+                ann_min_docs=int(settings.rag_dense_ann_min_docs),
+                nprobe=int(settings.rag_dense_nprobe),
+            )
+
+    def __len__(self) -> int:
+        return len(self.schemes)
+
+    def boosts(self, query: str) -> np.ndarray:
+        return self.boost.vector(query)
+
+    def search(self, query: str, k: int) -> List[Hit]:
+        """Top-k hits; lexical ties keep BM25-desc, then catalog order."""
+        bm = self.matrix.score(_tok(query))
+        final = bm + self.boosts(query)
+        if self.dense is None or k <= 0:
+            return [Hit(int(d), float(final[d]), float(bm[d]), 0.0, float(final[d])) for d in top_k(final, k, tiebreak=bm)]
+
+        depth = max(k, int(settings.rag_rrf_depth))
+        lexical = [int(d) for d in top_k(final, depth, tiebreak=bm) if final[d] > 0]
+        ids, sims = self.dense.search(self.encoder.encode(_dense_text(query)), depth)
+        keep = sims >= float(settings.rag_dense_min_sim)
+        cos = dict(zip(ids[keep].tolist(), sims[keep].tolist()))
+        fused = rrf_fuse([(lexical, 1.0), (list(cos), float(settings.rag_dense_weight))], int(settings.rag_rrf_k))
+        ranked = sorted(fused, key=lambda d: (-fused[d], -final[d], -bm[d], d))[:k]
+        if len(ranked) < k:
+            # Nothing matched in either channel: lexical order (catalog order for zeros)
+            seen = set(ranked)
+            ranked += [int(d) for d in top_k(final, k + len(seen), tiebreak=bm) if int(d) not in seen][:k - len(ranked)]
+        return [Hit(d, float(final[d]), float(bm[d]), float(cos.get(d, 0.0)), float(fused.get(d, 0.0))) for d in ranked]
+
+def _stat(path: Path) -> Tuple[int, int] | None:
+    try:
+        st = path.stat()
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+_rules_cache: Tuple[Tuple[int, int] | None, str, List[Dict[str, Any]]] | None = None  # (stamp, digest, rules)
+
+def _boost_rules() -> Tuple[str, List[Dict[str, Any]]]:
+    """(content digest, rules) of boost_rules.json, re-read only when the file changes."""
+    global _rules_cache
+    stamp = _stat(BOOST_RULES_PATH)
+    if _rules_cache is None or _rules_cache[0] != stamp:
+        raw = BOOST_RULES_PATH.read_bytes() if stamp is not None else b""
+        _rules_cache = (stamp, hashlib.sha256(raw).hexdigest(), json.loads(raw.decode("utf-8")) if raw else [])
+    return _rules_cache[1], _rules_cache[2]
+
+_index_lock = threading.Lock()
+# Index per (catalog version, rules digest); the previous one is kept for turns still pinned to it
+_indexes: "OrderedDict[Tuple[str, str], SchemeIndex]" = OrderedDict()
+
+def scheme_index(snapshot: CatalogSnapshot | None = None) -> SchemeIndex:
+    """Index for `snapshot` (default: the current catalog), built once per version.
+
+    Catalog and boost rule reloads are detected by `catalog()` / `_boost_rules()`; a new
+    version gets a fresh index that is swapped in atomically.
+    """
+    snapshot = snapshot or catalog()
+    rules_digest, rules = _boost_rules()
+    key = (snapshot.version, rules_digest)
+    idx = _indexes.get(key)
+    if idx is not None:
+        return idx
+    with _index_lock:
+        idx = _indexes.get(key)
+        if idx is not None:
+            return idx
+        t0 = time.perf_counter()
+        idx = SchemeIndex(snapshot, rules, rules_digest)
+        _indexes[key] = idx
+        while len(_indexes) > 2:
+            _indexes.popitem(last=False)
+        logger.info(
+            "Scheme index built schemes=%d terms=%d boost_rules=%d ms=%.1f version=%s",
+            len(idx), len(idx.matrix.vocab), len(idx.boost.rules), (time.perf_counter() - t0) * 1000, snapshot.version[:12],
+        )
+        return idx
+
+# --- SQLite FTS5 backend (RAG_BACKEND=fts5) ---
+# The catalog and its full-text index live in the `schemes` / `schemes_fts` tables, so
+# every worker process shares one on-disk index through the OS page cache.
+
+_fts_boost: Tuple[str, BoostTable] | None = None  # (boost rules digest, table)
+
+_fts_synced: str | None = None  # catalog version last synced into the tables
+
+async def _fts_db(db=None):
+    """The app Database, with the FTS tables re-synced (one writer job) whenever
+    schemes.json changes version."""
+    global _fts_synced
+    db = db if db is not None else database()
+    snap = catalog()
+    if _fts_synced != snap.version:
+        # A no-op job when another coroutine synced this version first
+        await db.write(ensure_schemes_loaded, snap)
+        _fts_synced = snap.version
+    return db
+
+def _fts_boost_table() -> BoostTable:
+    """Boost rules compiled without a catalog (scored per candidate instead)."""
+    global _fts_boost
+    digest, rules = _boost_rules()
+    if _fts_boost is None or _fts_boost[0] != digest:
+        _fts_boost = (digest, BoostTable(rules, []))
+    return _fts_boost[1]
+
+def _fts_match(query: str) -> str:
+    """OR of quoted query tokens (quotes keep FTS5 operators in user text inert).
+
+    Tokens are cut like the index's tokenizer (fts_tokens), not like `_tok`: `_tok`
+    splits at the virama, so a conjunct word would never match its indexed form."""
+    toks = dict.fromkeys(t for t in fts_tokens(query) if len(t) >= 2 and t not in STOPWORDS)
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in toks)
+
+def _fts_candidates(conn, match: str, depth: int, named: List[str]) -> List[Tuple[Dict[str, Any], float]]:
+    """FTS hits plus the named schemes without one (score 0.0); runs on the read pool."""
+    hits = search_schemes_fts(conn, match, depth) if match else []
+    seen = {s["scheme_id"] for s, _ in hits}
+    return hits + [(s, 0.0) for s in get_schemes_by_ids(conn, [x for x in named if x not in seen])]
+
+async def _retrieve_fts(query_mr: str, k: int, db=None) -> List[Dict[str, Any]]:
+    db = await _fts_db(db)
+    boost = _fts_boost_table()
+    rules = boost.automaton.scan((query_mr or "").lower())
+    # Schemes named by a triggered rule compete even without a lexical hit
+    named = sorted({sid for r in rules for sid in (boost.rules[r].get("match") or {}).get("scheme_ids", [])})
+    scored = await db.read(_fts_candidates, _fts_match(query_mr), max(20, 4 * k), named)
+    ranked = sorted(scored, key=lambda x: -(x[1] + boost.score(rules, x[0])))
+    out = []
+    for s, bm in ranked[:k]:
+        s = dict(s)
+        s["_score"] = bm + boost.score(rules, s)
+        out.append(s)
+    return out
+
+async def catalog_version(db=None) -> str:
+    if (settings.rag_backend or "").lower() == "fts5":
+        return await (await _fts_db(db)).read(schemes_version)
+    return catalog().version
+
+async def retrieve_schemes(query_mr: str, k: int = 5, snapshot: CatalogSnapshot | None = None, db=None) -> List[Dict[str, Any]]:
+    """Top-k candidate schemes (copies, annotated with `_score` etc.).
+
+    Pass the turn's `snapshot` so retrieval answers from the same catalog version as
+    the rest of the turn (ignored by the FTS5 backend, which reads the DB catalog
+    through `db`, app.database.Database, by default the app's).
+    """
+    if (settings.rag_backend or "").lower() == "fts5":
+        logger.debug("RAG retrieve backend=fts5 query_len=%d k=%d", len(query_mr or ""), k)
+        return await _retrieve_fts(query_mr, max(0, min(10, k)), db)
+    index = scheme_index(snapshot)
+    if not len(index):
         return []
     logger.debug("RAG retrieve query_len=%d k=%d", len(query_mr or ""), k)
-    docs = []
-    for s in schemes:
-        docs.append("\n".join([s.get("name_mr",""), s.get("category_mr",""), s.get("benefits_mr",""), s.get("description_mr","")]))
-    ranked = _bm25(query_mr, docs)
-    # Add small heuristic boosts so generic intents route to the right scheme/category
-    ranked2: List[Tuple[int, float]] = []
-    for idx, score in ranked:
-        s = schemes[idx]
-        ranked2.append((idx, float(score) + _heuristic_boost(query_mr, s)))
-    ranked2.sort(key=lambda x: x[1], reverse=True)
     out = []
-    for idx, score in ranked2[:max(1, min(10, k))]:
-        s = schemes[idx].copy()
-        s["_score"] = float(score)
+    for hit in index.search(query_mr, max(0, min(10, k))):
+        s = index.schemes[hit.doc].copy()
+        s["_score"] = hit.score
+        s["_dense"] = hit.dense
+        s["_fused"] = hit.fused
         out.append(s)
     if out:
         top_ids = [s.get("scheme_id") for s in out]
         logger.debug("RAG top_ids=%s", top_ids)
-    return out[:k]
+    return out
 
 def _extract_scheme_id(text: str, valid_ids: List[str]) -> str | None:
     t = (text or "").strip()
@@ -136,15 +308,91 @@ def _extract_scheme_id(text: str, valid_ids: List[str]) -> str | None:
             return scheme_id
     return None
 
-def select_best_scheme(query_mr: str, schemes: List[Dict[str, Any]]) -> Dict[str, Any]:
+# Counters for GET /llm/stats: how often the LLM hop was avoided and why
+_select_stats: Dict[str, int] = {
+    "calls": 0, "no_llm": 0, "gated": 0, "cache_mem_hits": 0, "cache_db_hits": 0,
+    "llm_calls": 0, "llm_fallbacks": 0,
+}
+_decisions: "OrderedDict[str, str]" = OrderedDict()
+
+def selection_stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = dict(_select_stats)
+    out["llm_avoided"] = out["gated"] + out["cache_mem_hits"] + out["cache_db_hits"]
+    out["cache_mem_entries"] = len(_decisions)
+    return out
+
+def _decision_key(query_mr: str, candidate_ids: List[str], version: str) -> str:
+    raw = "\x1f".join([_dense_text(query_mr), ",".join(sorted(candidate_ids)), version])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _remember(key: str, scheme_id: str) -> None:
+    _decisions[key] = scheme_id
+    _decisions.move_to_end(key)
+    while len(_decisions) > max(0, int(settings.llm_select_cache_size)):
+        _decisions.popitem(last=False)
+
+async def _cached_pick(db, key: str) -> str | None:
+    picked = _decisions.get(key)
+    if picked is not None:
+        _decisions.move_to_end(key)
+        _select_stats["cache_mem_hits"] += 1
+        return picked
+    if db is not None:
+        picked = await db.read(get_llm_decision, key)
+        if picked is not None:
+            _remember(key, picked)
+            _select_stats["cache_db_hits"] += 1
+    return picked
+
+def _clear_winner(schemes: List[Dict[str, Any]]) -> bool:
+    """Top candidate leads the runner-up by the margin, on the score that ordered the list."""
+    if float(settings.llm_select_margin) <= 0:
+        return False
+    if len(schemes) < 2:
+        return True
+    # Hybrid results are ranked by the fused RRF score; the lexical `_score` can disagree with that order
+    key, margin = "_score", float(settings.llm_select_margin)
+    if settings.rag_hybrid_enabled and "_fused" in schemes[0]:
+        key, margin = "_fused", float(settings.llm_select_fused_margin)
+    return float(schemes[0].get(key, 0.0)) - float(schemes[1].get(key, 0.0)) >= margin
+
+def _by_id(schemes: List[Dict[str, Any]], scheme_id: str) -> Dict[str, Any]:
+    for s in schemes:
+        if s.get("scheme_id") == scheme_id:
+            return s
+    return schemes[0]
+
+async def select_best_scheme(query_mr: str, schemes: List[Dict[str, Any]], db=None, version: str | None = None) -> Dict[str, Any]:
+    """Pick one scheme from the retrieved candidates.
+
+    The LLM is asked only when retrieval has no clear winner (score margin below
+    `llm_select_margin`, or `llm_select_fused_margin` for hybrid-fused results) and no earlier pick is cached for the same normalised query,
+    candidate set and catalog version. Picks are cached in memory and, with `db`
+    (app.database.Database), in SQLite across restarts.
+    """
     if not schemes:
         return {}
+    _select_stats["calls"] += 1
+
+    client = llm_client()
+    if client is None:
+        _select_stats["no_llm"] += 1
+        logger.info("Scheme select fallback provider=%s", (settings.llm_provider or "").strip().lower() or "none")
+        return schemes[0]
 
-    provider = (settings.llm_provider or "").strip().lower()
-    if provider != "groq" or not settings.groq_api_key:
-        logger.info("Scheme select fallback provider=%s", provider or "none")
+    if _clear_winner(schemes):
+        _select_stats["gated"] += 1
+        logger.info("Scheme select gated scheme_id=%s", schemes[0].get("scheme_id"))
         return schemes[0]
 
+    valid_ids = [s.get("scheme_id") for s in schemes if s.get("scheme_id")]
+    version = version or await catalog_version(db)
+    key = _decision_key(query_mr, [s.get("scheme_id") or "" for s in schemes[:6]], version)
+    cached = await _cached_pick(db, key)
+    if cached in valid_ids:
+        logger.info("Scheme select cached picked_id=%s", cached)
+        return _by_id(schemes, cached)
+
     candidates = []
     for s in schemes[:6]:
         candidates.append({
@@ -166,19 +414,34 @@ def select_best_scheme(query_mr: str, schemes: List[Dict[str, Any]]) -> Dict[str
         {"role": "user", "content": prompt},
     ]
 
+    response = ""
+    _select_stats["llm_calls"] += 1
     try:
-        response = chat_completion(messages, temperature=0.0, max_tokens=32)
+        # Stream and stop as soon as an unambiguous id (not a prefix of another) has been emitted
+        async with aclosing(client.stream(messages, temperature=0.0, max_tokens=32)) as deltas:
+            async for delta in deltas:
+                response += delta
+                hit = _extract_scheme_id(response, valid_ids)
+                if hit and not any(v != hit and v.startswith(hit) for v in valid_ids):
+                    break
+    except LLMUnavailable as exc:
+        _select_stats["llm_fallbacks"] += 1
+        logger.info("Scheme select fallback (BM25 top) err=%s", exc)
+        return schemes[0]
     except Exception as exc:
+        _select_stats["llm_fallbacks"] += 1
         logger.warning("Scheme select groq failed err=%s", exc)
         return schemes[0]
 
-    valid_ids = [s.get("scheme_id") for s in schemes if s.get("scheme_id")]
     picked_id = _extract_scheme_id(response, valid_ids)
     if not picked_id:
         return schemes[0]
 
     logger.info("Scheme select picked_id=%s", picked_id)
-    for s in schemes:
-        if s.get("scheme_id") == picked_id:
-            return s
-    return schemes[0]
+    _remember(key, picked_id)
+    if db is not None:
+        try:
+            await db.write(save_llm_decision, key, picked_id, version)
+        except Exception as exc:
+            logger.warning("Scheme select cache write failed err=%s", exc)
+    return _by_id(schemes, picked_id)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+import fcntl, hashlib, json, logging, mmap, os, re, threading, unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger("sevasetu")
+
+def normalize_tts_text(text: str) -> str:
+    """NFC + collapsed whitespace, so trivially different strings share one entry."""
+    t = unicodedata.normalize("NFC", text or "")
+    return re.sub(r"\s+", " ", t).strip()
+
+def tts_cache_key(text: str, voice: str, codec: str) -> str:
+    """`voice` must pin the output format (e.g. a model id: one model, one sample rate)."""
+    raw = f"{voice}\x1f{codec}\x1f{normalize_tts_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class TtsCache:
+    """Content-addressed cache of rendered TTS audio.
+
+    Tier 1 is an in-memory LRU bounded by bytes. Tier 2 is an append-only pack file
+    (`audio.pack`) plus an index (`index.jsonl`) under `cache_dir`; the pack is
+    memory-mapped on startup so disk hits are a slice of the page cache.
+    Entries reach disk when prewarmed, or when a registered static prompt
+    (`register_static`) is requested again; `claim_static_persist` tells the caller
+    when, and the write (`persist`) belongs off the event loop. Other
+    replies can carry a caller's details and stay in memory only. Several processes
+    may append to one pack: appends hold an flock and take their offset from the real
+    end of file. Keys turned away by the disk budget are not retried.
+    """
+
+    def __init__(self, cache_dir: str | None, mem_budget_bytes: int, disk_budget_bytes: int):
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_bytes = 0
+        self._mem_budget = max(0, int(mem_budget_bytes))
+        self._disk_budget = max(0, int(disk_budget_bytes))
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._static: Set[str] = set()
+        self._persisting: Set[str] = set()  # static keys claimed for a disk write
+        self._rejected: Set[str] = set()    # over the disk budget
+        self._lock = threading.Lock()
+        self._append_lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+        self._mapped = 0
+        self._disk_size = 0
+        self._dir = Path(cache_dir) if cache_dir else None
+        self.hits_mem = 0
+        self.hits_disk = 0
+        self.misses = 0
+        if self._dir is not None:
+            self._open_disk()
+
+    # --- disk tier ---
+
+    @property
+    def _pack(self) -> Path:
+        return self._dir / "audio.pack"
+
+    @property
+    def _index_path(self) -> Path:
+        return self._dir / "index.jsonl"
+
+    def _open_disk(self) -> None:
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._pack.touch(exist_ok=True)
+        size = self._disk_size = self._pack.stat().st_size
+        if self._index_path.exists():
+            for line in self._index_path.read_text(encoding="utf-8").splitlines():
+                try:
+                    e = json.loads(line)
+                    off, n = int(e["o"]), int(e["n"])
+                except Exception:
+                    continue
+                # Ignore entries whose bytes never made it to the pack (crash mid-append)
+                if off + n <= size:
+                    self._index[e["k"]] = (off, n)
+        self._remap()
+        logger.info("TTS cache opened dir=%s entries=%d bytes=%d", self._dir, len(self._index), size)
+
+    def _remap(self) -> None:
+        size = self._pack.stat().st_size
+        if size == 0 or size == self._mapped:
+            return
+        if self._map is not None:
+            self._map.close()
+        with open(self._pack, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped = size
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        loc = self._index.get(key)
+        if loc is None:
+            return None
+        off, n = loc
+        with self._lock:
+            if off + n > self._mapped:
+                self._remap()
+            if self._map is None or off + n > self._mapped:
+                return None
+            return self._map[off:off + n]
+
+    def _disk_put(self, key: str, data: bytes) -> None:
+        if self._dir is None or key in self._index or key in self._rejected:
+            return
+        if self._disk_size + len(data) > self._disk_budget:
+            self._rejected.add(key)
+            return
+        with self._append_lock, open(self._pack, "ab") as f:
+            # Other workers / the prewarm script append too: lock, then write at the real end
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                off = f.seek(0, os.SEEK_END)
+                if off + len(data) > self._disk_budget:
+                    logger.debug("TTS cache disk budget reached bytes=%d", off)
+                    self._rejected.add(key)
+                    self._disk_size = off
+                    return
+                f.write(data)
+                f.flush()
+                with open(self._index_path, "a", encoding="utf-8") as ix:
+                    ix.write(json.dumps({"k": key, "o": off, "n": len(data)}) + "\n")
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            self._index[key] = (off, len(data))
+            self._disk_size = off + len(data)
+
+    # --- memory tier ---
+
+    def _mem_put(self, key: str, data: bytes) -> None:
+        if len(data) > self._mem_budget:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old)
+        self._mem[key] = data
+        self._mem_bytes += len(data)
+        while self._mem_bytes > self._mem_budget and self._mem:
+            _k, v = self._mem.popitem(last=False)
+            self._mem_bytes -= len(v)
+
+    # --- public API ---
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._mem.get(key)
+        if data is not None:
+            self._mem.move_to_end(key)
+            self.hits_mem += 1
+            return data
+        data = self._disk_get(key)
+        if data is not None:
+            self.hits_disk += 1
+            self._mem_put(key, data)
+            return data
+        self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes, persist: bool = False) -> None:
+        if not data:
+            return
+        self._mem_put(key, data)
+        if persist:
+            self.persist(key, data)
+
+    def persist(self, key: str, data: bytes) -> None:
+        """Write to the disk tier only (blocking; safe on a worker thread)."""
+        try:
+            self._disk_put(key, data)
+        except OSError:
+            logger.exception("TTS cache disk write failed dir=%s", self._dir)
+        finally:
+            self._persisting.discard(key)
+
+    def claim_static_persist(self, key: str) -> bool:
+        """True, once per key, when a static prompt just hit memory and is not on disk
+        yet: a repeat request is worth keeping across restarts. The caller then runs
+        `persist(key, data)` off the event loop."""
+        if self._dir is None or key not in self._static:
+            return False
+        with self._lock:
+            if key in self._index or key in self._rejected or key in self._persisting:
+                return False
+            self._persisting.add(key)
+            return True
+
+    def register_static(self, keys: Iterable[str]) -> None:
+        """Keys of fixed prompts (no caller data) that may be persisted on a repeat hit."""
+        self._static.update(keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._mem or key in self._index
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "mem_entries": len(self._mem),
+            "mem_bytes": self._mem_bytes,
+            "disk_entries": len(self._index),
+            "disk_bytes": self._disk_size,
+            "static_keys": len(self._static),
+            "hits_mem": self.hits_mem,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+                self._mapped = 0
@@ -1,12 +1,18 @@
 from __future__ import annotations
 from functools import lru_cache
-from typing import Tuple
-import io, logging, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio, io, logging, re, time
 import numpy as np
 import soundfile as sf
+from app.settings import settings
+from app.utils.batching import MicroBatcher
+from app.tts.cache import TtsCache, tts_cache_key
 
 logger = logging.getLogger("sevasetu")
 
+MODEL_ID = "facebook/mms-tts-mar"
+
 @lru_cache(maxsize=1)
 def _load():
     import torch
@@ -15,10 +21,9 @@ def _load():
         "mps" if getattr(torch.backends, "mps", None) and torch.backends.mps.is_available()
         else ("cuda" if torch.cuda.is_available() else "cpu")
     )
-    model_id="facebook/mms-tts-mar"
-    logger.info("Loading MMS TTS model=%s device=%s", model_id, device)
-    tok=AutoTokenizer.from_pretrained(model_id)
-    model=VitsModel.from_pretrained(model_id)
+    logger.info("Loading MMS TTS model=%s device=%s", MODEL_ID, device)
+    tok=AutoTokenizer.from_pretrained(MODEL_ID)
+    model=VitsModel.from_pretrained(MODEL_ID)
     model.to(device); model.eval()
     return device, tok, model
 
@@ -56,3 +61,154 @@ def synth_mms(text: str, language: str = "Marathi") -> Tuple[bytes, str]:
         (time.perf_counter() - t0) * 1000,
     )
     return audio, "audio/wav"
+
+def _wav_bytes(wav: np.ndarray, sr: int) -> bytes:
+    buf=io.BytesIO()
+    sf.write(buf, np.nan_to_num(wav, nan=0.0, posinf=0.0, neginf=0.0), sr, format="WAV")
+    return buf.getvalue()
+
+def synth_mms_batch(texts: List[str], language: str = "Marathi") -> List[Tuple[bytes, str]]:
+    """Synthesize several replies in one padded VITS forward pass.
+
+    Each waveform is trimmed to its own length from the predicted durations
+    (`sequence_lengths`), so padding never leaks into the audio.
+    """
+    t0 = time.perf_counter()
+    out: List[Tuple[bytes, str]] = [(b"", "audio/wav")] * len(texts)
+    live = []
+    for i, t in enumerate(texts):
+        t = (t or "").strip()[:500]
+        if t:
+            live.append((i, t))
+        else:
+            out[i] = (_wav_bytes(np.zeros(16000, dtype=np.float32), 16000), "audio/wav")
+    if not live:
+        return out
+    device, tok, model=_load()
+    import torch
+    inputs=tok([t for _i, t in live], return_tensors="pt", padding=True)
+    inputs={k:v.to(device) for k,v in inputs.items()}
+    with torch.no_grad():
+        res=model(**inputs)
+    waves=res.waveform.detach().cpu().numpy().astype(np.float32)
+    lengths=res.sequence_lengths.detach().cpu().numpy()
+    sr=int(getattr(model.config,"sampling_rate",16000) or 16000)
+    for j, (i, _t) in enumerate(live):
+        out[i] = (_wav_bytes(waves[j, :int(lengths[j])], sr), "audio/wav")
+    logger.debug("TTS batch size=%d chars=%d ms=%.0f", len(live), sum(len(t) for _i, t in live), (time.perf_counter() - t0) * 1000)
+    return out
+
+# One thread owns the model for batched synthesis so batches don't compete for intra-op threads
+_tts_executor: Optional[ThreadPoolExecutor] = None
+_tts_batcher: Optional[MicroBatcher] = None
+
+def tts_batcher() -> Optional[MicroBatcher]:
+    global _tts_executor, _tts_batcher
+    if _tts_batcher is None and settings.tts_batch_enabled:
+        _tts_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-batch")
+        async def run_batch(texts, language):
+            return await asyncio.get_running_loop().run_in_executor(_tts_executor, synth_mms_batch, texts, language)
+        _tts_batcher = MicroBatcher(run_batch, window_ms=settings.tts_batch_window_ms, max_batch=settings.tts_batch_max, name="TTS batch")
+    return _tts_batcher
+
+_tts_cache: Optional[TtsCache] = None
+
+def tts_cache() -> Optional[TtsCache]:
+    global _tts_cache
+    if _tts_cache is None and settings.tts_cache_enabled:
+        _tts_cache = TtsCache(
+            settings.tts_cache_dir or None,
+            mem_budget_bytes=int(settings.tts_cache_mem_mb) * 1024 * 1024,
+            disk_budget_bytes=int(settings.tts_cache_disk_mb) * 1024 * 1024,
+        )
+    return _tts_cache
+
+def _cache_key(text: str) -> str:
+    # MMS voices are one model per language, so the model id is the voice id; it also
+    # fixes the rendered sample rate (model.config.sampling_rate)
+    return tts_cache_key(text, MODEL_ID, "wav")
+
+async def synth_async(text: str, language: str = "Marathi") -> Tuple[bytes, str]:
+    """Cache hit, else batched when TTS_BATCH_ENABLED, else one `synth_mms` call on a worker thread."""
+    cache = tts_cache()
+    key = _cache_key(text) if cache is not None and (text or "").strip() else None
+    if key is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            if cache.claim_static_persist(key):
+                # open + flock + append: keep it off the event loop, don't hold the reply for it
+                asyncio.get_running_loop().run_in_executor(None, cache.persist, key, hit)
+            return hit, "audio/wav"
+    batcher = tts_batcher()
+    if batcher is None:
+        audio, mime = await asyncio.to_thread(synth_mms, text, language)
+    else:
+        audio, mime = await batcher.submit(text, language)
+    if key is not None:
+        cache.put(key, audio)
+    return audio, mime
+
+def register_static_prompts(texts: List[str]) -> None:
+    """Let these fixed prompts reach the disk tier on a repeat hit (turn replies never do)."""
+    cache = tts_cache()
+    if cache is not None:
+        cache.register_static(_cache_key(t) for t in texts if (t or "").strip())
+
+def prewarm_tts_cache(texts: List[str], language: str = "Marathi", batch_size: int = 8) -> Tuple[int, int]:
+    """Render texts missing from the disk tier and persist them; returns (rendered, already_cached)."""
+    cache = tts_cache()
+    if cache is None:
+        raise RuntimeError("TTS cache is disabled (TTS_CACHE_ENABLED=false)")
+    todo, seen, cached = [], set(), 0
+    for t in texts:
+        key = _cache_key(t)
+        if not (t or "").strip() or key in seen:
+            continue
+        seen.add(key)
+        if key in cache:
+            cached += 1
+        else:
+            todo.append((key, t))
+    for i in range(0, len(todo), max(1, batch_size)):
+        part = todo[i:i + batch_size]
+        for (key, _t), (audio, _mime) in zip(part, synth_mms_batch([t for _k, t in part], language)):
+            cache.put(key, audio, persist=True)
+        logger.info("TTS prewarm progress %d/%d", min(i + batch_size, len(todo)), len(todo))
+    return len(todo), cached
+
+async def warmup_tts() -> dict:
+    """Load VITS and synthesize one short phrase (bypassing the cache)."""
+    t0 = time.perf_counter()
+    await asyncio.to_thread(_load)
+    load_ms = (time.perf_counter() - t0) * 1000
+    t1 = time.perf_counter()
+    await asyncio.to_thread(synth_mms, "नमस्कार.", "Marathi")
+    return {"load_ms": round(load_ms), "warmup_ms": round((time.perf_counter() - t1) * 1000)}
+
+# Sentence terminators (incl. Devanagari danda), bullets and line breaks end a TTS chunk
+_SENT_END = re.compile(r"(?<=[.?!।॥])\s+|\s*[\n•]+\s*")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+def split_for_tts(text: str, max_chars: int = 120, min_chars: int = 12) -> List[str]:
+    """Split a reply into sentence/clause chunks that can be synthesized independently.
+
+    Long sentences are further split on commas/semicolons; tiny fragments are merged
+    into their neighbour so prosody does not get choppy.
+    """
+    pieces: List[str] = []
+    for sent in _SENT_END.split(text or ""):
+        sent = sent.strip()
+        if not sent:
+            continue
+        if len(sent) <= max_chars:
+            pieces.append(sent)
+            continue
+        pieces.extend(c.strip() for c in _CLAUSE_END.split(sent) if c.strip())
+
+    out: List[str] = []
+    for p in pieces:
+        if out and (len(out[-1]) < min_chars or len(p) < min_chars) and len(out[-1]) + len(p) < max_chars:
+            out[-1] = f"{out[-1]} {p}"
+        else:
+            out.append(p)
+    return out
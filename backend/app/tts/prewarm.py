@@ -0,0 +1,44 @@
+from __future__ import annotations
+import logging
+from typing import List
+
+from app.agent import agent as A
+from app.tools import eligibility as E
+from app.catalog import catalog
+from app.tools.rules import rule_for
+from app.tts.mms_tts import split_for_tts
+
+logger = logging.getLogger("sevasetu")
+
+def known_static_prompts() -> List[str]:
+    """Every reply the agent can produce from code constants and schemes.json alone.
+
+    Includes the sentence pieces `split_for_tts` produces, since streamed replies are
+    synthesized (and cached) per sentence.
+    """
+    texts: List[str] = list(A.QUESTIONS_MR.values()) + [
+        A.ASK_FALLBACK_MR, A.MSG_LOW_CONFIDENCE_MR, A.MSG_NO_SCHEME_MR, A.MSG_ELIG_ERROR_MR,
+        A.MSG_NOT_ELIGIBLE_MR, A.MSG_NOT_ELIGIBLE_SLOT_MR, A.MSG_STT_EMPTY_MR, A.MSG_TURN_ERROR_MR,
+        E.REASON_GENDER_MR, E.REASON_STATE_MR, E.REASON_OCCUPATION_MR, E.REASON_ELIGIBLE_MR,
+        E.REASON_DISTRICT_MR, E.REASON_CATEGORY_MR, E.REASON_RULE_MR, E.REASON_REVIEW_MR,
+    ]
+    snap = catalog()
+    for s in snap.schemes:
+        name, benefits = s.get("name_mr") or "योजना", s.get("benefits_mr", "")
+        texts.append(A.MSG_ELIGIBLE_MR.format(name=name, benefits=benefits))
+        texts.append(A.MSG_ELIGIBLE_SLOT_MR.format(benefits=benefits))
+        texts.extend(A.MSG_ASK_FOR_SCHEME_MR.format(name=name, question=q) for q in A.QUESTIONS_MR.values())
+        # Every reason the scheme's compiled rules can give
+        reasons = list(rule_for(s, snap).reasons_mr) if s.get("scheme_id") else []
+        # Single-reason rejections are the most common full replies
+        for r in reasons:
+            texts.append(A.MSG_NOT_ELIGIBLE_MR + "\n" + A.bullets([r]))
+            texts.append(A.MSG_NOT_ELIGIBLE_SLOT_MR + "\n" + A.bullets([r]))
+
+    out, seen = [], set()
+    for t in texts + [c for t in texts for c in split_for_tts(t)]:
+        if t and t not in seen:
+            seen.add(t)
+            out.append(t)
+    logger.debug("TTS static prompts=%d schemes=%d", len(out), len(snap))
+    return out
@@ -1,52 +1,240 @@
 from __future__ import annotations
-import asyncio, logging, shutil, subprocess, tempfile, time
-from functools import partial
-from pathlib import Path
+import asyncio, io, logging, multiprocessing, re, subprocess, threading, time, wave
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 
 logger = logging.getLogger("sevasetu")
 
-def _convert_sync(input_bytes: bytes, mime_type: str = "audio/webm") -> Path:
-    t0 = time.perf_counter()
-    tmp_dir = Path(tempfile.mkdtemp(prefix="sevasetu_audio_"))
-    mt = (mime_type or "").lower()
-    ext = ".dat"
-    if "webm" in mt: ext = ".webm"
-    elif "mp4" in mt or "m4a" in mt: ext = ".mp4"
-    elif "wav" in mt: ext = ".wav"
-    elif "mp3" in mt: ext = ".mp3"
-    elif "ogg" in mt: ext = ".ogg"
-
-    in_path = tmp_dir / f"input{ext}"
-    out_path = tmp_dir / "audio.wav"
-    logger.debug("Audio convert start bytes=%d mime=%s", len(input_bytes), mime_type)
-    in_path.write_bytes(input_bytes)
+SAMPLE_RATE = 16000
+
+
+# --- Streaming decode (binary WebSocket frames) ---
+
+def _pcm16_to_float(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+def _resample(samples: np.ndarray, rate: int) -> np.ndarray:
+    """Linear resample to 16 kHz; good enough for speech going into Whisper."""
+    if rate == SAMPLE_RATE or samples.size == 0:
+        return samples
+    n_out = int(round(samples.size * SAMPLE_RATE / rate))
+    x_out = np.linspace(0, samples.size - 1, num=n_out, dtype=np.float64)
+    return np.interp(x_out, np.arange(samples.size), samples).astype(np.float32)
+
+def pcm_rate(mime_type: str) -> int | None:
+    """Sample rate for raw PCM16 mimes (``audio/pcm;rate=48000``, ``audio/l16``), else None."""
+    mt = (mime_type or "").lower().replace(" ", "")
+    if not (mt.startswith("audio/pcm") or mt.startswith("audio/l16") or "s16le" in mt):
+        return None
+    m = re.search(r"rate=(\d+)", mt)
+    return int(m.group(1)) if m else SAMPLE_RATE
+
+class PcmStreamDecoder:
+    """Incremental decoder for little-endian mono PCM16 frames (no ffmpeg needed)."""
+
+    def __init__(self, rate: int = SAMPLE_RATE):
+        self.rate = int(rate)
+        self._carry = b""
+
+    def feed(self, chunk: bytes) -> np.ndarray:
+        data = self._carry + (chunk or b"")
+        n = len(data) - (len(data) % 2)
+        self._carry = data[n:]
+        return _resample(_pcm16_to_float(data[:n]), self.rate)
+
+    def close(self) -> np.ndarray:
+        self._carry = b""
+        return np.zeros(0, dtype=np.float32)
+
+    def abort(self) -> None:
+        self._carry = b""
+
+class FfmpegStreamDecoder:
+    """Incremental decoder for compressed containers (webm/opus, ogg, mp4).
+
+    One ffmpeg process per utterance reads the container from stdin and writes
+    16 kHz mono PCM16 to stdout; reader threads drain stdout and stderr (keeping only
+    its tail for the error message) so neither pipe fills up and blocks ffmpeg.
+    """
+
+    def __init__(self, mime_type: str = "audio/webm"):
+        cmd = [
+            "ffmpeg","-hide_banner","-loglevel","error",
+            "-fflags","nobuffer","-probesize","4096","-analyzeduration","0",
+            "-i","pipe:0",
+            "-vn","-ac","1","-ar",str(SAMPLE_RATE),"-f","s16le","-flush_packets","1",
+            "pipe:1",
+        ]
+        logger.debug("Audio stream decoder start mime=%s", mime_type)
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._out = bytearray()
+        self._err = bytearray()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._drain, name="ffmpeg-stream-reader", daemon=True)
+        self._reader.start()
+        self._err_reader = threading.Thread(target=self._drain_err, name="ffmpeg-stream-stderr", daemon=True)
+        self._err_reader.start()
+
+    def _drain(self) -> None:
+        stdout = self._proc.stdout
+        while True:
+            b = stdout.read1(65536) if stdout else b""
+            if not b:
+                return
+            with self._lock:
+                self._out.extend(b)
+
+    def _drain_err(self) -> None:
+        stderr = self._proc.stderr
+        while True:
+            b = stderr.read1(4096) if stderr else b""
+            if not b:
+                return
+            self._err.extend(b)
+            del self._err[:-800]
 
+    def _take(self) -> np.ndarray:
+        with self._lock:
+            n = len(self._out) - (len(self._out) % 2)
+            data = bytes(self._out[:n])
+            del self._out[:n]
+        return _pcm16_to_float(data)
+
+    def feed(self, chunk: bytes) -> np.ndarray:
+        if chunk:
+            self._proc.stdin.write(chunk)
+            self._proc.stdin.flush()
+        return self._take()
+
+    def close(self) -> np.ndarray:
+        try:
+            self._proc.stdin.close()
+        except Exception:
+            pass
+        self._reader.join(timeout=10)
+        code = self._proc.wait(timeout=10)
+        if code != 0:
+            self._err_reader.join(timeout=1)
+            err = bytes(self._err).decode("utf-8", errors="ignore")
+            logger.error("FFmpeg stream failed code=%s err=%s", code, err)
+            raise RuntimeError(f"FFmpeg failed: {err}")
+        return self._take()
+
+    def abort(self) -> None:
+        try:
+            self._proc.kill()
+            self._proc.wait(timeout=5)
+        except Exception:
+            logger.exception("Audio stream decoder abort failed")
+
+def open_stream_decoder(mime_type: str = "audio/webm") -> PcmStreamDecoder | FfmpegStreamDecoder:
+    rate = pcm_rate(mime_type)
+    if rate is not None:
+        return PcmStreamDecoder(rate)
+    return FfmpegStreamDecoder(mime_type)
+
+
+# --- In-memory decode (bytes in, float32 16 kHz array out; nothing touches disk) ---
+
+def _decode_wav(data: bytes) -> np.ndarray | None:
+    """Parse PCM WAV directly; None if the header is not something `wave` understands."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    try:
+        with wave.open(io.BytesIO(data)) as w:
+            channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+            frames = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        # e.g. float or WAVE_FORMAT_EXTENSIBLE files -> let the decoder pool handle them
+        return None
+    if width == 1:
+        x = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        x = _pcm16_to_float(frames)
+    elif width == 3:
+        b = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        x = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8).astype(np.float32) / 8388608.0
+    elif width == 4:
+        x = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        return None
+    if channels > 1:
+        x = x[: x.size - x.size % channels].reshape(-1, channels).mean(axis=1)
+    return _resample(x.astype(np.float32, copy=False), rate)
+
+def _decode_ffmpeg_pipe(data: bytes) -> np.ndarray:
     cmd = [
-        "ffmpeg","-y","-hide_banner","-loglevel","error",
-        "-i", str(in_path),
-        "-vn","-ac","1","-ar","16000","-acodec","pcm_s16le",
-        str(out_path)
+        "ffmpeg","-hide_banner","-loglevel","error",
+        "-i","pipe:0",
+        "-vn","-ac","1","-ar",str(SAMPLE_RATE),"-f","s16le",
+        "pipe:1",
     ]
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
-    if proc.returncode != 0 or not out_path.exists():
+    proc = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
         err = proc.stderr.decode("utf-8", errors="ignore")[:800]
-        shutil.rmtree(tmp_dir, ignore_errors=True)
         logger.error("FFmpeg failed code=%s err=%s", proc.returncode, err)
         raise RuntimeError(f"FFmpeg failed: {err}")
-    logger.debug("Audio convert done path=%s ms=%.0f", out_path, (time.perf_counter() - t0) * 1000)
-    return out_path
+    return _pcm16_to_float(proc.stdout[: len(proc.stdout) - len(proc.stdout) % 2])
 
-async def convert_to_wav(input_bytes: bytes, mime_type: str = "audio/webm") -> Path:
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, partial(_convert_sync, input_bytes, mime_type))
+def _decode_compressed(data: bytes) -> np.ndarray:
+    """Decode webm/opus, ogg, mp4, mp3 in-process with PyAV (shipped with faster-whisper).
 
-def cleanup_audio_file(file_path: Path | None):
-    if not file_path:
-        return
+    Runs inside the decoder pool workers; falls back to an ffmpeg pipe if PyAV is missing.
+    """
     try:
-        parent = file_path.parent
-        if parent.name.startswith("sevasetu_audio_"):
-            logger.debug("Cleaning up audio temp dir=%s", parent)
-            shutil.rmtree(parent, ignore_errors=True)
-    except Exception:
-        logger.exception("Audio cleanup failed path=%s", file_path)
+        from faster_whisper.audio import decode_audio as _av_decode
+    except ImportError:
+        return _decode_ffmpeg_pipe(data)
+    return _av_decode(io.BytesIO(data), sampling_rate=SAMPLE_RATE).astype(np.float32, copy=False)
+
+def _decoder_ping() -> bool:
+    return True
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+def _decoder_pool() -> ProcessPoolExecutor | None:
+    """Long-lived decoder processes fed over pipes; None when AUDIO_DECODE_WORKERS=0."""
+    global _pool
+    # Imported lazily: pool workers import this module and must not pull in settings/torch
+    from app.settings import settings
+    workers = int(settings.audio_decode_workers)
+    if workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: never fork a process that may already hold torch / CTranslate2 threads
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(workers):
+                _pool.submit(_decoder_ping)
+            logger.info("Audio decoder pool started workers=%d", workers)
+        return _pool
+
+def shutdown_decoder_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _decode_fast(input_bytes: bytes, mime_type: str) -> np.ndarray | None:
+    """Raw PCM16 and PCM WAV need no decoder; None means hand off to the pool."""
+    rate = pcm_rate(mime_type)
+    if rate is not None:
+        return _resample(_pcm16_to_float(input_bytes[: len(input_bytes) - len(input_bytes) % 2]), rate)
+    return _decode_wav(input_bytes)
+
+async def decode_audio(input_bytes: bytes, mime_type: str = "audio/webm") -> np.ndarray:
+    """Bytes -> float32 mono 16 kHz array; compressed formats go to the decoder pool."""
+    t0 = time.perf_counter()
+    path = "fast"
+    x = _decode_fast(input_bytes, mime_type)
+    if x is None:
+        pool = _decoder_pool()
+        path = "pool" if pool else "thread"
+        x = await asyncio.get_running_loop().run_in_executor(pool, _decode_compressed, input_bytes)
+    logger.debug(
+        "Audio decode done bytes=%d mime=%s path=%s samples=%d ms=%.0f",
+        len(input_bytes), mime_type, path, x.size, (time.perf_counter() - t0) * 1000,
+    )
+    return x
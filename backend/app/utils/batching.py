@@ -0,0 +1,75 @@
+from __future__ import annotations
+import asyncio, logging, time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger("sevasetu")
+
+RunBatch = Callable[[List[Any], Hashable], Awaitable[List[Any]]]
+
+class MicroBatcher:
+    """Collects requests for up to `window_ms` (or `max_batch`) and runs them as one batch.
+
+    `run_batch(items, key)` gets the items of one key (e.g. language) and returns one
+    result per item; results are fanned back out to the awaiting coroutines.
+    Must be used from one event loop.
+    """
+
+    def __init__(self, run_batch: RunBatch, window_ms: int = 50, max_batch: int = 8, name: str = "batch"):
+        self._run_batch = run_batch
+        self._window_s = max(0, int(window_ms)) / 1000.0
+        self._max_batch = max(1, int(max_batch))
+        self._name = name
+        self._pending: List[Tuple[Any, Hashable, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any, key: Hashable = None) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((item, key, fut, time.perf_counter()))
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._window_s, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        by_key: Dict[Hashable, list] = {}
+        for entry in pending:
+            if not entry[2].cancelled():
+                by_key.setdefault(entry[1], []).append(entry)
+        for key, entries in by_key.items():
+            for i in range(0, len(entries), self._max_batch):
+                task = asyncio.create_task(self._run(key, entries[i:i + self._max_batch]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, key: Hashable, entries: List[Tuple[Any, Hashable, asyncio.Future, float]]) -> None:
+        t0 = time.perf_counter()
+        wait_ms = (t0 - min(x[3] for x in entries)) * 1000
+        try:
+            results = await self._run_batch([x[0] for x in entries], key)
+        except Exception as exc:
+            for _i, _k, fut, _t in entries:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        self.batches += 1
+        self.items += len(entries)
+        logger.debug("%s size=%d wait_ms=%.0f run_ms=%.0f", self._name, len(entries), wait_ms, (time.perf_counter() - t0) * 1000)
+        for (_i, _k, fut, _t), res in zip(entries, results):
+            if not fut.done():
+                fut.set_result(res)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,39 @@
+from __future__ import annotations
+import asyncio, logging, time
+from typing import Any, Awaitable, Callable, Dict
+
+from app.stt.whisper_stt import warmup_stt
+from app.tts.mms_tts import warmup_tts
+
+logger = logging.getLogger("sevasetu")
+
+# component -> {"state": pending|warming|ready|failed, timings..., "error": ...}
+_status: Dict[str, Dict[str, Any]] = {
+    "stt": {"state": "pending"},
+    "tts": {"state": "pending"},
+}
+
+def readiness() -> Dict[str, Any]:
+    ready = all(c["state"] == "ready" for c in _status.values())
+    return {"ready": ready, "models": {k: dict(v) for k, v in _status.items()}}
+
+def mark_ready_without_warmup() -> None:
+    """WARMUP_ON_STARTUP=false: models load lazily on the first turn, report ready anyway."""
+    for c in _status.values():
+        c.update(state="ready", lazy=True)
+
+async def _warm(name: str, fn: Callable[[], Awaitable[dict]]) -> None:
+    _status[name] = {"state": "warming"}
+    t0 = time.perf_counter()
+    try:
+        timings = await fn()
+    except Exception as exc:
+        logger.exception("Warmup failed model=%s", name)
+        _status[name] = {"state": "failed", "error": str(exc)[:300], "total_ms": round((time.perf_counter() - t0) * 1000)}
+        return
+    _status[name] = {"state": "ready", **timings, "total_ms": round((time.perf_counter() - t0) * 1000)}
+    logger.info("Warmup done model=%s %s", name, timings)
+
+async def warm_models() -> None:
+    """Load STT and TTS concurrently, then run one synthetic inference on each."""
+    await asyncio.gather(_warm("stt", warmup_stt), _warm("tts", warmup_tts))
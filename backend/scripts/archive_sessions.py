@@ -0,0 +1,62 @@
+"""One-off retention run: archive idle sessions + messages, free pages, shrink the WAL.
+
+Run from backend/:  python scripts/archive_sessions.py --days 90 [--archive-dir ./data/archive] [--batch 500]
+                    python scripts/archive_sessions.py --enable-incremental-vacuum
+
+Does the same as the background job (RETENTION_DAYS > 0) without the server running,
+on the main database or on every session shard (SESSION_SHARDS > 1).
+`--enable-incremental-vacuum` switches a database created before auto_vacuum=INCREMENTAL
+was set and runs the one full VACUUM that needs (rewrites the file; stop the server first).
+"""
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.abspath("."))
+
+from app.settings import settings
+from app.db import connect, init_db
+from app.retention import archive_batch, checkpoint_wal
+from app.shards import session_db_paths
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--days", type=float, default=float(settings.retention_days))
+ap.add_argument("--archive-dir", default=settings.retention_archive_dir)
+ap.add_argument("--batch", type=int, default=int(settings.retention_batch))
+ap.add_argument("--vacuum-pages", type=int, default=int(settings.retention_vacuum_pages))
+ap.add_argument("--enable-incremental-vacuum", action="store_true")
+args = ap.parse_args()
+
+if args.days <= 0 and not args.enable_incremental_vacuum:
+    print("Nothing to do: pass --days N (or set RETENTION_DAYS)")
+    sys.exit(0)
+
+# The main database, or every session shard when SESSION_SHARDS > 1
+for path in session_db_paths():
+    conn = connect(path)
+    if path == settings.sqlite_path:
+        init_db(conn)
+
+    if args.enable_incremental_vacuum:
+        mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        if mode == 2:
+            print(f"{path}: auto_vacuum is already INCREMENTAL")
+        else:
+            t0 = time.time()
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+            conn.execute("VACUUM;")
+            print(f"{path}: auto_vacuum=INCREMENTAL, VACUUM took {time.time() - t0:.1f}s")
+
+    if args.days > 0:
+        cutoff = time.time() - args.days * 86400
+        total_s = total_m = 0
+        t0 = time.time()
+        while True:
+            n_s, n_m = archive_batch(conn, cutoff, args.archive_dir, args.batch, vacuum_pages=args.vacuum_pages)
+            total_s += n_s
+            total_m += n_m
+            if not (n_s or n_m):
+                break
+        print(f"{path}: archived sessions={total_s} messages={total_m} to {args.archive_dir} in {time.time() - t0:.1f}s")
+
+    conn.close()
+    busy, wal_pages, done = checkpoint_wal(path)
+    print(f"{path}: WAL checkpoint busy={busy} pages={wal_pages} checkpointed={done}")
@@ -0,0 +1,79 @@
+"""Slot-fill questions per conversation: rule order vs the question planner.
+
+Run from backend/:  python scripts/bench_question_planner.py [--conversations 5000] [--k 5]
+
+Simulated callers with random profiles each ask about one scheme; k-1 other schemes
+stand in for the rest of the retrieval results. Every question is one voice round trip.
+  rule order, ask all     the old slot fill: every missing field, then one check
+  rule order, early stop  re-check after each answer, ask missing fields in rule order
+  planner                 re-check after each answer, ask plan_question()'s field
+Reports mean / p90 questions until the selected scheme is decided, how many of the other
+candidates are decided by then, and the questions until all k are (a caller following up
+on the other results).
+"""
+import argparse, logging, os, random, sys
+
+sys.path.insert(0, os.path.abspath("."))
+
+from app.agent.planner import plan_question
+from app.catalog import catalog
+from app.tools.rules import rule_for
+
+VALUES = {
+    "age": [17, 25, 34, 40, 52, 66], "income_annual": [50000, 120000, 240000, 600000, 900000],
+    "gender": ["female", "male"], "state": ["Maharashtra", "Gujarat"],
+    "occupation": ["farmer", "trader", "student", "labourer"], "district": ["pune", "nagpur"],
+    "category": ["sc", "obc", "open"], "land_holding_acres": [0.5, 2, 7],
+}
+
+def _ask(truth, profile, primary, others, policy):
+    """Questions until `primary` is decided, filling `profile` from `truth`."""
+    status, _, missing = primary.evaluate(profile)
+    if policy == "ask_all":
+        for field in missing:
+            profile[field] = truth[field]
+        return len(missing)
+    asked = 0
+    while status == "needs_more_info":
+        field = plan_question(profile, primary, others).field if policy == "planner" else missing[0]
+        profile[field] = truth[field]
+        asked += 1
+        status, _, missing = primary.evaluate(profile)
+    return asked
+
+def converse(truth, primary, others, policy):
+    """(questions until the selected scheme is decided, other candidates decided by
+    then, questions until every candidate is decided) for one simulated caller."""
+    profile = {}
+    first = _ask(truth, profile, primary, others, policy)
+    decided = sum(r.evaluate(profile)[0] != "needs_more_info" for r in others)
+    total = first + sum(_ask(truth, profile, r, others[i + 1:], policy) for i, r in enumerate(others))
+    return first, decided, total
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--conversations", type=int, default=5000)
+    ap.add_argument("--k", type=int, default=5, help="retrieved candidates, selected scheme included")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    logging.disable(logging.INFO)
+
+    snap = catalog()
+    rules = [rule_for(s, snap) for s in snap.schemes]
+    rnd = random.Random(args.seed)
+    cases = []
+    for _ in range(args.conversations):
+        picked = rnd.sample(rules, min(args.k, len(rules)))
+        cases.append(({f: rnd.choice(vs) for f, vs in VALUES.items()}, picked[0], picked[1:]))
+    print(f"catalog schemes={len(snap)} conversations={args.conversations} k={args.k}")
+
+    for policy, label in (("ask_all", "rule order, ask all"), ("rule_order", "rule order, early stop"), ("planner", "planner")):
+        results = [converse(truth, primary, others, policy) for truth, primary, others in cases]
+        asked = sorted(a for a, _, _ in results)
+        decided = sum(d for _, d, _ in results) / len(results)
+        total = sum(t for _, _, t in results) / len(results)
+        print(f"{label:<24} questions mean={sum(asked) / len(asked):.2f} p90={asked[int(len(asked) * 0.9)]}"
+              f"   others decided={decided:.2f}/{args.k - 1}   all {args.k} decided after {total:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Query latency of BM25 scheme retrieval on synthetic catalogs.
+
+Run from backend/:  python scripts/bench_scheme_rag.py [--sizes 1000,10000,100000] [--queries 300]
+
+Compares the NumPy CSR engine (app/tools/bm25.py, argpartition top-k) against a
+pure-Python postings-dict scorer with a full sort, on Zipf-distributed token catalogs.
+"""
+import argparse, math, os, random, sys, time
+
+sys.path.insert(0, os.path.abspath("."))
+
+import numpy as np
+from app.tools.bm25 import Bm25Matrix, top_k
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--sizes", default="1000,10000,100000")
+ap.add_argument("--queries", type=int, default=300)
+ap.add_argument("--doc-len", type=int, default=80)
+ap.add_argument("--vocab", type=int, default=30000)
+ap.add_argument("-k", type=int, default=5)
+args = ap.parse_args()
+
+rng = random.Random(7)
+SYL = [c + v for c in "कखगघचजटडतदनपबमयरलवशसह" for v in ["", "ा", "ि", "ी", "ु", "े", "ो"]]
+VOCAB = list({"".join(rng.choice(SYL) for _ in range(rng.randint(2, 4))) for _ in range(args.vocab * 2)})[:args.vocab]
+# Zipf-ish term weights, like real text
+WEIGHTS = [1.0 / (r + 1) ** 1.05 for r in range(len(VOCAB))]
+CUM = list(np.cumsum(WEIGHTS))
+
+def sample(n):
+    return rng.choices(VOCAB, cum_weights=CUM, k=n)
+
+class PostingsBm25:
+    """Reference: dict postings + per-query Python accumulation + full sort."""
+
+    def __init__(self, docs, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.postings = {}
+        lengths = []
+        for i, toks in enumerate(docs):
+            lengths.append(len(toks))
+            for t in toks:
+                row = self.postings.setdefault(t, {})
+                row[i] = row.get(i, 0) + 1
+        n = len(docs)
+        avgdl = sum(lengths) / max(1, n)
+        self.idf = {t: math.log(1 + (n - len(r) + 0.5) / (len(r) + 0.5)) for t, r in self.postings.items()}
+        self.norm = [k1 * (1 - b + b * dl / max(1.0, avgdl)) for dl in lengths]
+
+    def search(self, q, k):
+        scores = {}
+        for t in q:
+            row = self.postings.get(t)
+            if row is None:
+                continue
+            idf = self.idf[t]
+            for d, f in row.items():
+                scores[d] = scores.get(d, 0.0) + idf * (f * (self.k1 + 1)) / (f + self.norm[d])
+        return [d for d, _ in sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:k]]
+
+def pct(xs, p):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p * len(xs)))]
+
+def bench(fn, queries):
+    lat = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q)
+        lat.append((time.perf_counter() - t0) * 1000)
+    return pct(lat, 0.5), pct(lat, 0.95)
+
+print(f"{'schemes':>8} {'build_ms':>9} {'nnz':>10} | {'csr p50':>8} {'csr p95':>8} | {'dict p50':>8} {'dict p95':>8} | same_top")
+for n in [int(x) for x in args.sizes.split(",")]:
+    docs = [sample(max(5, int(rng.gauss(args.doc_len, args.doc_len / 4)))) for _ in range(n)]
+    queries = [sample(rng.randint(2, 8)) for _ in range(args.queries)]
+
+    t0 = time.perf_counter()
+    m = Bm25Matrix(docs)
+    build_ms = (time.perf_counter() - t0) * 1000
+    ref = PostingsBm25(docs)
+
+    csr = lambda q: top_k(m.score(q), args.k)
+    # the reference does not pad with zero-score docs, compare its (possibly shorter) list
+    same = all(list(csr(q))[:len(r)] == r for q in queries[:50] for r in [ref.search(q, args.k)])
+    c50, c95 = bench(csr, queries)
+    d50, d95 = bench(lambda q: ref.search(q, args.k), queries)
+    print(f"{n:>8} {build_ms:>9.0f} {m.nnz:>10} | {c50:>8.3f} {c95:>8.3f} | {d50:>8.3f} {d95:>8.3f} | {same}")
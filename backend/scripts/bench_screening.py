@@ -0,0 +1,79 @@
+"""Bulk eligibility screening throughput, in rows per second.
+
+Run from backend/:  python scripts/bench_screening.py [--rows 50000] [--workers 0,1,2,4] [--chunk 500] [--scale 1,100]
+
+Synthetic household profiles. Engine: the per-scheme check_eligibility loop vs the
+columnar table in batches, on the catalog replicated `--scale` times (in-process).
+End to end: the Screener (batched chunks, NDJSON-encoded in the workers) on the real
+catalog, in a thread and with each process-pool size; pools are warmed before timing.
+"""
+import argparse, asyncio, logging, os, random, sys, time
+
+sys.path.insert(0, os.path.abspath("."))
+
+from app.catalog import CatalogSnapshot, catalog
+from app.screening import Screener, aiter_rows
+from app.tools.eligibility import check_eligibility
+from app.tools.eligibility_table import EligibilityTable
+
+VALUES = {
+    "age": [None, 17, 25, 34, 40, 52, 66], "income_annual": [None, 50000, 120000, 240000, 600000, 900000],
+    "gender": [None, "female", "male"], "state": [None, "Maharashtra", "Gujarat"],
+    "occupation": [None, "farmer", "trader", "student", "labourer"], "district": [None, "pune", "nagpur"],
+    "category": [None, "sc", "obc", "open"], "land_holding_acres": [None, 0.5, 2, 7],
+}
+
+def profiles(n, seed=0):
+    rnd = random.Random(seed)
+    return [{"id": i, **{k: v for k, v in ((k, rnd.choice(vs)) for k, vs in VALUES.items()) if v is not None}} for i in range(n)]
+
+def rate(n, seconds):
+    return f"{n / seconds:>10.0f} rows/s"
+
+async def run_screener(screener, rows):
+    size = 0
+    async for text in screener.screen(aiter_rows(rows)):
+        size += len(text)
+    return size
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--workers", default="0,1,2,4")
+    ap.add_argument("--chunk", type=int, default=500)
+    ap.add_argument("--scale", default="1,10,100")
+    args = ap.parse_args()
+    logging.disable(logging.INFO)
+
+    base = catalog()
+    data = profiles(args.rows)
+    rows = list(enumerate(data, 1))
+    print(f"catalog schemes={len(base)} rows={args.rows} cpus={os.cpu_count()}")
+
+    for k in [int(x) for x in args.scale.split(",") if x.strip()]:
+        snap = base if k == 1 else CatalogSnapshot(
+            [dict(s, scheme_id=f"{s['scheme_id']}_{i}") for i in range(k) for s in base.schemes], f"scaled-{k}")
+        table = EligibilityTable(snap)
+        n = max(200, min(args.rows, 200000 // len(snap)))
+        t0 = time.perf_counter()
+        for p in data[:n]:
+            for s in snap.schemes:
+                check_eligibility(p, s, snap)
+        t_loop = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for i in range(0, n, args.chunk):
+            table.evaluate_batch(data[i:i + args.chunk]).summaries()
+        t_table = time.perf_counter() - t0
+        print(f"schemes={len(snap):<6} check_eligibility loop {rate(n, t_loop)}   table batches {rate(n, t_table)}")
+
+    for w in [int(x) for x in args.workers.split(",") if x.strip()]:
+        screener = Screener(w, args.chunk)
+        asyncio.run(run_screener(screener, rows[: args.chunk * max(1, w)]))  # start + warm the pool
+        t0 = time.perf_counter()
+        size = asyncio.run(run_screener(screener, rows))
+        label = f"screener workers={w}" + (" (thread)" if w == 0 else "")
+        print(f"{label:<31}{rate(args.rows, time.perf_counter() - t0)}   ndjson={size / 1e6:.1f} MB")
+        screener.shutdown(wait=True)
+
+if __name__ == "__main__":  # spawned pool workers re-import this module
+    main()
@@ -0,0 +1,55 @@
+"""Turn-write throughput of the session store, unsharded vs sharded.
+
+Run from backend/:  python scripts/bench_session_writes.py [--shards 1,2,4,8] [--sessions 400] [--turns 10]
+
+Each simulated session writes one delta per turn (state column + user/assistant
+messages) through app.database, like SessionCache.end_turn. Uses a temp directory.
+"""
+import argparse, asyncio, json, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.abspath("."))
+
+from app.db import connect, init_db, write_session_delta
+from app.database import Database
+from app.shards import init_shards, shard_paths
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--shards", default="1,2,4,8")
+ap.add_argument("--sessions", type=int, default=400)
+ap.add_argument("--turns", type=int, default=10)
+ap.add_argument("--window-ms", type=float, default=2.0)
+ap.add_argument("--synchronous", default="FULL")
+args = ap.parse_args()
+
+STATE = json.dumps({"last_candidates": ["X"] * 5, "tool_trace": [{"t": "x" * 200}] * 3})
+
+async def session(db, sid):
+    await db.for_session(sid).write(write_session_delta, sid, "Marathi", {"profile_json": "{}", "pending_json": "{}", "state_json": STATE}, True, [])
+    for t in range(args.turns):
+        now = time.time()
+        msgs = [("user", f"turn {t}", now), ("assistant", "उत्तर " * 20, now)]
+        await db.for_session(sid).write(write_session_delta, sid, "Marathi", {"state_json": STATE}, False, msgs)
+
+async def run(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        main = os.path.join(tmp, "app.db")
+        conn = connect(main)
+        init_db(conn)
+        conn.close()
+        paths = shard_paths(tmp, n) if n > 1 else []
+        if paths:
+            init_shards(paths)
+        db = Database(main, 2, args.window_ms, 128, args.synchronous, paths)
+        db.start()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(session(db, f"sess-{i}") for i in range(args.sessions)))
+        dt = time.perf_counter() - t0
+        stats = [s.writer.stats() for s in db.session_dbs()]
+        await db.close()
+    turns = args.sessions * args.turns
+    groups = sum(s["groups"] for s in stats)
+    print(f"{n:>6} {turns / dt:>10.0f} {groups:>7} {sum(s['jobs'] for s in stats) / max(1, groups):>9.1f}")
+
+print(f"{'shards':>6} {'turns/s':>10} {'groups':>7} {'avg_group':>9}")
+for n in [int(x) for x in args.shards.split(",")]:
+    asyncio.run(run(n))
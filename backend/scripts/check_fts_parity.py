@@ -0,0 +1,63 @@
+"""Parity of the FTS5 scheme backend with the in-memory one on sample queries.
+
+Run from backend/:  python scripts/check_fts_parity.py [-k 5]
+
+Builds a throwaway SQLite copy of schemes.json and checks that
+  1. fts_tokens() (used for MATCH terms) cuts the catalog text into exactly the terms
+     the FTS5 tokenizer indexed (read back through fts5vocab);
+  2. every sample query with an in-memory BM25 hit also gets FTS hits, and the FTS
+     top hit is among the in-memory top k.
+Exits non-zero on any mismatch.
+"""
+import argparse, logging, os, sys, tempfile
+
+sys.path.insert(0, os.path.abspath("."))
+
+from app.catalog import catalog
+from app.db import connect, ensure_schemes_loaded, fts_tokens, init_db, search_schemes_fts
+from app.tools.bm25 import top_k
+from app.tools.scheme_rag import _fts_match, _tok, scheme_index
+
+SAMPLE_QUERIES = [
+    "शिष्यवृत्ती", "मला शिष्यवृत्ती हवी आहे", "शेतकरी योजना", "शेतकऱ्यांसाठी पैसे", "महिलांसाठी योजना",
+    "लाडकी बहीण", "आरोग्य विमा", "रुग्णालय उपचार", "व्यापारी पेन्शन", "मुलींसाठी योजना",
+    "पोस्ट मॅट्रिक शिष्यवृत्ती", "pm kisan", "ayushman bharat", "pension for shopkeeper",
+]
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-k", type=int, default=5)
+    args = ap.parse_args()
+    logging.disable(logging.INFO)
+    bad = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = connect(os.path.join(tmp, "parity.db"))
+        init_db(conn)
+        ensure_schemes_loaded(conn)
+
+        conn.execute("CREATE VIRTUAL TABLE temp.fts_terms USING fts5vocab(main, schemes_fts, 'row')")
+        indexed = {r[0] for r in conn.execute("SELECT term FROM temp.fts_terms")}
+        fields = ("name_mr", "category_mr", "benefits_mr", "description_mr")
+        ours = {t for s in catalog().schemes for f in fields for t in fts_tokens(s.get(f) or "")}
+        if ours != indexed:
+            bad += 1
+            print(f"TOKENS differ: only fts_tokens={sorted(ours - indexed)[:10]} only index={sorted(indexed - ours)[:10]}")
+        else:
+            print(f"tokens ok terms={len(indexed)}")
+
+        index = scheme_index()
+        for q in SAMPLE_QUERIES:
+            bm = index.matrix.score(_tok(q))  # lexical channel only, no boosts
+            mem = [index.schemes[d]["scheme_id"] for d in top_k(bm, args.k) if bm[d] > 0]
+            match = _fts_match(q)
+            fts = [s["scheme_id"] for s, _ in search_schemes_fts(conn, match, args.k)] if match else []
+            ok = (not mem or bool(fts)) and (not fts or not mem or fts[0] in mem)
+            bad += not ok
+            print(f"{'ok ' if ok else 'BAD'} {q!r:<34} memory={mem} fts={fts}")
+        conn.close()
+    print("mismatches", bad)
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
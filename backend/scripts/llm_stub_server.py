@@ -0,0 +1,68 @@
+"""Local OpenAI-compatible /chat/completions stub for exercising the async LLM client.
+
+Run from backend/:  python scripts/llm_stub_server.py [--port 8089] [--latency-ms 0] [--fail-rate 0.0] [--reply ID]
+
+Then point the backend at it:
+  LLM_PROVIDER=groq GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:8089/v1
+
+Without --reply it answers with the first scheme_id found in the prompt's candidates JSON.
+`--fail-rate` returns 503s at random so retries and the circuit breaker can be watched
+via GET /llm/stats. Supports both plain and `stream: true` (SSE) requests.
+"""
+import argparse, json, random, re, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--port", type=int, default=8089)
+ap.add_argument("--latency-ms", type=int, default=0)
+ap.add_argument("--fail-rate", type=float, default=0.0)
+ap.add_argument("--reply", default="")
+args = ap.parse_args()
+
+def _answer(messages):
+    if args.reply:
+        return args.reply
+    text = " ".join(str(m.get("content", "")) for m in messages)
+    m = re.search(r'"scheme_id":\s*"([^"]+)"', text)
+    return m.group(1) if m else "ok"
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def _json(self, code, body):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            return self._json(404, {"error": "not found"})
+        time.sleep(args.latency_ms / 1000)
+        if random.random() < args.fail_rate:
+            return self._json(503, {"error": "stub overloaded"})
+        content = _answer(body.get("messages") or [])
+        if not body.get("stream"):
+            return self._json(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        # A few characters per event, like a real token stream
+        pieces = [content[i:i + 3] for i in range(0, len(content), 3)]
+        events = [{"choices": [{"index": 0, "delta": {"content": p}}]} for p in pieces]
+        for e in [json.dumps(e) for e in events] + ["[DONE]"]:
+            chunk = f"data: {e}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, fmt, *a):
+        print("stub:", fmt % a)
+
+print(f"LLM stub on http://127.0.0.1:{args.port}/v1  fail_rate={args.fail_rate} latency_ms={args.latency_ms}")
+ThreadingHTTPServer(("127.0.0.1", args.port), Handler).serve_forever()
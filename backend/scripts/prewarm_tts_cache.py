@@ -0,0 +1,23 @@
+"""Render every known static Marathi prompt into the on-disk TTS cache.
+
+Run from backend/:  python scripts/prewarm_tts_cache.py [--dry-run]
+"""
+import os, sys, time
+
+sys.path.insert(0, os.path.abspath("."))
+
+from app.settings import settings
+from app.tts.mms_tts import prewarm_tts_cache, tts_cache
+from app.tts.prewarm import known_static_prompts
+
+texts = known_static_prompts()
+print(f"Static prompts: {len(texts)}  cache_dir={settings.tts_cache_dir or '(memory only)'}")
+if "--dry-run" in sys.argv:
+    for t in texts:
+        print(" -", t.replace("\n", " / "))
+    sys.exit(0)
+
+t0 = time.time()
+rendered, cached = prewarm_tts_cache(texts, "Marathi", batch_size=int(settings.tts_batch_max))
+print(f"Rendered {rendered}, already cached {cached}, t={time.time() - t0:.1f}s")
+print("Cache:", tts_cache().stats())
@@ -0,0 +1,113 @@
+"""Move sessions + messages into a new shard layout (run with the server stopped).
+
+Run from backend/:  python scripts/reshard_sessions.py --shards 8 [--shard-dir ./data/sessions]
+                    python scripts/reshard_sessions.py --from-shards 8 --shards 16
+                    python scripts/reshard_sessions.py --from-shards 8 --shards 1   # back into SQLITE_PATH
+
+The source is SQLITE_PATH (or `--from-shards K` files in `--from-dir`); targets are
+`--shards N` files named sessions-XX-of-NN.db (N=1 means SQLITE_PATH). Messages are
+copied in id order, so each session's history keeps its order (ids are reassigned).
+Targets must be empty: if a run is interrupted, delete the new files and run it again.
+Then set SESSION_SHARDS=N. `--purge-source` deletes the copied rows from the source
+afterwards (only once the row counts match).
+"""
+import argparse, os, sys, time
+
+sys.path.insert(0, os.path.abspath("."))
+
+from app.settings import settings
+from app.db import connect, init_db, init_shard_db
+from app.shards import shard_index, shard_paths
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--shards", type=int, default=int(settings.session_shards))
+ap.add_argument("--shard-dir", default=settings.session_shard_dir)
+ap.add_argument("--from-shards", type=int, default=1)
+ap.add_argument("--from-dir", default=settings.session_shard_dir)
+ap.add_argument("--batch", type=int, default=2000)
+ap.add_argument("--purge-source", action="store_true")
+args = ap.parse_args()
+
+def layout(count, directory):
+    return shard_paths(directory, count) if count > 1 else [settings.sqlite_path]
+
+src_paths = layout(args.from_shards, args.from_dir)
+dst_paths = layout(args.shards, args.shard_dir)
+if set(src_paths) & set(dst_paths):
+    sys.exit("Source and target layouts are the same files")
+for p in src_paths:
+    if not os.path.exists(p):
+        sys.exit(f"Missing source {p}")
+
+dst = []
+for i, p in enumerate(dst_paths):
+    conn = connect(p)
+    if len(dst_paths) > 1:
+        init_shard_db(conn, i, len(dst_paths))
+    else:
+        init_db(conn)
+    if conn.execute("SELECT EXISTS(SELECT 1 FROM sessions) OR EXISTS(SELECT 1 FROM messages)").fetchone()[0]:
+        sys.exit(f"Target {p} is not empty")
+    dst.append(conn)
+
+def route(session_id):
+    return dst[shard_index(session_id, len(dst))]
+
+t0 = time.time()
+n_sessions = n_messages = 0
+for p in src_paths:
+    src = connect(p)
+    # Sessions: keyset over the primary key
+    last = ""
+    while True:
+        rows = src.execute(
+            "SELECT * FROM sessions WHERE session_id > ? ORDER BY session_id LIMIT ?",
+            (last, args.batch),
+        ).fetchall()
+        if not rows:
+            break
+        for conn in dst:
+            mine = [
+                (r["session_id"], r["language"], r["profile_json"], r["pending_json"], r["state_json"], r["updated_at"],
+                 r["version"] if "version" in r.keys() else 0)
+                for r in rows if route(r["session_id"]) is conn
+            ]
+            if mine:
+                conn.executemany("INSERT INTO sessions(session_id, language, profile_json, pending_json, state_json, updated_at, version) VALUES(?,?,?,?,?,?,?)", mine)
+                conn.commit()
+        n_sessions += len(rows)
+        last = rows[-1]["session_id"]
+    # Messages (orphans included): keyset over id keeps each session's order
+    last_id = 0
+    while True:
+        rows = src.execute("SELECT id, session_id, role, text, ts FROM messages WHERE id > ? ORDER BY id LIMIT ?", (last_id, args.batch)).fetchall()
+        if not rows:
+            break
+        for conn in dst:
+            mine = [tuple(r)[1:] for r in rows if route(r[1]) is conn]
+            if mine:
+                conn.executemany("INSERT INTO messages(session_id, role, text, ts) VALUES(?,?,?,?)", mine)
+                conn.commit()
+        n_messages += len(rows)
+        last_id = rows[-1][0]
+    src.close()
+    print(f"{p}: copied, running total sessions={n_sessions} messages={n_messages}")
+
+got_s = sum(c.execute("SELECT COUNT(1) FROM sessions").fetchone()[0] for c in dst)
+got_m = sum(c.execute("SELECT COUNT(1) FROM messages").fetchone()[0] for c in dst)
+for p, conn in zip(dst_paths, dst):
+    print(f"  {p}: sessions={conn.execute('SELECT COUNT(1) FROM sessions').fetchone()[0]}")
+    conn.close()
+print(f"Copied sessions={got_s}/{n_sessions} messages={got_m}/{n_messages} in {time.time() - t0:.1f}s")
+if (got_s, got_m) != (n_sessions, n_messages):
+    sys.exit("Row counts differ; source left untouched")
+
+if args.purge_source:
+    for p in src_paths:
+        src = connect(p)
+        src.execute("DELETE FROM messages")
+        src.execute("DELETE FROM sessions")
+        src.commit()
+        src.close()
+        print(f"Purged sessions/messages from {p}")
+print(f"Now start the server with SESSION_SHARDS={len(dst_paths)}" + (f" SESSION_SHARD_DIR={args.shard_dir}" if len(dst_paths) > 1 else ""))
@@ -0,0 +1,46 @@
+"""Screen a spreadsheet of household profiles against every scheme in the catalog.
+
+Run from backend/:  python scripts/screen_households.py households.csv [-o results.ndjson]
+                    python scripts/screen_households.py households.jsonl --workers 4 --chunk 1000
+
+Input is CSV with a header row (columns named like profile fields: age, income_annual,
+gender, state, district, category, occupation, land_holding_acres, optional id) or
+JSONL. Writes NDJSON like POST /eligibility/screen: one line per row in completion
+order, then a summary line. `-` reads stdin / writes stdout.
+"""
+import argparse, asyncio, os, sys
+
+sys.path.insert(0, os.path.abspath("."))
+
+from app.screening import Screener, aiter_rows, format_for, read_rows
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("input")
+    ap.add_argument("-o", "--output", default="-")
+    ap.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: from the file extension")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk", type=int, default=500)
+    args = ap.parse_args()
+
+    fmt = args.format or format_for(None, args.input)
+    src = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    screener = Screener(args.workers, args.chunk)
+
+    async def run():
+        last = ""
+        async for text in screener.screen(aiter_rows(read_rows(src, fmt))):
+            dst.write(text)
+            last = text
+        print(last.strip(), file=sys.stderr)  # the summary line
+
+    try:
+        asyncio.run(run())
+    finally:
+        screener.shutdown(wait=True)
+        if dst is not sys.stdout:
+            dst.close()
+
+if __name__ == "__main__":  # spawned pool workers re-import this module
+    main()
@@ -14,6 +14,7 @@ type ChatMessage = {
   cards?: any[]
   uiIntent?: string
   eligibility?: any
+  alsoEligible?: any[]
 }
 
 export default function App() {
@@ -122,6 +123,7 @@ export default function App() {
             cards: msg.ui?.cards || [],
             uiIntent: msg.ui?.ui_intent,
             eligibility: msg.ui?.eligibility,
+            alsoEligible: msg.ui?.also_eligible || [],
           },
         ])
 
@@ -255,6 +257,23 @@ export default function App() {
                     </div>
                   )}
 
+                  {m.alsoEligible && m.alsoEligible.length > 0 && (
+                    <div className="space-y-2">
+                      <div className="alert-title">तुम्ही या योजनांसाठीही पात्र आहात:</div>
+                      <div className="card-grid">
+                        {m.alsoEligible.map((c, idx) => (
+                          <SchemeCard
+                            key={idx}
+                            title={c.title}
+                            category={c.category || 'कल्याणकारी योजना'}
+                            benefits={c.benefits}
+                            documents={c.documents || []}
+                          />
+                        ))}
+                      </div>
+                    </div>
+                  )}
+
                   {m.eligibility?.apply_result && (
                     <div className="alert-card success">
                       <FileText className="alert-icon success" size={18} />